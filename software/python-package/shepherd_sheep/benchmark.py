@@ -0,0 +1,307 @@
+"""
+shepherd.benchmark
+~~~~~
+Standardized microbenchmarks of the data path of a node.
+
+The stages of the main-loop (calibration, interleaving, buffer-access,
+file-writing) are measured against the PRU-simulator, so no cape or
+kernel module is needed. Every result is reported in samples per second
+and as headroom relative to the real-time requirement (100 kSps for IV).
+Versions & platform are stored alongside, so results of different
+software-versions and node-images are comparable.
+
+"""
+
+import platform
+import socket
+import tempfile
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from time import perf_counter
+from typing import Any
+
+import numpy as np
+import yaml
+from shepherd_core import CalibrationSeries
+from shepherd_core.data_models import EnergyDType
+from shepherd_core.data_models.task import Compression
+
+from . import commons
+from . import shared_memory
+from . import sysfs_interface as sfs
+from .cache import version_stamp
+from .h5_monitor_sheep import SheepMonitor
+from .h5_writer import Writer
+from .logger import get_message_queue
+from .logger import log
+from .pru_simulator import PruSimulator
+from .shared_mem_gpio_output import GPIOTrace
+from .shared_mem_iv_input import IVTrace
+from .shared_memory import SharedMemory
+
+bench_path = Path("/var/shepherd/bench")
+
+# real-time requirements [1/s]
+IV_SPS: float = 10**9 / commons.SAMPLE_INTERVAL_NS
+GPIO_SPS: float = commons.BUFFER_GPIO_SAMPLES_N / commons.BUFFER_GPIO_INTERVAL_S
+UTIL_SPS: float = 10**9 / commons.SYNC_INTERVAL_NS
+
+CHUNK_N: int = 10_000  # like Reader.CHUNK_SAMPLES_N
+# entries of the monitor can get dropped (full queue, dead thread) -> don't wait forever
+MONITOR_TIMEOUT_S: float = 30.0
+
+
+class BenchResult:
+    """Throughput of a single benchmark."""
+
+    def __init__(self, name: str, required_sps: float | None) -> None:
+        self.name = name
+        self.required_sps = required_sps
+        self.samples_n: int = 0
+        self.duration_s: float = 0.0
+        # False if benchmark gave up before all samples were processed
+        self.complete: bool = True
+
+    def add(self, samples_n: int, ts_start: float) -> None:
+        """Accounts samples processed since ts_start (from perf_counter())."""
+        self.duration_s += perf_counter() - ts_start
+        self.samples_n += samples_n
+
+    @property
+    def samples_per_s(self) -> float:
+        return self.samples_n / self.duration_s if self.duration_s > 0 else 0.0
+
+    @property
+    def headroom(self) -> float | None:
+        """Factor of real-time-requirement that could be handled, >1 is good."""
+        if self.required_sps is None:
+            return None
+        return self.samples_per_s / self.required_sps
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "samples_n": self.samples_n,
+            "duration_s": round(self.duration_s, 6),
+            "samples_per_s": round(self.samples_per_s, 1),
+            "required_sps": self.required_sps,
+            "headroom": None if self.headroom is None else round(self.headroom, 3),
+            "complete": self.complete,
+        }
+
+
+def _chunk(index: int) -> IVTrace:
+    rng = np.random.default_rng(index)
+    # worst case for compression is noise
+    return IVTrace(
+        voltage=rng.integers(0, 2**18, CHUNK_N, dtype="u4"),
+        current=rng.integers(0, 2**18, CHUNK_N, dtype="u4"),
+        timestamp_ns=index * CHUNK_N * commons.SAMPLE_INTERVAL_NS,
+    )
+
+
+def bench_calibration(chunks_n: int) -> BenchResult:
+    """Conversion of raw ADC-values to SI-units, done before feeding PRU."""
+    result = BenchResult("cal_transform", IV_SPS)
+    cal = CalibrationSeries()
+    for index in range(chunks_n):
+        data = _chunk(index)
+        ts_start = perf_counter()
+        cal.voltage.raw_to_si(data.voltage).astype("u4")
+        cal.current.raw_to_si(data.current).astype("u4")
+        result.add(len(data), ts_start)
+    return result
+
+
+def bench_interleave(chunks_n: int) -> BenchResult:
+    """Combining voltage & current into the memory-layout of the PRU."""
+    result = BenchResult("interleave", IV_SPS)
+    for index in range(chunks_n):
+        data = _chunk(index)
+        ts_start = perf_counter()
+        iv_data = np.empty((2 * len(data),), dtype=data.voltage.dtype)
+        iv_data[0::2] = data.voltage
+        iv_data[1::2] = data.current
+        result.add(len(data), ts_start)
+    return result
+
+
+@contextmanager
+def _simulated_memory(path: Path) -> Generator[tuple[PruSimulator, SharedMemory], None, None]:
+    """Host-side shared memory, attached to an in-process simulator."""
+    sysfs_path, mem_path = sfs.sysfs_path, shared_memory.mem_path
+    # dense edges, to get enough gpio-samples for a meaningful measurement
+    with PruSimulator(path / "sysfs", edge_interval_n=10) as sim:
+        sfs.sysfs_path, shared_memory.mem_path = sim.path, sim.mem_path
+        try:
+            shm = SharedMemory(None, None, start_timestamp_ns=time.time_ns())
+            with shm:
+                sim.start()
+                yield sim, shm
+        finally:
+            sfs.sysfs_path, shared_memory.mem_path = sysfs_path, mem_path
+
+
+def bench_shared_memory(chunks_n: int, path: Path) -> list[BenchResult]:
+    """Host-side access to the PRU-buffers (write iv_inp, read iv_out, gpio & util)."""
+    results = {
+        "inp": BenchResult("iv_inp_write", IV_SPS),
+        "out": BenchResult("iv_out_read", IV_SPS),
+        "gpio": BenchResult("gpio_read", GPIO_SPS),
+        "util": BenchResult("util_read", UTIL_SPS),
+    }
+    with _simulated_memory(path) as (sim, shm):
+        # prefill, like the emulator does - space only gets available when PRU consumes
+        while shm.iv_inp.write(_chunk(0), cal=None):
+            pass
+        for index in range(chunks_n):
+            sim.advance(CHUNK_N)  # simulator is not measured
+            data = _chunk(index)
+            ts_start = perf_counter()
+            if not shm.iv_inp.write(data, cal=None):
+                log.warning("Benchmark: iv_inp-buffer did not accept data")
+            results["inp"].add(len(data), ts_start)
+
+            ts_start = perf_counter()
+            iv_out = shm.iv_out.read()
+            results["out"].add(0 if iv_out is None else len(iv_out), ts_start)
+            ts_start = perf_counter()
+            gpio = shm.gpio.read(force=True)
+            results["gpio"].add(0 if gpio is None else len(gpio), ts_start)
+            ts_start = perf_counter()
+            util = shm.util.read(force=True)
+            results["util"].add(0 if util is None else len(util), ts_start)
+            shm.release(iv_out, gpio, util)
+    return list(results.values())
+
+
+def bench_writer(chunks_n: int, path: Path, compression: Compression) -> list[BenchResult]:
+    """Appending IV- & GPIO-traces to hdf5-file."""
+    result_iv = BenchResult(f"writer_iv_{compression.name}", IV_SPS)
+    result_gpio = BenchResult(f"writer_gpio_{compression.name}", GPIO_SPS)
+    with Writer(
+        file_path=path / f"bench_{compression.name}.h5",
+        mode="emulator",
+        datatype=EnergyDType.ivsample,
+        compression=compression,
+        force_overwrite=True,
+        verbose=False,
+    ) as writer:
+        timestamps = np.arange(CHUNK_N, dtype="u8") * commons.SAMPLE_INTERVAL_NS
+        for index in range(chunks_n):
+            data = _chunk(index)
+            data.timestamp_ns = timestamps + index * CHUNK_N * commons.SAMPLE_INTERVAL_NS
+            ts_start = perf_counter()
+            writer.write_iv_buffer(data)
+            result_iv.add(len(data), ts_start)
+
+            gpio = GPIOTrace(
+                timestamps_ns=data.timestamp_ns,
+                bitmasks=(data.voltage & 0x3FF).astype("u2"),
+            )
+            ts_start = perf_counter()
+            writer.write_gpio_buffer(gpio)
+            result_gpio.add(len(gpio), ts_start)
+    return [result_iv, result_gpio]
+
+
+def bench_monitor(entries_n: int, path: Path, timeout_s: float = MONITOR_TIMEOUT_S) -> BenchResult:
+    """Element-wise writes of a monitor (log-messages of sheep).
+
+    Reported as partial if not all entries got stored within timeout_s.
+    """
+    result = BenchResult("monitor_sheep", None)
+    queue = get_message_queue()
+    with Writer(
+        file_path=path / "bench_monitor.h5",
+        mode="emulator",
+        datatype=EnergyDType.ivsample,
+        force_overwrite=True,
+        verbose=False,
+    ) as writer:
+        monitor = SheepMonitor(writer.sheep_grp)
+        ts_start = perf_counter()
+        for index in range(entries_n):
+            queue.put(_LogEntry(f"benchmark-entry {index}"))
+        ts_deadline = ts_start + timeout_s
+        while queue.qsize() > 0 or monitor.position < entries_n:
+            if perf_counter() > ts_deadline:
+                result.complete = False
+                log.warning(
+                    "Benchmark: monitor stored only %d of %d entries within %.0f s",
+                    monitor.position,
+                    entries_n,
+                    timeout_s,
+                )
+                break
+            time.sleep(0.001)
+        result.add(monitor.position, ts_start)
+        monitor.__exit__()
+    return result
+
+
+class _LogEntry:
+    """Minimal stand-in for a log-record, as consumed by the SheepMonitor."""
+
+    def __init__(self, message: str) -> None:
+        self.created = time.time()
+        self.message = message
+        self.levelno = 10
+
+
+def system_info() -> dict[str, str]:
+    dogtag = Path("/etc/dogtag")  # image-version of beaglebone
+    return {
+        "hostname": socket.gethostname(),
+        "timestamp": datetime.now().astimezone().isoformat(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "image": dogtag.read_text().strip() if dogtag.exists() else "unknown",
+        "versions": version_stamp(),
+    }
+
+
+def run_benchmarks(duration_s: float = 10.0, data_path: Path | None = None) -> dict[str, Any]:
+    """Runs all benchmarks on duration_s of sample-data each.
+
+    Args:
+        duration_s: length of data per benchmark (real-time-equivalent)
+        data_path: place for temporary files, defaults to system-tmp
+
+    Returns:
+        report with system-info & results
+    """
+    chunks_n = max(1, round(duration_s * IV_SPS / CHUNK_N))
+    with tempfile.TemporaryDirectory(dir=data_path) as tmp:
+        path = Path(tmp)
+        results = [bench_calibration(chunks_n), bench_interleave(chunks_n)]
+        results += bench_shared_memory(chunks_n, path)
+        for compression in [Compression.null, Compression.lzf, Compression.gzip1]:
+            results += bench_writer(chunks_n, path, compression)
+        results.append(bench_monitor(10 * chunks_n, path))
+    return {
+        "system": system_info(),
+        "duration_s": duration_s,
+        "results": [_r.to_dict() for _r in results],
+    }
+
+
+def summary(report: dict[str, Any]) -> str:
+    """Table of results."""
+    lines = [f"{'benchmark':<20} {'samples/s':>14} {'headroom':>9}"]
+    for result in report["results"]:
+        headroom = result["headroom"]
+        headroom_str = "-" if headroom is None else f"{headroom:.2f}x"
+        line = f"{result['name']:<20} {result['samples_per_s']:>14.0f} {headroom_str:>9}"
+        lines.append(line if result.get("complete", True) else f"{line} (partial)")
+    return "\n".join(lines)
+
+
+def save_report(report: dict[str, Any], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as fh:
+        yaml.safe_dump(report, fh, default_flow_style=False, sort_keys=False)
+    log.info("Saved benchmark to %s", path.as_posix())
@@ -0,0 +1,130 @@
+"""
+shepherd.cache
+~~~~~
+Local cache for results that are expensive to derive on the node
+(i.e. parsed calibration, validated task-sets). Entries are pickled
+and stamped with the versions of the libraries that produced them,
+so an upgrade invalidates them automatically.
+
+NOTE: pickle is only safe for trusted input. The cache-directories get
+created with mode 0o700 and entries are only unpickled if the directories
+and the file belong to the current user (root on the node) and are not
+writable by group or others - /var/shepherd itself is shared.
+
+"""
+
+import os
+import pickle
+import platform
+import stat
+from functools import cache
+from importlib import metadata
+from pathlib import Path
+from typing import Any
+
+from . import __version__
+from .logger import log
+
+cache_path = Path("/var/shepherd/cache")
+
+
+def _package_version(name: str) -> str:
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return "none"
+
+
+@cache
+def version_stamp() -> str:
+    """Versions of all libraries that define the layout of cached objects."""
+    versions = [f"sheep={__version__}", f"python={platform.python_version()}"]
+    versions += [
+        f"{package}={_package_version(package)}"
+        for package in ["shepherd_core", "pydantic", "pydantic_core"]
+    ]
+    return ", ".join(versions)
+
+
+def _is_trusted(stats: os.stat_result) -> bool:
+    """Owned by current user and not writable by group or others."""
+    return stats.st_uid == os.geteuid() and not stats.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def _trusted_dir(name: str) -> bool:
+    for path in (cache_path, cache_path / name):
+        try:
+            stats = path.stat()
+        except OSError:
+            return False
+        if not stat.S_ISDIR(stats.st_mode) or not _is_trusted(stats):
+            log.warning("Cache-directory %s is not trusted -> ignored", path)
+            return False
+    return True
+
+
+def load(name: str, key: str) -> Any | None:
+    """Returns cached data or None if it is missing, unreadable or outdated.
+
+    Args:
+        name: category of cache, i.e. "calibration"
+        key: identifies the content, i.e. a hash of the source
+    """
+    path = cache_path / name / f"{key}.pickle"
+    if not path.exists() or not _trusted_dir(name):
+        return None
+    try:
+        with os.fdopen(os.open(path, os.O_RDONLY | os.O_NOFOLLOW), "rb") as fh:
+            if not _is_trusted(os.fstat(fh.fileno())):
+                log.warning("Cache-entry %s/%s is not trusted -> ignored", name, key)
+                return None
+            entry = pickle.load(fh)  # noqa: S301
+    except Exception as xcp:  # noqa: BLE001
+        # unpickling can fail in many ways, i.e. for moved classes
+        log.debug("Cache-entry %s/%s unusable (%s)", name, key, xcp)
+        return None
+    if not isinstance(entry, dict) or entry.get("version") != version_stamp():
+        log.debug("Cache-entry %s/%s is outdated", name, key)
+        return None
+    return entry.get("data")
+
+
+def store(name: str, key: str, data: Any, max_entries: int = 16) -> None:
+    """Adds data to cache, failures are not fatal.
+
+    Args:
+        name: category of cache, i.e. "calibration"
+        key: identifies the content, i.e. a hash of the source
+        data: picklable object
+        max_entries: oldest entries of this category get removed beyond this count
+    """
+    path = cache_path / name / f"{key}.pickle"
+    path_tmp = path.with_suffix(".tmp")
+    try:
+        cache_path.mkdir(mode=0o700, parents=True, exist_ok=True)
+        path.parent.mkdir(mode=0o700, exist_ok=True)
+        if not _trusted_dir(name):
+            return
+        path_tmp.unlink(missing_ok=True)
+        flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | os.O_NOFOLLOW
+        with os.fdopen(os.open(path_tmp, flags, 0o600), "wb") as fh:
+            pickle.dump(
+                {"version": version_stamp(), "data": data},
+                fh,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        path_tmp.replace(path)  # atomic, concurrent readers never see partial files
+        entries = sorted(path.parent.glob("*.pickle"), key=lambda _p: _p.stat().st_mtime)
+        for entry in entries[:-max_entries]:
+            entry.unlink(missing_ok=True)
+    except (OSError, pickle.PicklingError) as xcp:
+        log.debug("Could not store cache-entry %s/%s (%s)", name, key, xcp)
+
+
+def clear(name: str | None = None) -> None:
+    """Removes all entries of a category (or of all categories)."""
+    paths = [cache_path / name] if name else [_p for _p in cache_path.glob("*") if _p.is_dir()]
+    for path in paths:
+        for entry in path.glob("*"):
+            entry.unlink(missing_ok=True)
+        log.debug("Cleared cache '%s'", path.name)
@@ -16,30 +16,39 @@ from types import FrameType
 from typing import TypedDict
 
 import click
-import gevent
-import yaml
-import zerorpc
-from shepherd_core import CalibrationCape
-from shepherd_core.data_models.task import ProgrammingTask
-from shepherd_core.data_models.testbed import ProgrammerProtocol
-from shepherd_core.data_models.testbed import TargetPort
-from shepherd_core.inventory import Inventory
 from typing_extensions import Unpack
 
 from . import __version__
-from . import run_task
 from . import sysfs_interface
-from .eeprom import EEPROM
+from .daemon import SheepDaemon
+from .daemon import forward_to_daemon
+from .daemon import forwarded_commands
+from .lazy_import import lazy_module
 from .logger import log
 from .logger import set_verbosity
-from .shepherd_debug import ShepherdDebug
-from .shepherd_io import gpio_pin_nums
+from .memory_budget import MemoryBudget
+from .run_options import RunOptions
 from .sysfs_interface import check_sys_access
 from .sysfs_interface import disable_ntp
 from .sysfs_interface import reload_kernel_module
 from .usage_log import get_last_usage
 from .usage_log import usage_logger
 
+# Herd calls the CLI on every node, so startup-time matters.
+# Heavy modules are only loaded by the subcommands that use them.
+gevent = lazy_module("gevent")
+yaml = lazy_module("yaml")
+zerorpc = lazy_module("zerorpc")
+core = lazy_module("shepherd_core")
+core_task = lazy_module("shepherd_core.data_models.task")
+core_testbed = lazy_module("shepherd_core.data_models.testbed")
+_eeprom = lazy_module(f"{__package__}.eeprom")
+_io = lazy_module(f"{__package__}.shepherd_io")
+_debug = lazy_module(f"{__package__}.shepherd_debug")
+_runner = lazy_module(f"{__package__}.task_runner")
+_bench = lazy_module(f"{__package__}.benchmark")
+_verify = lazy_module(f"{__package__}.h5_verify")
+
 # allow importing shepherd on x86 - for testing
 try:
     from periphery import GPIO
@@ -82,16 +91,24 @@ def exit_gracefully(_signum: int, _frame: FrameType | None) -> None:
     is_flag=True,
     help="Prints version-info at start (combinable with -v)",
 )
+@click.option(
+    "--no-daemon",
+    is_flag=True,
+    help="Run command in this process, even if the sheep-daemon is active",
+)
 @click.pass_context
-def cli(ctx: click.Context, *, verbose: bool, version: bool) -> None:
+def cli(ctx: click.Context, *, verbose: bool, version: bool, no_daemon: bool) -> None:
     """Shepherd: Synchronized Energy Harvesting Emulator and Recorder"""
-    signal.signal(signal.SIGTERM, exit_gracefully)
-    signal.signal(signal.SIGINT, exit_gracefully)
+    in_daemon = ctx.obj.get("in_daemon", False)
+    if not in_daemon:
+        # daemon keeps its own handlers & usage-entries are added by the client
+        signal.signal(signal.SIGTERM, exit_gracefully)
+        signal.signal(signal.SIGINT, exit_gracefully)
 
     if verbose:
         set_verbosity()
 
-    if ctx.invoked_subcommand and ctx.invoked_subcommand not in ["usage"]:
+    if not in_daemon and ctx.invoked_subcommand and ctx.invoked_subcommand not in ["usage"]:
         # this adds a usage-entry when sheep exits
         atexit.register(usage_logger, datetime.now().astimezone(), ctx.invoked_subcommand)
 
@@ -99,8 +116,14 @@ def cli(ctx: click.Context, *, verbose: bool, version: bool) -> None:
         log.info("Shepherd-Sheep v%s", __version__)
         log.debug("Python v%s", sys.version)
         log.debug("Click v%s", click.__version__)
-    if check_sys_access():
+    # benchmark runs against the PRU-simulator, verify only reads files -> no hardware needed
+    if ctx.invoked_subcommand not in ["bench", "verify"] and check_sys_access():
         ctx.exit(1)
+    if not (in_daemon or no_daemon) and ctx.invoked_subcommand in forwarded_commands:
+        # thin client - skips startup-costs if daemon is running
+        exit_code = forward_to_daemon(sys.argv[1:])
+        if exit_code is not None:
+            ctx.exit(exit_code)
     if not ctx.invoked_subcommand:
         click.echo("Please specify a valid command")
 
@@ -132,18 +155,18 @@ def target_power(target_port: str, voltage: float, *, on: bool, gpio_pass: bool)
     # TODO: output would be nicer when this uses shepherdDebug as base
     a_is_aux = "a" in target_port.lower()
     for pin_name in ["en_shepherd"]:
-        pin = GPIO(gpio_pin_nums[pin_name], "out")
+        pin = GPIO(_io.gpio_pin_nums[pin_name], "out")
         pin.write(value=on)
         log.info("Shepherd-State \t= %s", "enabled" if on else "disabled")
     for pin_name in ["target_pwr_sel"]:
-        pin = GPIO(gpio_pin_nums[pin_name], "out")
+        pin = GPIO(_io.gpio_pin_nums[pin_name], "out")
         pin.write(value=not a_is_aux)  # switched because rail A is AUX
         log.info("Select Target \t= %s", "A" if a_is_aux else "B")
     for pin_name in ["target_io_sel"]:
-        pin = GPIO(gpio_pin_nums[pin_name], "out")
+        pin = GPIO(_io.gpio_pin_nums[pin_name], "out")
         pin.write(value=a_is_aux)
     for pin_name in ["target_io_en"]:
-        pin = GPIO(gpio_pin_nums[pin_name], "out")
+        pin = GPIO(_io.gpio_pin_nums[pin_name], "out")
         pin.write(value=gpio_pass)
         log.info("IO passing \t= %s", "enabled" if gpio_pass else "disabled")
     log.info("Target Voltage \t= %.3f V", voltage)
@@ -162,11 +185,108 @@ def target_power(target_port: str, voltage: float, *, on: bool, gpio_pass: bool)
     type=click.Path(exists=True, readable=True, file_okay=True, dir_okay=False),
     default=Path("/etc/shepherd/config.yaml"),
 )
+@click.option(
+    "--realtime",
+    is_flag=True,
+    help="Pins & prioritizes the measurement-loop, locks memory and defers garbage-collection",
+)
+@click.option(
+    "--cpu",
+    type=click.INT,
+    multiple=True,
+    help="Core for the measurement-loop (real-time only, repeatable)",
+)
+@click.option(
+    "--priority",
+    type=click.IntRange(1, 99),
+    default=50,
+    help="Static priority of the real-time scheduler",
+)
+@click.option(
+    "--policy",
+    type=click.Choice(["fifo", "rr"]),
+    default="fifo",
+    help="Real-time scheduling-policy",
+)
+@click.option(
+    "--memory-budget",
+    type=click.IntRange(min=32),
+    default=None,
+    help="RAM-limit in MiB, sizes caches & queues to stay below it (for long runs)",
+)
+@click.option(
+    "--loop",
+    is_flag=True,
+    help="Repeats input of emulations for the configured duration (decoded once into RAM)",
+)
+@click.option(
+    "--loop-shift",
+    type=click.FLOAT,
+    default=0.0,
+    help="Each repetition of the looped input starts this many seconds later in the input",
+)
+@click.option(
+    "--tune-segments",
+    is_flag=True,
+    help="Measures main-loop of emulation during first seconds and picks best segment-size",
+)
+@click.option(
+    "--swmr",
+    is_flag=True,
+    help="Output-file can be read (i.e. by live-dashboards) while recording",
+)
+@click.option(
+    "--telemetry-port",
+    type=click.IntRange(0, 65535),
+    default=None,
+    help="Publishes live-statistics for the herd on this TCP-port (default of herd is 51451)",
+)
+@click.option(
+    "--gpio-filter",
+    is_flag=True,
+    help="Removes redundant records of gpio-traces before writing",
+)
+@click.option(
+    "--gpio-glitch",
+    type=click.IntRange(min=0),
+    default=0,
+    help="With --gpio-filter, also removes pin-states shorter than this [ns]",
+)
 @click.pass_context
-def run(ctx: click.Context, config: Path) -> None:
+def run(
+    ctx: click.Context,
+    config: Path,
+    *,
+    realtime: bool,
+    cpu: tuple[int, ...],
+    priority: int,
+    policy: str,
+    memory_budget: int | None,
+    loop: bool,
+    loop_shift: float,
+    tune_segments: bool,
+    swmr: bool,
+    telemetry_port: int | None,
+    gpio_filter: bool,
+    gpio_glitch: int,
+) -> None:
     reload_kernel_module()  # more reliable with fresh states
     disable_ntp()
-    failed = run_task(config)
+    options = RunOptions(
+        realtime=realtime,
+        realtime_cpus=cpu if len(cpu) > 0 else None,
+        realtime_priority=priority,
+        realtime_policy=policy,
+        memory_budget=MemoryBudget(memory_budget),
+        loop_input=loop,
+        loop_shift_s=loop_shift,
+        tune_segments=tune_segments,
+        swmr=swmr,
+        telemetry_port=telemetry_port,
+        gpio_filter=gpio_filter,
+        gpio_glitch_ns=gpio_glitch,
+    )
+    failed = _runner.run_task(config, options)
     if failed:
         log.debug("Tasks signaled an error (failed).")
     ctx.exit(int(failed))
@@ -190,10 +310,10 @@ def write(
     ctx: click.Context,
     cal_file: Path | None,
 ) -> None:
-    cal_cape = CalibrationCape.from_file(cal_file)
+    cal_cape = core.CalibrationCape.from_file(cal_file)
     try:
         log.debug("Will write Cal-Data:\n\n%s", str(cal_cape))
-        with EEPROM() as storage:
+        with _eeprom.EEPROM() as storage:
             storage.write_calibration(cal_cape)
     except FileNotFoundError:
         log.error("Access to EEPROM failed (FS) -> is Shepherd-Cape missing?")
@@ -223,7 +343,7 @@ def write(
 @click.pass_context
 def read(ctx: click.Context, cal_file: Path | None, *, revision: bool, full: bool) -> None:
     try:
-        with EEPROM() as storage:
+        with _eeprom.EEPROM() as storage:
             cal = storage.read_calibration()
     except ValueError:
         log.warning(
@@ -251,11 +371,17 @@ def read(ctx: click.Context, cal_file: Path | None, *, revision: bool, full: boo
         cal.to_file(cal_file)
 
 
+@eeprom.command(short_help="Drop cached calibration (done automatically after 'eeprom write')")
+def clear_cache() -> None:
+    _eeprom.clear_calibration_cache()
+    log.info("Cleared cached calibration")
+
+
 @cli.command(short_help="Start ZeroRPC Server")
 @click.option("--port", "-p", type=click.INT, default=4242)
 @click.pass_context
 def rpc(ctx: click.Context, port: int | None) -> None:
-    shepherd_io = ShepherdDebug()
+    shepherd_io = _debug.ShepherdDebug()
     shepherd_io.__enter__()
     log.info("Shepherd Debug Interface: Initialized")
     time.sleep(1)
@@ -279,6 +405,65 @@ def rpc(ctx: click.Context, port: int | None) -> None:
     server.run()
 
 
+@cli.command(short_help="Starts daemon that runs forwarded commands without startup-cost")
+def daemon() -> None:
+    with SheepDaemon(cli) as server:
+        server.warm_up()
+        log.info("Shepherd Daemon: listening on %s", server.path.as_posix())
+        server.serve_forever()
+
+
+@cli.command(short_help="Benchmarks the data path of this node (no cape needed)")
+@click.option(
+    "--duration",
+    "-d",
+    type=click.FLOAT,
+    default=10.0,
+    help="Amount of sample-data per benchmark [s], equivalent to real-time",
+)
+@click.option(
+    "--output-path",
+    "-o",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=None,
+    help="Result-file (YAML), defaults to timestamped file in /var/shepherd/bench",
+)
+@click.option(
+    "--data-path",
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+    default=None,
+    help="Place for temporary hdf5-files, i.e. to compare storage media",
+)
+def bench(duration: float, output_path: Path | None, data_path: Path | None) -> None:
+    report = _bench.run_benchmarks(duration, data_path)
+    log.info("Benchmark-results:\n%s", _bench.summary(report))
+    if output_path is None:
+        timestamp = datetime.now().astimezone().strftime("%Y-%m-%d_%H-%M-%S")
+        output_path = _bench.bench_path / f"bench_{timestamp}.yaml"
+    _bench.save_report(report, output_path)
+
+
+@cli.command(short_help="Checks a recording against its checksums, lists damaged time-ranges")
+@click.argument(
+    "file",
+    type=click.Path(exists=True, readable=True, dir_okay=False, path_type=Path),
+)
+@click.option(
+    "--workers",
+    "-w",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Processes checking in parallel, defaults to number of cores",
+)
+@click.pass_context
+def verify(ctx: click.Context, file: Path, workers: int | None) -> None:
+    damaged = _verify.verify_file(file, workers)
+    if len(damaged) > 0:
+        log.error("%s has %d damaged chunks", file.name, len(damaged))
+        ctx.exit(1)
+    log.info("%s is intact", file.name)
+
+
 @cli.command(short_help="Collects information about this host")
 @click.option(
     "--output-path",
@@ -289,7 +474,7 @@ def rpc(ctx: click.Context, port: int | None) -> None:
 )
 def inventorize(output_path: Path) -> None:
     output_path = Path(output_path)
-    sheep_inv = Inventory.collect()
+    sheep_inv = core.Inventory.collect()
     sheep_inv.to_file(path=output_path, minimal=True)
     log.info("Written inventory to %s", output_path.as_posix())
 
@@ -345,12 +530,12 @@ def inventorize(output_path: Path) -> None:
 @click.pass_context
 def program(ctx: click.Context, **kwargs: Unpack[TypedDict]) -> None:
     protocol_dict = {
-        "nrf52": ProgrammerProtocol.swd,
-        "msp430": ProgrammerProtocol.sbw,
+        "nrf52": core_testbed.ProgrammerProtocol.swd,
+        "msp430": core_testbed.ProgrammerProtocol.sbw,
     }
     kwargs["protocol"] = protocol_dict[kwargs["mcu_type"]]
-    cfg = ProgrammingTask(**kwargs)
-    failed = run_task(cfg)
+    cfg = core_task.ProgrammingTask(**kwargs)
+    failed = _runner.run_task(cfg)
     ctx.exit(int(failed))
 
 
@@ -385,17 +570,17 @@ def pru(firmware: str) -> None:
 def blink(duration: int) -> None:
     set_verbosity()
     log.info("Blinks LEDs IO & EMU next to Target-Ports for %d s", duration)
-    with ShepherdDebug(use_io=False) as dbg:
+    with _debug.ShepherdDebug(use_io=False) as dbg:
         dbg.set_power_emulator(True)
         dbg.set_power_io_level_converter(True)
         for _ in range(duration * 2):
-            dbg.select_port_for_io_interface(TargetPort.A)
+            dbg.select_port_for_io_interface(core_testbed.TargetPort.A)
             time.sleep(0.125)
-            dbg.select_port_for_power_tracking(TargetPort.A)
+            dbg.select_port_for_power_tracking(core_testbed.TargetPort.A)
             time.sleep(0.125)
-            dbg.select_port_for_power_tracking(TargetPort.B)
+            dbg.select_port_for_power_tracking(core_testbed.TargetPort.B)
             time.sleep(0.125)
-            dbg.select_port_for_io_interface(TargetPort.B)
+            dbg.select_port_for_io_interface(core_testbed.TargetPort.B)
             time.sleep(0.125)
 
 
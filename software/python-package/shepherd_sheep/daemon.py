@@ -0,0 +1,281 @@
+"""
+shepherd.daemon
+~~~~~
+Optional long-living sheep process. It keeps the modules imported and the
+calibration in RAM, so commands from the herd run without the startup-cost
+of a fresh python process. The CLI forwards commands via a local unix socket
+and acts as a thin client while the daemon is present.
+
+Protocol (newline-delimited JSON):
+- client -> daemon: {"version": str, "argv": [str], "cwd": str}
+- daemon -> client: {"log": {record}} (repeated), finished by {"exit": int}
+  or {"reject": str} if the daemon can't handle the request
+- client -> daemon: {"cancel": str} while the command runs (i.e. on SIGTERM).
+  The client disconnecting cancels the command as well, so stopping the
+  client (systemctl stop shepherd) also ends a forwarded measurement.
+
+"""
+
+import ctypes
+import importlib
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import threading
+from contextlib import suppress
+from pathlib import Path
+from types import FrameType
+from typing import IO
+
+import click
+
+from . import __version__
+from .logger import console_handler
+from .logger import get_verbosity
+from .logger import log
+from .logger import reset_verbosity
+
+socket_path = Path("/run/shepherd/sheep.sock")
+
+# subcommands that get forwarded to the daemon
+forwarded_commands = {
+    "run",
+    "program",
+    "inventorize",
+    "fix",
+    "pru",
+    "blink",
+    "target-power",
+    "eeprom",
+}
+
+# kept imported for the lifetime of the daemon
+preloaded_modules = [
+    "shepherd_core.inventory",
+    "shepherd_sheep.eeprom",
+    "shepherd_sheep.task_runner",
+]
+
+
+def forward_to_daemon(argv: list[str], path: Path = socket_path) -> int | None:
+    """Lets the daemon run the command and replays its log.
+
+    Args:
+        argv: arguments of the CLI call, without program-name
+        path: unix socket of daemon
+
+    Returns:
+        exit-code of command or None if daemon is not available / rejected request
+    """
+    if not path.exists():
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path.as_posix())
+    except OSError as xcp:
+        sock.close()
+        log.debug("Daemon not reachable (%s) -> will run locally", xcp)
+        return None
+    request = {"version": __version__, "argv": argv, "cwd": Path.cwd().as_posix()}
+
+    def cancel_command(signum: int, _frame: FrameType | None) -> None:
+        # daemon stops the command, client keeps replaying its log until exit
+        log.warning("Cancelling command in daemon (%s)", signal.Signals(signum).name)
+        with suppress(OSError):
+            message = {"cancel": signal.Signals(signum).name}
+            sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+    handlers_prev = {}
+    if threading.current_thread() is threading.main_thread():
+        handlers_prev = {
+            _sig: signal.signal(_sig, cancel_command) for _sig in (signal.SIGTERM, signal.SIGINT)
+        }
+    try:
+        with sock, sock.makefile("rwb") as stream:
+            stream.write(json.dumps(request).encode("utf-8") + b"\n")
+            stream.flush()
+            for line in stream:
+                reply = json.loads(line)
+                if "log" in reply:
+                    log.handle(logging.makeLogRecord({**reply["log"], "from_daemon": True}))
+                elif "exit" in reply:
+                    return int(reply["exit"])
+                elif "reject" in reply:
+                    log.debug("Daemon rejected request (%s) -> will run locally", reply["reject"])
+                    return None
+    finally:
+        # i.e. local run after reject needs the regular handlers
+        for signum, handler in handlers_prev.items():
+            signal.signal(signum, handler)
+    log.error("Daemon closed connection before command finished")
+    return 1
+
+
+class _LogForwarder(logging.Handler):
+    """Streams log-records to client, with the same level-filter as the console."""
+
+    def __init__(self, stream: IO[bytes]) -> None:
+        super().__init__()
+        self.stream = stream
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if record.levelno < console_handler.level or getattr(record, "from_daemon", False):
+            return
+        data = {
+            "name": str(record.name),  # console-handler may have wrapped it
+            "levelno": record.levelno,
+            "levelname": logging.getLevelName(record.levelno),
+            "msg": self.format(record),
+        }
+        # client might be gone, the watcher of the request cancels the command then
+        with suppress(OSError):
+            self.stream.write(json.dumps({"log": data}).encode("utf-8") + b"\n")
+            self.stream.flush()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    server: "SheepDaemon"
+
+    def _send(self, reply: dict) -> None:
+        with suppress(OSError):
+            self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            log.warning("[%s] Received malformed request", type(self.server).__name__)
+            return
+        if request.get("version") != __version__:
+            self._send({"reject": f"version mismatch, daemon runs v{__version__}"})
+            return
+        argv = [str(_arg) for _arg in request.get("argv", [])]
+        command = next((_arg for _arg in argv if not _arg.startswith("-")), None)
+        if command not in forwarded_commands:
+            self._send({"reject": f"command '{command}' is not handled by daemon"})
+            return
+        watcher = threading.Thread(target=self._watch, daemon=True)
+        watcher.start()
+        exit_code = self.server.execute(argv, Path(request.get("cwd", "/")), self.wfile, owner=self)
+        self._send({"exit": exit_code})
+
+    def _watch(self) -> None:
+        """Cancels the command on request of the client or when it disconnects."""
+        while True:
+            try:
+                line = self.rfile.readline()
+            except OSError:
+                line = b""
+            if not line:
+                self.server.cancel(self, "client disconnected")
+                return
+            with suppress(ValueError):
+                message = json.loads(line)
+                if "cancel" in message:
+                    self.server.cancel(self, f"client received {message['cancel']}")
+                    return
+
+
+class CommandCancelledError(SystemExit):
+    """Raised inside a running command, same as SIGTERM does for a local sheep."""
+
+
+class SheepDaemon(socketserver.UnixStreamServer):
+    """Runs forwarded CLI-commands one after another in this process.
+
+    Requests are handled sequentially, as the hardware can only serve one task.
+
+    Args:
+        command: CLI that executes the forwarded commands
+        path: unix socket to listen on
+    """
+
+    def __init__(self, command: click.Group, path: Path = socket_path) -> None:
+        self.command = command
+        self.path = path
+        self.verbose = get_verbosity()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.unlink(missing_ok=True)  # leftover of a crashed daemon
+        super().__init__(path.as_posix(), _RequestHandler)
+        path.chmod(0o660)
+        # owner (request) and thread of the running command
+        self._running: tuple[object, int] | None = None
+        self._lock = threading.Lock()
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.path.unlink(missing_ok=True)
+
+    def warm_up(self) -> None:
+        """Imports heavy modules and retrieves the calibration ahead of the first request."""
+        for name in preloaded_modules:
+            importlib.import_module(name)
+        # calibration stays in RAM as long as the EEPROM-content does not change
+        importlib.import_module("shepherd_sheep.eeprom").retrieve_calibration()
+
+    def cancel(self, owner: object, reason: str) -> bool:
+        """Stops the command of owner (if still running) by raising CommandCancelledError in it.
+
+        Returns True if the command got cancelled.
+        """
+        with self._lock:
+            if self._running is None or self._running[0] is not owner:
+                return False
+            thread_id = self._running[1]
+            # only once per command, exception gets raised at next bytecode of thread
+            self._running = None
+            log.warning("[%s] Cancelling command (%s)", type(self).__name__, reason)
+            ctypes.pythonapi.PyThreadState_SetAsyncExc(
+                ctypes.c_ulong(thread_id), ctypes.py_object(CommandCancelledError)
+            )
+        return True
+
+    def execute(
+        self, argv: list[str], cwd: Path, stream: IO[bytes], owner: object | None = None
+    ) -> int:
+        """Runs a CLI-call in this process while streaming its log to the client.
+
+        The command can be stopped via cancel(owner, ...) while it runs.
+        """
+        log.debug("[%s] Executing '%s'", type(self).__name__, " ".join(argv))
+        handler = _LogForwarder(stream)
+        log.addHandler(handler)
+        cwd_prev = Path.cwd()
+        exit_code: int | None = 1
+        try:
+            os.chdir(cwd)  # for relative paths
+            with self._lock:
+                self._running = (owner, threading.get_ident())
+            try:
+                exit_code = self.command.main(
+                    args=argv,
+                    prog_name="shepherd-sheep",
+                    standalone_mode=False,
+                    obj={"in_daemon": True},
+                )
+            finally:
+                with self._lock:
+                    self._running = None
+        except SystemExit as xcp:
+            # cancelled or command called sys.exit() - daemon has to survive both
+            log.warning("[%s] Command exited early", type(self).__name__)
+            exit_code = xcp.code if isinstance(xcp.code, int) else 1
+        except click.ClickException as xcp:
+            log.error(xcp.format_message())
+            exit_code = xcp.exit_code
+        except click.Abort:
+            exit_code = 1
+        except Exception:  # noqa: BLE001
+            # daemon has to survive failing commands
+            log.exception("[%s] Command failed", type(self).__name__)
+            exit_code = 1
+        finally:
+            log.removeHandler(handler)
+            os.chdir(cwd_prev)
+            if not self.verbose:
+                reset_verbosity(force=True)
+        return exit_code if isinstance(exit_code, int) else 0
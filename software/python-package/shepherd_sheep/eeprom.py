@@ -9,6 +9,7 @@ through Linux I2C device driver.
 
 import os
 import struct
+import zlib
 from contextlib import suppress
 from types import TracebackType
 
@@ -16,6 +17,7 @@ from shepherd_core.data_models.base.calibration import CalibrationCape
 from shepherd_core.data_models.base.calibration import CapeData
 from typing_extensions import Self
 
+from . import cache
 from .logger import log
 
 # allow importing shepherd on x86 - for testing
@@ -35,6 +37,10 @@ eeprom_format = {
 
 # The shepherd calibration data is stored in binary format
 calibration_data_format = {"offset": 512, "size": 128, "type": "binary"}
+cape_data_size = max(_v["offset"] + _v["size"] for _v in eeprom_format.values())
+
+# last retrieved calibration, kept with fingerprint of EEPROM-content
+_calibration_memo: tuple[str, CalibrationCape] | None = None
 
 
 class EEPROM:
@@ -81,6 +87,18 @@ class EEPROM:
         os.lseek(self.fd, address, 0)
         return os.read(self.fd, n_bytes)
 
+    def fingerprint(self) -> str:
+        """Cheap identifier of stored content (cape-data & calibration).
+
+        Two raw reads instead of reading field by field and parsing.
+        """
+        crc = zlib.crc32(self._read(0, cape_data_size))
+        crc = zlib.crc32(
+            self._read(calibration_data_format["offset"], calibration_data_format["size"]),
+            crc,
+        )
+        return f"{crc:08x}"
+
     def _write(self, address: int, buffer: bytes) -> None:
         """Writes binary data from byte buffer to given address.
 
@@ -190,6 +208,7 @@ class EEPROM:
                 f"but got {len(data_serialized)}"
             )
             raise ValueError(msg)
+        clear_calibration_cache()
         self._write(calibration_data_format["offset"], data_serialized)
         self._write_cape_data(cal_cape.cape)
 
@@ -215,13 +234,36 @@ class EEPROM:
         return cal
 
 
+def clear_calibration_cache() -> None:
+    """Drops calibration kept in RAM and on disk, i.e. after EEPROM got written."""
+    global _calibration_memo  # noqa: PLW0603
+    _calibration_memo = None
+    cache.clear("calibration")
+
+
+def _read_calibration_cached(storage: EEPROM) -> CalibrationCape:
+    """Full read & parse only happens when content of EEPROM changed."""
+    global _calibration_memo  # noqa: PLW0603
+    fingerprint = storage.fingerprint()
+    if _calibration_memo is not None and _calibration_memo[0] == fingerprint:
+        return _calibration_memo[1]
+    cal = cache.load("calibration", fingerprint)
+    if isinstance(cal, CalibrationCape):
+        log.debug("Using cached calibration (EEPROM-fingerprint = %s)", fingerprint)
+    else:
+        cal = storage.read_calibration()
+        cache.store("calibration", fingerprint, cal, max_entries=1)
+    _calibration_memo = (fingerprint, cal)
+    return cal
+
+
 def retrieve_calibration(*, use_default_cal: bool = False) -> CalibrationCape:
     if use_default_cal:
         return CalibrationCape()
 
     try:
         with EEPROM() as storage:
-            return storage.read_calibration()
+            return _read_calibration_cached(storage)
     except ValueError:
         log.warning(
             "Couldn't read calibration from EEPROM (ValueError). Falling back to default values.",
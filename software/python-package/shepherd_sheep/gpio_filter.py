@@ -0,0 +1,81 @@
+"""
+shepherd.gpio_filter
+~~~~~
+Optional compaction of the GPIO-stream between PRU-buffer and Writer.
+
+PRU1 logs a bitmask whenever a traced pin changes. After masking, records
+that repeat the state before them carry no information - the stream is a
+run-length-encoding already (state + timestamp of its begin), duplicates
+only split runs. Optionally, states shorter than a glitch-threshold get
+removed as well. Counters keep track of what was dropped.
+
+"""
+
+import numpy as np
+
+from .shared_mem_gpio_output import GPIOTrace
+
+
+class GpioFilter:
+    """Removes redundant records (and glitches) from GPIO-traces in place.
+
+    Args:
+        mask: pins that are kept, others get cleared
+        glitch_ns: states lasting shorter than this get removed, 0 disables.
+            The last record of each trace is kept, as its duration is unknown.
+    """
+
+    def __init__(self, mask: int = 0xFFFF, glitch_ns: int = 0) -> None:
+        self.mask = np.uint16(mask)
+        self.glitch_ns = glitch_ns
+        self.samples_n: int = 0
+        self.duplicates_n: int = 0
+        self.glitches_n: int = 0
+        # state after last kept record
+        self._last: int | None = None
+
+    def apply(self, data: GPIOTrace) -> GPIOTrace:
+        """Compacts trace in place, result can be empty but stays releasable to its pool."""
+        len_in = len(data)
+        if len_in < 1:
+            return data
+        timestamps = data.timestamps_ns[:len_in]
+        bitmasks = np.bitwise_and(data.bitmasks[:len_in], self.mask)
+        keep = self._changes(bitmasks)
+        self.duplicates_n += len_in - int(np.count_nonzero(keep))
+        if self.glitch_ns > 0:
+            positions = np.flatnonzero(keep)
+            durations = np.diff(timestamps[positions])
+            glitches = positions[:-1][durations < self.glitch_ns]
+            if glitches.size > 0:
+                keep[glitches] = False
+                self.glitches_n += glitches.size
+                # removing a pulse leaves two records with the same state
+                positions = np.flatnonzero(keep)
+                merged = self._changes(bitmasks[positions])
+                self.duplicates_n += positions.size - int(np.count_nonzero(merged))
+                keep[positions[~merged]] = False
+        len_out = int(np.count_nonzero(keep))
+        if len_out > 0:
+            self._last = int(bitmasks[keep][-1])
+        data.timestamps_ns[:len_out] = timestamps[keep]
+        data.bitmasks[:len_out] = bitmasks[keep]
+        data.timestamps_ns = data.timestamps_ns[:len_out]
+        data.bitmasks = data.bitmasks[:len_out]
+        self.samples_n += len_in
+        return data
+
+    def _changes(self, bitmasks: np.ndarray) -> np.ndarray:
+        """True for records that differ from the state before."""
+        changes = np.empty(bitmasks.size, dtype=bool)
+        changes[1:] = bitmasks[1:] != bitmasks[:-1]
+        changes[0] = self._last is None or int(bitmasks[0]) != self._last
+        return changes
+
+    def summary(self) -> str:
+        removed = self.duplicates_n + self.glitches_n
+        share = 100 * removed / self.samples_n if self.samples_n > 0 else 0.0
+        return (
+            f"{removed} of {self.samples_n} gpio-records removed ({share:.1f} %), "
+            f"{self.duplicates_n} duplicates, {self.glitches_n} glitches"
+        )
@@ -18,18 +18,22 @@ class Monitor(ABC):
         compression: Compression | None = Compression.default,
         poll_interval: float = 0.25,
         increment: int = 100,
+        *,
+        swmr: bool = False,
     ) -> None:
         self.data: h5py.Group = target
         self.poll_interval: float = poll_interval
         self.position: int = 0
         self.increment: int = increment
+        # SWMR-readers can't tell pre-grown rows from data -> grow by rows written
+        self.swmr: bool = swmr
         self.event = threading.Event()
         self.thread: threading.Thread | None = None
 
         # create time, others have to be created in main class
         self.data.create_dataset(
             name="time",
-            shape=(self.increment,),
+            shape=(self.rows_init,),
             dtype="u8",
             maxshape=(None,),
             chunks=True,
@@ -58,6 +62,17 @@ class Monitor(ABC):
             self.data["time"].shape[0],
         )
 
+    @property
+    def rows_init(self) -> int:
+        """Rows that datasets get created with."""
+        return 0 if self.swmr else self.increment
+
+    def grow_to(self, length: int, pos_end: int) -> int:
+        """New length of datasets (currently length) to write up to pos_end (exclusive)."""
+        if self.swmr:
+            return pos_end
+        return length + max(self.increment, pos_end - length)
+
     @abstractmethod
     def thread_fn(self) -> None:
         pass
@@ -17,13 +17,15 @@ class KernelMonitor(Monitor):
         target: h5py.Group,
         compression: Compression | None = Compression.default,
         backlog: int = 60,
+        *,
+        swmr: bool = False,
     ) -> None:
-        super().__init__(target, compression, poll_interval=0.52)
+        super().__init__(target, compression, poll_interval=0.52, swmr=swmr)
         self.backlog = backlog
 
         self.data.create_dataset(
             name="message",
-            shape=(self.increment,),
+            shape=(self.rows_init,),
             dtype=h5py.special_dtype(vlen=str),
             maxshape=(None,),
             chunks=True,
@@ -86,7 +88,7 @@ class KernelMonitor(Monitor):
             try:
                 data_length = self.data["time"].shape[0]
                 if self.position >= data_length:
-                    data_length += self.increment
+                    data_length = self.grow_to(data_length, self.position + 1)
                     self.data["time"].resize((data_length,))
                     self.data["message"].resize((data_length,))
             except RuntimeError:
@@ -16,11 +16,13 @@ class NTPMonitor(Monitor):
         self,
         target: h5py.Group,
         compression: Compression | None = Compression.default,
+        *,
+        swmr: bool = False,
     ) -> None:
-        super().__init__(target, compression, poll_interval=0.99)
+        super().__init__(target, compression, poll_interval=0.99, swmr=swmr)
         self.data.create_dataset(
             name="message",
-            shape=(self.increment,),
+            shape=(self.rows_init,),
             dtype=h5py.special_dtype(vlen=str),
             maxshape=(None,),
             chunks=True,
@@ -87,7 +89,7 @@ class NTPMonitor(Monitor):
             try:
                 data_length = self.data["time"].shape[0]
                 if self.position >= data_length:
-                    data_length += self.increment
+                    data_length = self.grow_to(data_length, self.position + 1)
                     self.data["time"].resize((data_length,))
                     self.data["message"].resize((data_length,))
             except RuntimeError:
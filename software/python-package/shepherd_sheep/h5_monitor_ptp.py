@@ -16,11 +16,13 @@ class PTPMonitor(Monitor):
         self,
         target: h5py.Group,
         compression: Compression | None = Compression.default,
+        *,
+        swmr: bool = False,
     ) -> None:
-        super().__init__(target, compression, poll_interval=0.51)
+        super().__init__(target, compression, poll_interval=0.51, swmr=swmr)
         self.data.create_dataset(
             name="values",
-            shape=(self.increment, 3),
+            shape=(self.rows_init, 3),
             dtype="i8",
             maxshape=(None, 3),
             chunks=True,
@@ -97,7 +99,7 @@ class PTPMonitor(Monitor):
             try:
                 data_length = self.data["time"].shape[0]
                 if self.position >= data_length:
-                    data_length += self.increment
+                    data_length = self.grow_to(data_length, self.position + 1)
                     self.data["time"].resize((data_length,))
                     self.data["values"].resize((data_length, 3))
             except RuntimeError:
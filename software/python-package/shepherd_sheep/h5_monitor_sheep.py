@@ -15,19 +15,21 @@ class SheepMonitor(Monitor):
         self,
         target: h5py.Group,
         compression: Compression | None = Compression.default,
+        *,
+        swmr: bool = False,
     ) -> None:
-        super().__init__(target, compression, poll_interval=0.25)
+        super().__init__(target, compression, poll_interval=0.25, swmr=swmr)
         self.queue = get_message_queue()
         self.data.create_dataset(
             name="message",
-            shape=(self.increment,),
+            shape=(self.rows_init,),
             dtype=h5py.special_dtype(vlen=str),
             maxshape=(None,),
             chunks=True,
         )
         self.data.create_dataset(
             name="level",
-            shape=(self.increment,),
+            shape=(self.rows_init,),
             dtype="uint8",
             maxshape=(None,),
             chunks=True,
@@ -72,7 +74,7 @@ class SheepMonitor(Monitor):
                 try:
                     data_length = self.data["time"].shape[0]
                     if self.position >= data_length:
-                        data_length += self.increment
+                        data_length = self.grow_to(data_length, self.position + 1)
                         self.data["time"].resize((data_length,))
                         self.data["message"].resize((data_length,))
                         self.data["level"].resize((data_length,))
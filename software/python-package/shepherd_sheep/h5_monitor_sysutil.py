@@ -16,14 +16,21 @@ class SysUtilMonitor(Monitor):
         self,
         target: h5py.Group,
         compression: Compression | None = Compression.default,
+        rss_limit: int | None = None,
+        *,
+        swmr: bool = False,
     ) -> None:
-        super().__init__(target, compression, poll_interval=0.3)
+        super().__init__(target, compression, poll_interval=0.3, swmr=swmr)
         self.log_interval_ns: int = 1 * (10**9)  # step-size is 1 s
         self.log_timestamp_ns: int = 0
+        # memory of sheep-process, warned once when over budget
+        self.process = psutil.Process()
+        self.rss_limit: int | None = rss_limit
+        self.rss_warned: bool = False
 
         self.data.create_dataset(
             name="cpu",
-            shape=(self.increment,),
+            shape=(self.rows_init,),
             dtype="u1",
             maxshape=(None,),
             chunks=self.increment,
@@ -32,7 +39,7 @@ class SysUtilMonitor(Monitor):
         self.data["cpu"].attrs["description"] = "cpu_util [%]"
         self.data.create_dataset(
             name="ram",
-            shape=(self.increment, 2),
+            shape=(self.rows_init, 2),
             dtype="u1",
             maxshape=(None, 2),
             chunks=(self.increment, 2),
@@ -41,7 +48,7 @@ class SysUtilMonitor(Monitor):
         self.data["ram"].attrs["description"] = "ram_available [%], ram_used [%]"
         self.data.create_dataset(
             name="io",
-            shape=(self.increment, 4),
+            shape=(self.rows_init, 4),
             dtype="u8",
             maxshape=(None, 4),
             chunks=(self.increment, 4),
@@ -52,13 +59,24 @@ class SysUtilMonitor(Monitor):
         )
         self.data.create_dataset(
             name="net",
-            shape=(self.increment, 2),
+            shape=(self.rows_init, 2),
             dtype="u8",
             maxshape=(None, 2),
             chunks=(self.increment, 2),
         )
         self.data["net"].attrs["unit"] = "n"
         self.data["net"].attrs["description"] = "nw_sent [byte], nw_recv [byte]"
+        self.data.create_dataset(
+            name="rss",
+            shape=(self.rows_init,),
+            dtype="u8",
+            maxshape=(None,),
+            chunks=self.increment,
+        )
+        self.data["rss"].attrs["unit"] = "byte"
+        self.data["rss"].attrs["description"] = "resident memory of sheep-process [byte]"
+        if rss_limit is not None:
+            self.data["rss"].attrs["limit"] = rss_limit
 
         if psutil.disk_io_counters() is None:
             log.info(
@@ -95,8 +113,22 @@ class SysUtilMonitor(Monitor):
         self.data["ram"].resize((self.position, 2))
         self.data["io"].resize((self.position, 4))
         self.data["net"].resize((self.position, 2))
+        self.data["rss"].resize((self.position,))
         super().__exit__()
 
+    def check_rss(self) -> int:
+        """Resident memory of this process, warns (once) if it exceeds the budget."""
+        rss = self.process.memory_info().rss
+        if self.rss_limit is not None and rss > self.rss_limit and not self.rss_warned:
+            log.warning(
+                "[%s] Memory of sheep (%d MiB) exceeds budget (%d MiB)",
+                type(self).__name__,
+                rss // 2**20,
+                self.rss_limit // 2**20,
+            )
+            self.rss_warned = True
+        return rss
+
     def thread_fn(self) -> None:
         """Captures state of system in a fixed interval
             https://psutil.readthedocs.io/en/latest/#cpu
@@ -107,12 +139,13 @@ class SysUtilMonitor(Monitor):
             if ts_now_ns >= self.log_timestamp_ns:
                 data_length = self.data["time"].shape[0]
                 if self.position >= data_length:
-                    data_length += self.increment
+                    data_length = self.grow_to(data_length, self.position + 1)
                     self.data["time"].resize((data_length,))
                     self.data["cpu"].resize((data_length,))
                     self.data["ram"].resize((data_length, 2))
                     self.data["io"].resize((data_length, 4))
                     self.data["net"].resize((data_length, 2))
+                    self.data["rss"].resize((data_length,))
                 self.log_timestamp_ns += self.log_interval_ns
                 if self.log_timestamp_ns < ts_now_ns:
                     self.log_timestamp_ns = int(time.time() * 1e9)
@@ -129,6 +162,7 @@ class SysUtilMonitor(Monitor):
                 nw_now = np.array(psutil.net_io_counters()[0:2])
                 self.data["net"][self.position, :] = nw_now - self.nw_last
                 self.nw_last = nw_now
+                self.data["rss"][self.position] = self.check_rss()
                 self.position += 1
                 # TODO: add temp, not working:
                 #  https://psutil.readthedocs.io/en/latest/#psutil.sensors_temperatures
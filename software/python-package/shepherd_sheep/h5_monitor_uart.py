@@ -19,13 +19,15 @@ class UARTMonitor(Monitor):
         compression: Compression | None = Compression.default,
         uart: str = "/dev/ttyS1",
         config: UartLogging | None = None,
+        *,
+        swmr: bool = False,
     ) -> None:
-        super().__init__(target, compression, poll_interval=0.05)
+        super().__init__(target, compression, poll_interval=0.05, swmr=swmr)
         self.uart = uart
         self.config = config
         self.data.create_dataset(
             name="message",
-            shape=(self.increment,),
+            shape=(self.rows_init,),
             dtype=h5py.special_dtype(vlen=bytes),
             maxshape=(None,),
             chunks=True,
@@ -105,7 +107,7 @@ class UARTMonitor(Monitor):
                         if len(output) > 0:
                             data_length = self.data["time"].shape[0]
                             if self.position >= data_length:
-                                data_length += self.increment
+                                data_length = self.grow_to(data_length, self.position + 1)
                                 self.data["time"].resize((data_length,))
                                 self.data["message"].resize((data_length,))
                             self.data["time"][self.position] = int(
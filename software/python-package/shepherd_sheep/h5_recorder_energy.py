@@ -0,0 +1,149 @@
+"""
+shepherd.h5_recorder_energy
+~~~~~
+Energy, charge & power-statistics of the IV-data, computed while recording.
+
+Every written segment gets calibrated and reduced to one row. Totals are
+kept as attributes of the group and logged at the end, so the result of
+a run can be collected without reading the full-rate datasets.
+
+"""
+
+from types import TracebackType
+
+import h5py
+import numpy as np
+from shepherd_core import Compression
+
+from . import commons
+from .h5_monitor_abc import Monitor
+from .logger import log
+
+# columns of the value-dataset
+ENERGY_COLUMNS: tuple[str, ...] = ("energy", "charge", "power_min", "power_mean", "power_max")
+
+
+class EnergyRecorder(Monitor):
+    """Per segment: energy [J], charge [C] and min, mean & max of power [W].
+
+    Args:
+        target: group to store into
+        cal_attrs: attributes of raw datasets (voltage, current) with gain & offset
+    """
+
+    def __init__(
+        self,
+        target: h5py.Group,
+        cal_attrs: dict[str, dict],
+        compression: Compression | None = Compression.default,
+        *,
+        swmr: bool = False,
+    ) -> None:
+        super().__init__(target, compression, poll_interval=0, increment=1000, swmr=swmr)
+        self.data["time"].attrs["description"] += ", start of segment"
+        self.data.create_dataset(
+            name="values",
+            shape=(self.rows_init, len(ENERGY_COLUMNS)),
+            dtype="f8",
+            maxshape=(None, len(ENERGY_COLUMNS)),
+            chunks=(self.increment, len(ENERGY_COLUMNS)),
+            compression=compression,
+        )
+        self.data["values"].attrs["unit"] = "J, C, W, W, W"
+        self.data["values"].attrs["description"] = ", ".join(ENERGY_COLUMNS)
+        self.gain_v: float = float(cal_attrs["voltage"]["gain"])
+        self.offset_v: float = float(cal_attrs["voltage"]["offset"])
+        self.gain_c: float = float(cal_attrs["current"]["gain"])
+        self.offset_c: float = float(cal_attrs["current"]["offset"])
+        self._ds_time: h5py.Dataset = self.data["time"]
+        self._ds_values: h5py.Dataset = self.data["values"]
+        self._pending: list[tuple[int, tuple[float, ...]]] = []
+        # totals over the whole run
+        self.energy_J: float = 0.0
+        self.charge_C: float = 0.0
+        self.power_max_W: float = 0.0
+        self.samples_n: int = 0
+
+    def __exit__(
+        self,
+        typ: type[BaseException] | None = None,
+        exc: BaseException | None = None,
+        tb: TracebackType | None = None,
+        extra_arg: int = 0,
+    ) -> None:
+        self.flush()
+        self._ds_values.resize((self.position, len(ENERGY_COLUMNS)))
+        super().__exit__()
+
+    def store_totals(self, target: h5py.Group | None = None) -> None:
+        """Stores totals of the run as attributes of the group (or target) and logs them.
+
+        Separate from exit, as attributes can't be added while file is in SWMR-mode.
+        """
+        target = self.data if target is None else target
+        duration_s = self.samples_n * commons.SAMPLE_INTERVAL_S
+        target.attrs["energy_J"] = self.energy_J
+        target.attrs["charge_C"] = self.charge_C
+        target.attrs["power_mean_W"] = self.energy_J / duration_s if duration_s > 0 else 0.0
+        target.attrs["power_max_W"] = self.power_max_W
+        target.attrs["duration_s"] = duration_s
+        log.info(
+            "[%s] %.6f J, %.6f C, power mean = %.6f W, max = %.6f W over %.1f s",
+            type(self).__name__,
+            self.energy_J,
+            self.charge_C,
+            target.attrs["power_mean_W"],
+            self.power_max_W,
+            duration_s,
+        )
+
+    def write(self, timestamp_ns: int, voltage: np.ndarray, current: np.ndarray) -> None:
+        """Reduces a segment of raw samples to one row."""
+        if voltage.size < 1:
+            return
+        voltage_V = voltage * self.gain_v
+        voltage_V += self.offset_v
+        current_A = current * self.gain_c
+        current_A += self.offset_c
+        power_W = np.multiply(voltage_V, current_A, out=voltage_V)
+        energy_J = float(power_W.sum()) * commons.SAMPLE_INTERVAL_S
+        charge_C = float(current_A.sum()) * commons.SAMPLE_INTERVAL_S
+        power_max_W = float(power_W.max())
+        self._pending.append(
+            (
+                timestamp_ns,
+                (
+                    energy_J,
+                    charge_C,
+                    float(power_W.min()),
+                    energy_J / (voltage.size * commons.SAMPLE_INTERVAL_S),
+                    power_max_W,
+                ),
+            )
+        )
+        self.energy_J += energy_J
+        self.charge_C += charge_C
+        self.power_max_W = max(self.power_max_W, power_max_W)
+        self.samples_n += voltage.size
+        if len(self._pending) >= self.increment:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes queued rows to file."""
+        if len(self._pending) < 1:
+            return
+        timestamps = np.array([_p[0] for _p in self._pending], dtype=np.uint64)
+        values = np.array([_p[1] for _p in self._pending], dtype=np.float64)
+        self._pending = []
+        pos_end = self.position + timestamps.size
+        data_length = self._ds_time.shape[0]
+        if pos_end >= data_length:
+            data_length = self.grow_to(data_length, pos_end)
+            self._ds_time.resize((data_length,))
+            self._ds_values.resize((data_length, len(ENERGY_COLUMNS)))
+        self._ds_time[self.position : pos_end] = timestamps
+        self._ds_values[self.position : pos_end, :] = values
+        self.position = pos_end
+
+    def thread_fn(self) -> None:
+        raise NotImplementedError
@@ -1,6 +1,7 @@
 from types import TracebackType
 
 import h5py
+import numpy as np
 import yaml
 from shepherd_core import Compression
 
@@ -9,20 +10,38 @@ from .h5_monitor_abc import Monitor
 from .shared_mem_gpio_output import GPIOTrace
 from .shared_mem_gpio_output import SharedMemGPIOOutput
 
+# edges (of all pins) that get buffered before writing
+EDGE_BATCH_N: int = 10_000
+EDGE_DIRECTIONS: tuple[str, ...] = ("rising", "falling")
+
 
 class GpioRecorder(Monitor):
+    """Stores the raw bitmask-stream and derives per-pin edges from it.
+
+    The raw stream (time, value) stays the source of truth. For every pin of
+    GPIO_LOG_BIT_POSITIONS the timestamps of rising and falling edges go to
+    edges/<pin-name>/{rising, falling}, edges/count holds the totals.
+    The first sample only sets the initial state and is no edge.
+    """
+
     def __init__(
         self,
         target: h5py.Group,
         compression: Compression | None = Compression.default,
+        *,
+        swmr: bool = False,
     ) -> None:
         super().__init__(
-            target, compression, poll_interval=0, increment=SharedMemGPIOOutput.N_SAMPLES_PER_CHUNK
+            target,
+            compression,
+            poll_interval=0,
+            increment=SharedMemGPIOOutput.N_SAMPLES_PER_CHUNK,
+            swmr=swmr,
         )
 
         self.data.create_dataset(
             name="value",
-            shape=(self.increment,),
+            shape=(self.rows_init,),
             dtype="u2",
             maxshape=(None,),
             chunks=(self.increment,),
@@ -35,6 +54,42 @@ class GpioRecorder(Monitor):
             sort_keys=False,
         )
 
+        self.pins: tuple[int, ...] = tuple(GPIO_LOG_BIT_POSITIONS)
+        grp_edges = self.data.create_group("edges")
+        grp_edges.attrs["description"] = "edges per pin derived from value"
+        self._ds_edges: list[list[h5py.Dataset]] = []
+        for pin in self.pins:
+            grp_pin = grp_edges.create_group(GPIO_LOG_BIT_POSITIONS[pin]["name"])
+            grp_pin.attrs["bit"] = pin
+            datasets = []
+            for direction in EDGE_DIRECTIONS:
+                dataset = grp_pin.create_dataset(
+                    name=direction,
+                    shape=(0,),
+                    dtype="u8",
+                    maxshape=(None,),
+                    chunks=(EDGE_BATCH_N,),
+                    compression=compression,
+                )
+                dataset.attrs["unit"] = "ns"
+                dataset.attrs["description"] = f"system time of {direction} edges [ns]"
+                datasets.append(dataset)
+            self._ds_edges.append(datasets)
+        # updated in place, no attributes while SWMR is active
+        self._ds_count: h5py.Dataset = grp_edges.create_dataset(
+            name="count",
+            data=np.zeros((len(self.pins), len(EDGE_DIRECTIONS)), dtype="u8"),
+        )
+        self._ds_count.attrs["description"] = "rising, falling edges per pin (rows by bit)"
+        self.edge_counts = np.zeros((len(self.pins), len(EDGE_DIRECTIONS)), dtype=np.uint64)
+        self._masks = [np.uint16(1 << _pin) for _pin in self.pins]
+        # state of pins after last sample, edges waiting for flush
+        self._last: int | None = None
+        self._pending: list[list[list[np.ndarray]]] = [
+            [[] for _ in EDGE_DIRECTIONS] for _ in self.pins
+        ]
+        self._pending_n: int = 0
+
     def __exit__(
         self,
         typ: type[BaseException] | None = None,
@@ -42,22 +97,70 @@ class GpioRecorder(Monitor):
         tb: TracebackType | None = None,
         extra_arg: int = 0,
     ) -> None:
+        self.flush()
         self.data["value"].resize((self.position,))
         super().__exit__()
 
-    def write(self, data: GPIOTrace) -> None:
+    def write(self, data: GPIOTrace) -> tuple[np.ndarray, ...] | None:
+        """Appends trace, returns the chunk as stored (for the checksum)."""
         len_new = len(data)
         if len_new < 1:
-            return
+            return None
         pos_end = self.position + len_new
         data_length = self.data["time"].shape[0]
         if pos_end >= data_length:
-            data_length += max(self.increment, pos_end - data_length)
+            data_length = self.grow_to(data_length, pos_end)
             self.data["time"].resize((data_length,))
             self.data["value"].resize((data_length,))
-        self.data["time"][self.position : pos_end] = data.timestamps_ns
-        self.data["value"][self.position : pos_end] = data.bitmasks
+        timestamps = np.asarray(data.timestamps_ns[:len_new], dtype=np.uint64)
+        bitmasks = np.asarray(data.bitmasks[:len_new], dtype=np.uint16)
+        self.data["time"][self.position : pos_end] = timestamps
+        self.data["value"][self.position : pos_end] = bitmasks
         self.position = pos_end
+        self._derive_edges(timestamps, bitmasks)
+        return timestamps, bitmasks
+
+    def _derive_edges(self, timestamps: np.ndarray, bitmasks: np.ndarray) -> None:
+        """Queues timestamps of rising & falling edges per pin."""
+        previous = np.empty_like(bitmasks)
+        previous[1:] = bitmasks[:-1]
+        previous[0] = bitmasks[0] if self._last is None else self._last
+        self._last = int(bitmasks[-1])
+        changes = np.bitwise_xor(bitmasks, previous)
+        # only few samples carry edges of a certain pin -> reduce first
+        positions = np.flatnonzero(changes)
+        if positions.size < 1:
+            return
+        changes = changes[positions]
+        rising = np.bitwise_and(changes, bitmasks[positions])
+        falling = np.bitwise_xor(changes, rising)
+        timestamps = timestamps[positions]
+        for num, mask in enumerate(self._masks):
+            for direction, edges in enumerate((rising, falling)):
+                hits = timestamps[np.bitwise_and(edges, mask) > 0]
+                if hits.size > 0:
+                    self._pending[num][direction].append(hits)
+                    self.edge_counts[num, direction] += hits.size
+                    self._pending_n += hits.size
+        if self._pending_n >= EDGE_BATCH_N:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes queued edges and updates counts."""
+        if self._pending_n < 1:
+            return
+        for num, datasets in enumerate(self._ds_edges):
+            for direction, dataset in enumerate(datasets):
+                pending = self._pending[num][direction]
+                if len(pending) < 1:
+                    continue
+                edges = np.concatenate(pending) if len(pending) > 1 else pending[0]
+                pos = dataset.shape[0]
+                dataset.resize((pos + edges.size,))
+                dataset[pos:] = edges
+                self._pending[num][direction] = []
+        self._ds_count[:, :] = self.edge_counts
+        self._pending_n = 0
 
     def thread_fn(self) -> None:
         raise NotImplementedError
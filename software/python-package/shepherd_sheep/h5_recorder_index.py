@@ -0,0 +1,151 @@
+"""
+shepherd.h5_recorder_index
+~~~~~
+Time-to-sample index of the streams in a recording.
+
+For every chunk written to a stream (IV-data, gpio, pru_util) a row of
+(timestamp of first sample [ns], offset, length, crc32) gets appended to
+index/<stream>. Seeking a point in time then takes a bisection over the
+index and a single read of one chunk of timestamps - no matter how long
+the recording is or whether segments went missing.
+The checksum covers the chunk in all datasets of the stream (as stored),
+it is computed from a copy of the arrays in RAM, so the file is never read
+back. A background-thread does the computation (zlib releases the GIL) -
+the main-loop only pays for the copy, ~1/10 of the CRC32.
+
+"""
+
+import zlib
+from collections.abc import Mapping
+from collections.abc import Sequence
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from types import TracebackType
+
+import h5py
+import numpy as np
+from shepherd_core import Compression
+
+# rows per stream that get buffered before writing
+INDEX_BATCH_N: int = 1000
+
+
+def chunk_checksum(*arrays: np.ndarray) -> int:
+    """CRC32 over the raw bytes of the arrays, chained in order."""
+    checksum = 0
+    for array in arrays:
+        checksum = zlib.crc32(np.ascontiguousarray(array), checksum)
+    return checksum
+
+
+class IndexRecorder:
+    """Appends one index-row per chunk written to a stream.
+
+    Args:
+        target: group to store into, gets a dataset per stream
+        streams: names of the indexed groups (i.e. "data", "gpio") with
+            their datasets in the order the checksum is computed
+    """
+
+    def __init__(
+        self,
+        target: h5py.Group,
+        streams: Mapping[str, Sequence[str]],
+        compression: Compression | None = Compression.default,
+    ) -> None:
+        self.data: h5py.Group = target
+        self.data.attrs["description"] = (
+            "per written chunk: first timestamp [ns], offset, length, crc32"
+        )
+        self._datasets: dict[str, h5py.Dataset] = {}
+        self._pending: dict[str, list[tuple[int, int, int, Future]]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="Shp.Checksum")
+        for stream, datasets in streams.items():
+            self._datasets[stream] = self.data.create_dataset(
+                name=stream,
+                shape=(0, 4),
+                dtype="u8",
+                maxshape=(None, 4),
+                chunks=(INDEX_BATCH_N, 4),
+                compression=compression,
+            )
+            self._datasets[stream].attrs["unit"] = "ns, n, n, crc32"
+            self._datasets[stream].attrs["datasets"] = ", ".join(datasets)
+            self._pending[stream] = []
+
+    def __exit__(
+        self,
+        typ: type[BaseException] | None = None,
+        exc: BaseException | None = None,
+        tb: TracebackType | None = None,
+        extra_arg: int = 0,
+    ) -> None:
+        for stream in self._datasets:
+            self.flush(stream)
+        self._executor.shutdown(wait=True)
+
+    def add(
+        self, stream: str, timestamp_ns: int, offset: int, length: int, *arrays: np.ndarray
+    ) -> None:
+        """Queues a row, checksum of the arrays (chunk as stored) is computed in background."""
+        # copy, arrays may be pooled and get reused before the checksum is done
+        copies = [np.array(array, order="C") for array in arrays]
+        pending = self._pending[stream]
+        pending.append(
+            (timestamp_ns, offset, length, self._executor.submit(chunk_checksum, *copies))
+        )
+        if len(pending) >= INDEX_BATCH_N:
+            self.flush(stream)
+
+    def flush(self, stream: str) -> None:
+        """Writes buffered rows of stream to file."""
+        pending = self._pending[stream]
+        if len(pending) < 1:
+            return
+        dataset = self._datasets[stream]
+        pos = dataset.shape[0]
+        rows = [(*_row, _checksum.result()) for *_row, _checksum in pending]
+        dataset.resize((pos + len(rows), 4))
+        dataset[pos:, :] = np.array(rows, dtype=np.uint64)
+        self._pending[stream] = []
+
+
+def _find_row(ds_index: h5py.Dataset, timestamp_ns: int) -> int:
+    """Last row that starts at or before timestamp, -1 if there is none."""
+    low, high = 0, ds_index.shape[0]
+    while low < high:
+        mid = (low + high) // 2
+        if int(ds_index[mid, 0]) <= timestamp_ns:
+            low = mid + 1
+        else:
+            high = mid
+    return low - 1
+
+
+def _position(ds_index: h5py.Dataset, ds_time: h5py.Dataset, timestamp_ns: int) -> int:
+    """Position of first sample at or after timestamp."""
+    row = _find_row(ds_index, timestamp_ns)
+    if row < 0:
+        return int(ds_index[0, 1])
+    _, offset, length = (int(_v) for _v in ds_index[row, :3])
+    times = ds_time[offset : offset + length]
+    return offset + int(np.searchsorted(times, timestamp_ns, side="left"))
+
+
+def time_to_slice(h5file: h5py.File, stream: str, start_ns: int, end_ns: int) -> slice:
+    """Samples of stream with start_ns <= timestamp < end_ns.
+
+    Args:
+        h5file: recording with index-group
+        stream: indexed group, i.e. "data", "gpio" or "pru_util"
+        start_ns: begin of time-range, system-time [ns]
+        end_ns: end of time-range (exclusive)
+    """
+    if "index" not in h5file or stream not in h5file["index"]:
+        msg = f"Recording has no index for '{stream}' ({h5file.filename})"
+        raise ValueError(msg)
+    ds_index = h5file["index"][stream]
+    if ds_index.shape[0] < 1 or end_ns <= start_ns:
+        return slice(0, 0)
+    ds_time = h5file[stream]["time"]
+    return slice(_position(ds_index, ds_time, start_ns), _position(ds_index, ds_time, end_ns))
@@ -1,11 +1,15 @@
 from types import TracebackType
 
 import h5py
+import numpy as np
 from shepherd_core import Compression
 
 from . import commons
 from .h5_monitor_abc import Monitor
 from .shared_mem_util_output import UtilTrace
+from .util_analyzer import EVENT_COLUMNS
+from .util_analyzer import HISTOGRAM_EDGES
+from .util_analyzer import UtilAnalyzer
 
 
 class PruRecorder(Monitor):
@@ -13,12 +17,14 @@ class PruRecorder(Monitor):
         self,
         target: h5py.Group,
         compression: Compression | None = Compression.default,
+        *,
+        swmr: bool = False,
     ) -> None:
-        super().__init__(target, compression, poll_interval=0)
+        super().__init__(target, compression, poll_interval=0, swmr=swmr)
 
         self.data.create_dataset(
             name="values",
-            shape=(self.increment, 3),
+            shape=(self.rows_init, 3),
             dtype="u2",
             maxshape=(None, 3),
             chunks=(self.increment, 3),
@@ -32,6 +38,25 @@ class PruRecorder(Monitor):
             "pru1_gpio_tsample_max [ns], "
             f"with {commons.SAMPLE_INTERVAL_NS} ns per sample-step"
         )
+        # critical windows merged to events, few rows -> not batched
+        self._ds_events: h5py.Dataset = self.data.create_dataset(
+            name="events",
+            shape=(0, len(EVENT_COLUMNS)),
+            dtype="u8",
+            maxshape=(None, len(EVENT_COLUMNS)),
+            chunks=(64, len(EVENT_COLUMNS)),
+        )
+        self._ds_events.attrs["description"] = ", ".join(EVENT_COLUMNS)
+        # updated in place, no attributes while SWMR is active
+        self._ds_histogram: h5py.Dataset = self.data.create_dataset(
+            name="histogram",
+            data=np.zeros((len(HISTOGRAM_EDGES), 2), dtype="u8"),
+        )
+        self._ds_histogram.attrs["description"] = (
+            "windows per utilization-bin (rows), pru0_vsrc_tsample_mean, pru0_vsrc_tsample_max"
+        )
+        self._ds_histogram.attrs["bin_start"] = HISTOGRAM_EDGES
+        self._ds_histogram.attrs["unit"] = f"% of {commons.SAMPLE_INTERVAL_NS} ns"
         # reset increment AFTER creating all dsets are created
         self.increment = 1000  # 100 s
         # TODO: make dependent from commons.BUFFER_GPIO_SAMPLES_N
@@ -46,25 +71,41 @@ class PruRecorder(Monitor):
         self.data["values"].resize((self.position, 3))
         super().__exit__()
 
-    def write(self, data: UtilTrace) -> None:
+    def write(self, data: UtilTrace) -> tuple[np.ndarray, ...] | None:
         """This data allows to
         - reconstruct timestamp-stream later (runtime-optimization, 33% less load)
         - identify critical pru0-timeframes
+
+        Returns the chunk as stored (for the checksum).
         """
         len_new = len(data)
         if len_new < 1:
-            return
+            return None
         pos_end = self.position + len_new
         data_length = self.data["time"].shape[0]
         if pos_end >= data_length:
-            data_length += max(self.increment, pos_end - data_length)
+            data_length = self.grow_to(data_length, pos_end)
             self.data["values"].resize((data_length, 3))
             self.data["time"].resize((data_length,))
-        self.data["time"][self.position : pos_end] = data.timestamps_ns
-        self.data["values"][self.position : pos_end, 0] = data.pru0_tsample_mean
-        self.data["values"][self.position : pos_end, 1] = data.pru0_tsample_max
-        self.data["values"][self.position : pos_end, 2] = data.pru1_tsample_max
+        timestamps = np.asarray(data.timestamps_ns[:len_new], dtype=np.uint64)
+        # converted here (not by hdf5) to get checksum of stored values
+        values = np.empty((len_new, 3), dtype=np.uint16)
+        values[:, 0] = data.pru0_tsample_mean[:len_new]
+        values[:, 1] = data.pru0_tsample_max[:len_new]
+        values[:, 2] = data.pru1_tsample_max[:len_new]
+        self.data["time"][self.position : pos_end] = timestamps
+        self.data["values"][self.position : pos_end, :] = values
         self.position = pos_end
+        return timestamps, values
+
+    def write_analysis(self, analyzer: UtilAnalyzer) -> None:
+        """Appends events closed by analyzer and refreshes histogram."""
+        events = analyzer.pop_events()
+        if events.shape[0] > 0:
+            pos = self._ds_events.shape[0]
+            self._ds_events.resize((pos + events.shape[0], len(EVENT_COLUMNS)))
+            self._ds_events[pos:, :] = events
+        self._ds_histogram[:, :] = analyzer.histogram
 
     def thread_fn(self) -> None:
         raise NotImplementedError
@@ -0,0 +1,153 @@
+"""
+shepherd.h5_recorder_summary
+~~~~~
+Downsampled quick-look of the IV-data, maintained while recording.
+
+Each level stores min, max & mean of voltage and current over windows of
+fixed duration. The first level reduces the raw samples, every following
+level reduces the completed windows of the level below, so a full run can
+be rendered without touching the full-rate datasets.
+Values stay raw like in the data-group - gain & offset are copied over.
+Only complete windows are stored, they get buffered and written in batches.
+
+"""
+
+from types import TracebackType
+
+import h5py
+import numpy as np
+from shepherd_core import Compression
+
+from . import commons
+from .h5_monitor_abc import Monitor
+
+# window-duration of each level (label, samples), must be multiples of each other
+SUMMARY_LEVELS: tuple[tuple[str, int], ...] = (
+    ("1ms", 100),
+    ("100ms", 10_000),
+    ("10s", 1_000_000),
+)
+# columns of the value-datasets
+SUMMARY_COLUMNS: tuple[str, ...] = ("min", "max", "mean")
+
+
+class SummaryRecorder(Monitor):
+    """Min, max & mean over windows of one level of the summary.
+
+    Args:
+        target: group of this level
+        window_n: samples per window
+        factor: inputs per window (raw samples or windows of the level below)
+        cal_attrs: attributes of raw datasets (voltage, current) to copy
+    """
+
+    def __init__(
+        self,
+        target: h5py.Group,
+        window_n: int,
+        factor: int,
+        cal_attrs: dict[str, dict],
+        compression: Compression | None = Compression.default,
+        *,
+        swmr: bool = False,
+    ) -> None:
+        super().__init__(target, compression, poll_interval=0, increment=1000, swmr=swmr)
+        self.factor = factor
+        self.data.attrs["window_samples"] = window_n
+        self.data.attrs["window_s"] = window_n * commons.SAMPLE_INTERVAL_S
+        self.data["time"].attrs["description"] += ", start of window"
+        for name, attrs in cal_attrs.items():
+            self.data.create_dataset(
+                name=name,
+                shape=(self.rows_init, len(SUMMARY_COLUMNS)),
+                dtype="f8",
+                maxshape=(None, len(SUMMARY_COLUMNS)),
+                chunks=(self.increment, len(SUMMARY_COLUMNS)),
+                compression=compression,
+            )
+            for key, value in attrs.items():
+                self.data[name].attrs[key] = value
+            self.data[name].attrs["columns"] = ", ".join(SUMMARY_COLUMNS)
+        self.names: tuple[str, ...] = tuple(cal_attrs)
+        # handles avoid lookups per write
+        self._ds_time: h5py.Dataset = self.data["time"]
+        self._ds_values: list[h5py.Dataset] = [self.data[_n] for _n in self.names]
+        # inputs of an incomplete window
+        self._carry: list[np.ndarray] | None = None
+        # completed windows not yet written to file
+        self._pending: list[list[np.ndarray]] = []
+        self._pending_n: int = 0
+
+    def __exit__(
+        self,
+        typ: type[BaseException] | None = None,
+        exc: BaseException | None = None,
+        tb: TracebackType | None = None,
+        extra_arg: int = 0,
+    ) -> None:
+        self.flush()
+        for dataset in self._ds_values:
+            dataset.resize((self.position, len(SUMMARY_COLUMNS)))
+        super().__exit__()
+
+    def write(self, timestamps: np.ndarray, *values: np.ndarray) -> list[np.ndarray] | None:
+        """Reduces inputs to complete windows and queues them for storing.
+
+        Args:
+            timestamps: [ns] of each input
+            values: per name either raw samples (1D) or (min, max, mean)-rows of the level below
+
+        Returns: completed windows (timestamps, rows per name) or None
+        """
+        inputs = [timestamps, *values]
+        if self._carry is not None:
+            inputs = [np.concatenate(_pair) for _pair in zip(self._carry, inputs, strict=True)]
+        windows_n = inputs[0].size // self.factor
+        used_n = windows_n * self.factor
+        self._carry = [_i[used_n:].copy() for _i in inputs] if used_n < inputs[0].size else None
+        if windows_n < 1:
+            return None
+
+        # copy, timestamps may be a pooled array that gets reused before flush()
+        result = [inputs[0][: used_n : self.factor].copy()]
+        for array in inputs[1:]:
+            rows = np.empty((windows_n, len(SUMMARY_COLUMNS)), dtype=np.float64)
+            if array.ndim == 1:
+                blocks = array[:used_n].reshape(windows_n, self.factor)
+                blocks.min(axis=1, out=rows[:, 0])
+                blocks.max(axis=1, out=rows[:, 1])
+                blocks.mean(axis=1, out=rows[:, 2])
+            else:
+                blocks = array[:used_n].reshape(windows_n, self.factor, len(SUMMARY_COLUMNS))
+                blocks[:, :, 0].min(axis=1, out=rows[:, 0])
+                blocks[:, :, 1].max(axis=1, out=rows[:, 1])
+                blocks[:, :, 2].mean(axis=1, out=rows[:, 2])
+            result.append(rows)
+
+        self._pending.append(result)
+        self._pending_n += windows_n
+        if self._pending_n >= self.increment:
+            self.flush()
+        return result
+
+    def flush(self) -> None:
+        """Writes queued windows to file."""
+        if self._pending_n < 1:
+            return
+        columns = [np.concatenate(_c) for _c in zip(*self._pending, strict=True)]
+        self._pending = []
+        self._pending_n = 0
+        pos_end = self.position + columns[0].size
+        data_length = self._ds_time.shape[0]
+        if pos_end >= data_length:
+            data_length = self.grow_to(data_length, pos_end)
+            self._ds_time.resize((data_length,))
+            for dataset in self._ds_values:
+                dataset.resize((data_length, len(SUMMARY_COLUMNS)))
+        self._ds_time[self.position : pos_end] = columns[0]
+        for dataset, rows in zip(self._ds_values, columns[1:], strict=True):
+            dataset[self.position : pos_end, :] = rows
+        self.position = pos_end
+
+    def thread_fn(self) -> None:
+        raise NotImplementedError
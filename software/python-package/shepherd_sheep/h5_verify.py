@@ -0,0 +1,91 @@
+"""
+shepherd.h5_verify
+~~~~~
+Checks a recording against the checksums in its index (see h5_recorder_index.py).
+
+Chunks are verified in batches by a pool of processes (hdf5 does not
+decompress in parallel within a process). Result is the list of damaged
+time-ranges, so only those have to be transferred again or skipped.
+
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from pathlib import Path
+
+import h5py
+import numpy as np
+
+from .h5_recorder_index import chunk_checksum
+from .logger import log
+
+# index-rows checked per job
+VERIFY_BATCH_N: int = 100
+
+
+def _verify_rows(path: Path, stream: str, row_start: int, row_end: int) -> list[tuple[int, int]]:
+    """Damaged time-ranges within rows of the index of stream."""
+    damaged: list[tuple[int, int]] = []
+    with h5py.File(path, "r") as h5file:
+        ds_index = h5file["index"][stream]
+        # one more row to know where the last chunk ends
+        rows = ds_index[row_start : min(row_end + 1, ds_index.shape[0])]
+        names = [_n.strip() for _n in ds_index.attrs["datasets"].split(",")]
+        datasets = [h5file[stream][_n] for _n in names]
+        for row in range(row_end - row_start):
+            timestamp_ns, offset, length, checksum = (int(_v) for _v in rows[row])
+            try:
+                arrays = [_ds[offset : offset + length] for _ds in datasets]
+                # row may point past the end of the data (i.e. truncated file)
+                intact = all(_a.shape[0] == length for _a in arrays) and (
+                    chunk_checksum(*arrays) == checksum
+                )
+            except (OSError, ValueError):
+                # unreadable chunk (i.e. corrupted compression)
+                arrays = None
+                intact = False
+            if intact:
+                continue
+            if row + 1 < rows.shape[0]:
+                end_ns = int(rows[row + 1, 0])
+            elif arrays is not None and arrays[0].size > 0:
+                end_ns = int(np.max(arrays[0])) + 1
+            else:
+                end_ns = timestamp_ns + 1
+            damaged.append((timestamp_ns, end_ns))
+    return damaged
+
+
+def verify_file(path: Path, workers: int | None = None) -> list[tuple[str, int, int]]:
+    """Damaged time-ranges (stream, start [ns], end [ns]) of a recording, empty if intact.
+
+    Args:
+        path: recording with index-group
+        workers: processes checking in parallel, None uses all cores
+    """
+    with h5py.File(path, "r") as h5file:
+        if "index" not in h5file:
+            msg = f"Recording has no index with checksums ({path})"
+            raise ValueError(msg)
+        jobs = [
+            (stream, _r, min(_r + VERIFY_BATCH_N, h5file["index"][stream].shape[0]))
+            for stream in h5file["index"]
+            for _r in range(0, h5file["index"][stream].shape[0], VERIFY_BATCH_N)
+        ]
+    log.debug("Verifying %s in %d batches", path.name, len(jobs))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(
+            _verify_rows,
+            repeat(path),
+            [_j[0] for _j in jobs],
+            [_j[1] for _j in jobs],
+            [_j[2] for _j in jobs],
+        )
+        damaged = [
+            (job[0], *span) for job, spans in zip(jobs, results, strict=True) for span in spans
+        ]
+    for stream, start_ns, end_ns in damaged:
+        log.warning(
+            "Damaged %s: %d to %d ns (%.3f s)", stream, start_ns, end_ns, (end_ns - start_ns) / 1e9
+        )
+    return damaged
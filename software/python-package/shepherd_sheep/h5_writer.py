@@ -6,6 +6,8 @@ HDF5 files.
 
 """
 
+import time
+from functools import partial
 from pathlib import Path
 from types import TracebackType
 from typing import TYPE_CHECKING
@@ -16,10 +18,11 @@ from . import commons
 from .h5_monitor_ntp import NTPMonitor
 
 if TYPE_CHECKING:
-    import h5py
+    from collections.abc import Callable
 
     from .h5_monitor_abc import Monitor
 
+import h5py
 import numpy as np
 from shepherd_core import CalibrationEmulator as CalEmu
 from shepherd_core import CalibrationHarvester as CalHrv
@@ -29,17 +32,30 @@ from shepherd_core.data_models import SystemLogging
 from shepherd_core.data_models import UartLogging
 from shepherd_core.data_models.task import Compression
 
+from .gpio_filter import GpioFilter
 from .h5_monitor_kernel import KernelMonitor
 from .h5_monitor_phc2sys import PHC2SYSMonitor
 from .h5_monitor_ptp import PTPMonitor
 from .h5_monitor_sheep import SheepMonitor
 from .h5_monitor_sysutil import SysUtilMonitor
 from .h5_monitor_uart import UARTMonitor
+from .h5_recorder_energy import EnergyRecorder
 from .h5_recorder_gpio import GpioRecorder
+from .h5_recorder_index import IndexRecorder
 from .h5_recorder_pru import PruRecorder
+from .h5_recorder_summary import SUMMARY_LEVELS
+from .h5_recorder_summary import SummaryRecorder
+from .logger import log
+from .loop_timing import LoopTiming
+from .memory_budget import MemoryBudget
+from .segment_tuner import SegmentTuner
 from .shared_mem_gpio_output import GPIOTrace
 from .shared_mem_iv_input import IVTrace
 from .shared_mem_util_output import UtilTrace
+from .util_analyzer import UtilAnalyzer
+
+# data gets flushed for readers of a SWMR-file at segment-boundaries, at most this often
+SWMR_FLUSH_S: float = 1.0
 
 
 class Writer(CoreWriter):
@@ -52,6 +68,9 @@ class Writer(CoreWriter):
             units later.
         mode (str): Indicates if this is data from harvester or emulator
         force_overwrite (bool): Overwrite existing file with the same name
+        memory_budget (MemoryBudget): limits chunk-caches & pre-growth of datasets
+        summarize (bool): maintain downsampled min/max/mean of IV-data in "data_summary"
+        swmr (bool): create file in a format that allows reading while recording, see start_swmr()
     """
 
     def __init__(
@@ -66,7 +85,16 @@ class Writer(CoreWriter):
         modify_existing: bool = False,
         force_overwrite: bool = False,
         verbose: bool | None = True,
+        memory_budget: MemoryBudget | None = None,
+        summarize: bool = True,
+        swmr: bool = False,
     ) -> None:
+        self.memory_budget = memory_budget if memory_budget is not None else MemoryBudget()
+        self.summarize = summarize
+        self.swmr = swmr
+        # metadata-writes postponed until SWMR-mode ends
+        self._swmr_deferred: list[Callable[[], None]] = []
+        self._swmr_flush_ns: int = 0
         # hopefully overwrite defaults from Reader
         self.samplerate_sps: int = 10**9 // commons.SAMPLE_INTERVAL_NS
 
@@ -95,10 +123,20 @@ class Writer(CoreWriter):
         # h5py v3.4 is taking 20% longer for .write_buffer() than v2.1
         # this change speeds up v3.4 by 30% (even system load drops from 90% to 70%), v2.1 by 16%
         self.data_pos = 0
-        self.data_inc = int(100 * self.samplerate_sps)
+        self.data_inc = int(self.memory_budget.writer_increment_s * self.samplerate_sps)
         # NOTE for possible optimization: align resize with chunk-size
         #      -> rely on autochunking -> inc = h5ds.chunks
 
+        # open handles that keep the limited chunk-cache alive
+        self._cached_ds: dict[str, h5py.Dataset] = {}
+        if self.memory_budget.h5_cache_nbytes is not None:
+            # handles of core-writer would otherwise keep the default cache
+            del self.ds_time, self.ds_voltage, self.ds_current
+            self._limit_chunk_cache(self.grp_data)
+            self.ds_time = self._cached_ds["data/time"]
+            self.ds_voltage = self._cached_ds["data/voltage"]
+            self.ds_current = self._cached_ds["data/current"]
+
         # prepare Monitors
         self.sysutil_log_enabled: bool = True
         self.monitors: list[Monitor] = []
@@ -121,8 +159,45 @@ class Writer(CoreWriter):
         self.gpio_grp = self.h5file.create_group("gpio")
         self.pru_util_grp = self.h5file.create_group("pru_util")
         # prepare recorders
-        self.rec_gpio = GpioRecorder(self.gpio_grp, compression=self._compression)
-        self.rec_pru = PruRecorder(self.pru_util_grp, compression=self._compression)
+        self.rec_gpio = GpioRecorder(self.gpio_grp, compression=self._compression, swmr=self.swmr)
+        self.rec_pru = PruRecorder(self.pru_util_grp, compression=self._compression, swmr=self.swmr)
+        if self.memory_budget.h5_cache_nbytes is not None:
+            self._limit_chunk_cache(self.gpio_grp)
+            self._limit_chunk_cache(self.pru_util_grp)
+        # downsampled quick-look, each level is fed by the one below
+        cal_attrs = {_n: dict(self.grp_data[_n].attrs) for _n in ("voltage", "current")}
+        self.rec_summary: list[SummaryRecorder] = []
+        if self.summarize:
+            self.summary_grp = self.h5file.create_group("data_summary")
+            window_last = 1
+            for label, window_n in SUMMARY_LEVELS:
+                self.rec_summary.append(
+                    SummaryRecorder(
+                        self.summary_grp.create_group(label),
+                        window_n=window_n,
+                        factor=window_n // window_last,
+                        cal_attrs=cal_attrs,
+                        compression=self._compression,
+                        swmr=self.swmr,
+                    )
+                )
+                window_last = window_n
+        # running totals & power-statistics per segment
+        self.energy_grp = self.h5file.create_group("energy")
+        self.rec_energy = EnergyRecorder(
+            self.energy_grp, cal_attrs=cal_attrs, compression=self._compression, swmr=self.swmr
+        )
+        # time-to-sample index of the streams
+        self.index_grp = self.h5file.create_group("index")
+        self.rec_index = IndexRecorder(
+            self.index_grp,
+            streams={
+                "data": ("time", "voltage", "current"),
+                "gpio": ("time", "value"),
+                "pru_util": ("time", "values"),
+            },
+            compression=self._compression,
+        )
 
         # targets for logging-monitor # TODO: redesign? all should be kept in data_0
         self.sheep_grp = self.h5file.create_group("sheep")
@@ -149,13 +224,101 @@ class Writer(CoreWriter):
         # end recorders
         self.rec_gpio.__exit__()
         self.rec_pru.__exit__()
+        for recorder in self.rec_summary:
+            recorder.__exit__()
+        self.rec_energy.__exit__()
+        self.rec_index.__exit__()
 
         # end monitors
         for monitor in self.monitors:
             monitor.__exit__()
 
+        self._cached_ds = {}
+        self._end_swmr()
+        self.rec_energy.store_totals(self.h5file["energy"])
         super().__exit__()
 
+    def _align(self) -> None:
+        """Keeps a partial last chunk (core-writer would truncate to CHUNK_SAMPLES_N).
+
+        Clipping to the tracing-window produces partial chunks at its edges,
+        index, summary & energy already describe these samples.
+        """
+
+    def _create_skeleton(self) -> None:
+        if self.swmr:
+            # SWMR needs the file-format of hdf5 >= v1.10, core-writer creates file with defaults
+            file_path = Path(self.h5file.filename)
+            self.h5file.close()
+            self.h5file = h5py.File(file_path, "w", libver="latest")
+        super()._create_skeleton()
+
+    def start_swmr(self) -> None:
+        """Switches file to single-writer/multiple-reader-mode for the rest of the recording.
+
+        Other processes can then open the file with
+        h5py.File(path, "r", libver="latest", swmr=True) and see new data after
+        calling .refresh() on a dataset. SWMR forbids adding objects & attributes,
+        so all recorders, monitors and the config have to be set up before.
+        Datasets of such a file grow exactly by the rows written (no zero-rows),
+        so their length is the valid extent.
+        Timing-stats and totals get stored after the recording ended.
+        """
+        if not self.swmr:
+            msg = "Writer was not created for SWMR (swmr=False)"
+            raise ValueError(msg)
+        self.h5file.swmr_mode = True
+        self._swmr_flush_ns = time.monotonic_ns()
+        log.info("File is readable while recording (SWMR), '%s'", self.h5file.filename)
+
+    def _flush_swmr(self) -> None:
+        """Makes pending data visible to readers, throttled to SWMR_FLUSH_S."""
+        if not self.h5file.swmr_mode:
+            return
+        now_ns = time.monotonic_ns()
+        if now_ns - self._swmr_flush_ns < SWMR_FLUSH_S * 1e9:
+            return
+        self._swmr_flush_ns = now_ns
+        self.rec_gpio.flush()
+        for recorder in self.rec_summary:
+            recorder.flush()
+        self.rec_energy.flush()
+        for stream in ("data", "gpio", "pru_util"):
+            self.rec_index.flush(stream)
+        self.h5file.flush()
+
+    def _end_swmr(self) -> None:
+        """Reopens file in regular mode, so metadata can be added again.
+
+        All handles get invalid, recorders & monitors must have ended before.
+        """
+        if not self.h5file.swmr_mode:
+            return
+        file_path = Path(self.h5file.filename)
+        self.h5file.close()
+        self.h5file = h5py.File(file_path, "r+", libver="latest")
+        self.grp_data = self.h5file["data"]
+        self.ds_time = self.grp_data["time"]
+        self.ds_voltage = self.grp_data["voltage"]
+        self.ds_current = self.grp_data["current"]
+        for store in self._swmr_deferred:
+            store()
+        self._swmr_deferred = []
+
+    def _limit_chunk_cache(self, group: h5py.Group) -> None:
+        """Reopens datasets of group with the chunk-cache of the memory-budget.
+
+        HDF5 shares the cache between handles of an open dataset, so the new
+        handles are kept open and previous handles must be closed before.
+        """
+        names = [_n for _n, _v in group.items() if isinstance(_v, h5py.Dataset)]
+        dapl = h5py.h5p.create(h5py.h5p.DATASET_ACCESS)
+        # nslots: prime, ~100x number of chunks fitting into cache
+        dapl.set_chunk_cache(12_421, self.memory_budget.h5_cache_nbytes, 0.75)
+        for name in names:
+            dataset = h5py.Dataset(h5py.h5d.open(group.id, name.encode("utf-8"), dapl))
+            self._cached_ds[f"{group.name.strip('/')}/{name}"] = dataset
+
     def write_iv_buffer(self, data: IVTrace) -> None:
         """Writes data from buffer to file.
 
@@ -168,26 +331,112 @@ class Writer(CoreWriter):
             data_end_pos = self.data_pos + data_length_new
             data_length_h5 = self.grp_data["voltage"].shape[0]
             if data_end_pos >= data_length_h5:
-                data_length_h5 += self.data_inc
+                # SWMR-readers would see pre-grown rows as samples -> grow exactly
+                data_length_h5 = data_end_pos if self.swmr else data_length_h5 + self.data_inc
                 self.grp_data["voltage"].resize((data_length_h5,))
                 self.grp_data["current"].resize((data_length_h5,))
                 self.grp_data["time"].resize((data_length_h5,))
 
-            self.grp_data["voltage"][self.data_pos : data_end_pos] = data.voltage
-            self.grp_data["current"][self.data_pos : data_end_pos] = data.current
+            voltage = np.asarray(data.voltage, dtype=np.uint32)
+            current = np.asarray(data.current, dtype=np.uint32)
+            self.grp_data["voltage"][self.data_pos : data_end_pos] = voltage
+            self.grp_data["current"][self.data_pos : data_end_pos] = current
+            timestamps = None
             if isinstance(data.timestamp_ns, int):
-                self.grp_data["time"][self.data_pos : data_end_pos] = (
-                    self.buffer_timeseries + data.timestamp_ns
-                )
+                timestamps = self.buffer_timeseries[:data_length_new] + data.timestamp_ns
             elif isinstance(data.timestamp_ns, np.ndarray):
-                self.grp_data["time"][self.data_pos : data_end_pos] = data.timestamp_ns
+                timestamps = np.asarray(data.timestamp_ns, dtype=np.uint64)
+            if timestamps is not None:
+                self.grp_data["time"][self.data_pos : data_end_pos] = timestamps
+                self.rec_index.add(
+                    "data",
+                    int(timestamps[0]),
+                    self.data_pos,
+                    data_length_new,
+                    timestamps,
+                    voltage,
+                    current,
+                )
             self.data_pos = data_end_pos
+            if timestamps is not None:
+                self._summarize(timestamps, data.voltage, data.current)
+                self.rec_energy.write(int(timestamps[0]), data.voltage, data.current)
+            self._flush_swmr()
+
+    def _summarize(self, timestamps: np.ndarray, voltage: np.ndarray, current: np.ndarray) -> None:
+        """Feeds segment into the summary-levels, completed windows move up a level."""
+        windows = [timestamps, voltage, current]
+        for recorder in self.rec_summary:
+            windows = recorder.write(*windows)
+            if windows is None:
+                break
 
     def write_gpio_buffer(self, data: GPIOTrace) -> None:
-        self.rec_gpio.write(data)
+        position = self.rec_gpio.position
+        chunk = self.rec_gpio.write(data)
+        if chunk is not None:
+            self.rec_index.add("gpio", int(data.timestamps_ns[0]), position, len(data), *chunk)
 
     def write_util_buffer(self, data: UtilTrace) -> None:
-        self.rec_pru.write(data)
+        position = self.rec_pru.position
+        chunk = self.rec_pru.write(data)
+        if chunk is not None:
+            self.rec_index.add("pru_util", int(data.timestamps_ns[0]), position, len(data), *chunk)
+
+    def write_util_analysis(self, analyzer: UtilAnalyzer) -> None:
+        """Stores critical events & utilization-histogram found so far."""
+        self.rec_pru.write_analysis(analyzer)
+
+    def store_timing(self, timing: LoopTiming) -> None:
+        """Stores latency-histograms of the main-loop-stages.
+
+        Each stage gets a dataset with rows of (lower bucket-bound in ns, count).
+        """
+        if self.h5file.swmr_mode:
+            self._swmr_deferred.append(partial(self.store_timing, timing))
+            return
+        grp_timing = self.h5file.require_group("timing")
+        grp_timing.attrs["description"] = "latency-histograms of main-loop stages"
+        for stage, hist in timing.stages.items():
+            data = np.array(hist.nonzero(), dtype="u8").reshape(-1, 2)
+            if stage in grp_timing:
+                del grp_timing[stage]
+            ds = grp_timing.create_dataset(stage, data=data)
+            ds.attrs["unit"] = "ns"
+            ds.attrs["description"] = "bucket [ns], count"
+            ds.attrs["count"] = hist.count
+            ds.attrs["sum"] = hist.sum_ns
+            ds.attrs["min"] = hist.min_ns
+            ds.attrs["max"] = hist.max_ns
+            for percent in timing.percentiles:
+                ds.attrs[f"p{percent:g}"] = hist.percentile_ns(percent)
+
+    def store_segment_tuning(self, tuner: SegmentTuner) -> None:
+        """Stores measured candidates and chosen segment-size & poll-interval."""
+        if self.h5file.swmr_mode:
+            self._swmr_deferred.append(partial(self.store_segment_tuning, tuner))
+            return
+        grp_timing = self.h5file.require_group("timing")
+        if "segment_tuning" in grp_timing:
+            del grp_timing["segment_tuning"]
+        data = np.array(tuner.results(), dtype="f8").reshape(-1, 4)
+        ds = grp_timing.create_dataset("segment_tuning", data=data)
+        ds.attrs["description"] = "samples per segment, samples served, busy [ns], headroom"
+        ds.attrs["segment_samples"] = tuner.segment_n
+        ds.attrs["poll_s"] = tuner.poll_s
+
+    def store_gpio_filter(self, gpio_filter: GpioFilter) -> None:
+        """Stores settings & counters of the filter applied to the gpio-stream."""
+        if self.h5file.swmr_mode:
+            self._swmr_deferred.append(partial(self.store_gpio_filter, gpio_filter))
+            return
+        grp_filter = self.h5file["gpio"].require_group("filter")
+        grp_filter.attrs["description"] = "redundant records were removed before writing"
+        grp_filter.attrs["mask"] = gpio_filter.mask
+        grp_filter.attrs["glitch_ns"] = gpio_filter.glitch_ns
+        grp_filter.attrs["samples_n"] = gpio_filter.samples_n
+        grp_filter.attrs["duplicates_n"] = gpio_filter.duplicates_n
+        grp_filter.attrs["glitches_n"] = gpio_filter.glitches_n
 
     def start_monitors(
         self,
@@ -195,23 +444,31 @@ class Writer(CoreWriter):
         uart: UartLogging | None = None,
     ) -> None:
         if sys is not None and sys.kernel:
-            self.monitors.append(KernelMonitor(self.kernel_grp, self._compression))
+            self.monitors.append(KernelMonitor(self.kernel_grp, self._compression, swmr=self.swmr))
         if sys is not None and sys.time_sync:
-            self.monitors.append(PTPMonitor(self.ptp_grp, self._compression))
-            self.monitors.append(PHC2SYSMonitor(self.phc_grp, self._compression))
-            self.monitors.append(NTPMonitor(self.ntp_grp, self._compression))
+            self.monitors.append(PTPMonitor(self.ptp_grp, self._compression, swmr=self.swmr))
+            self.monitors.append(PHC2SYSMonitor(self.phc_grp, self._compression, swmr=self.swmr))
+            self.monitors.append(NTPMonitor(self.ntp_grp, self._compression, swmr=self.swmr))
         if sys is not None and sys.sys_util:
-            self.monitors.append(SysUtilMonitor(self.sys_util_grp, self._compression))
+            self.monitors.append(
+                SysUtilMonitor(
+                    self.sys_util_grp,
+                    self._compression,
+                    rss_limit=self.memory_budget.limit_bytes,
+                    swmr=self.swmr,
+                )
+            )
         if uart is not None:
             self.monitors.append(
                 UARTMonitor(
                     self.uart_grp,
                     self._compression,
                     config=uart,
+                    swmr=self.swmr,
                 ),
             )
         if sys is not None and sys.sheep:
-            self.monitors.append(SheepMonitor(self.sheep_grp, self._compression))
+            self.monitors.append(SheepMonitor(self.sheep_grp, self._compression, swmr=self.swmr))
 
     def check_monitors(self) -> None:
         """Check state of Monitors.
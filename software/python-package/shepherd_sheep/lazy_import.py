@@ -0,0 +1,54 @@
+"""
+shepherd.lazy_import
+~~~~~
+Deferred imports to keep startup of the CLI short.
+
+Importing any part of shepherd_core loads all of its data-models, which takes
+several seconds on the BeagleBone. Modules that only need heavy dependencies
+in some code-paths get a proxy instead - the real import happens on first
+attribute access.
+
+"""
+
+import importlib
+import sys
+from types import ModuleType
+from typing import Any
+
+
+class LazyModule(ModuleType):
+    """Placeholder for a module that gets imported on first attribute access."""
+
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+        self._module: ModuleType | None = None
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            self._module = importlib.import_module(self.__name__)
+        return self._module
+
+    def __getattr__(self, name: str) -> Any:
+        # only called for attributes that are not found on the proxy itself
+        value = getattr(self._load(), name)
+        setattr(self, name, value)  # speeds up following lookups
+        return value
+
+    def __dir__(self) -> list[str]:
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule '{self.__name__}' ({state})>"
+
+
+def lazy_module(name: str) -> ModuleType:
+    """Returns the module if already imported, otherwise a lazy proxy for it.
+
+    Args:
+        name: absolute name of module, i.e. "shepherd_core.data_models.task"
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
@@ -4,7 +4,6 @@ import multiprocessing
 import sys
 
 import chromalog
-from shepherd_core.logger import set_log_verbose_level
 
 # Top-Level Package-logger
 log = logging.getLogger("Shp")
@@ -24,6 +23,15 @@ queue_handler.setLevel(logging.DEBUG)
 log.addHandler(console_handler)
 log.addHandler(queue_handler)
 verbosity_state: bool = False
+queue_limit: int | None = None
+
+
+def _queue_has_space(_: logging.LogRecord) -> bool:
+    """Records get dropped if no one drains the queue (i.e. SheepMonitor disabled)."""
+    return queue_limit is None or queue.qsize() < queue_limit
+
+
+queue_handler.addFilter(_queue_has_space)
 
 
 def get_verbosity() -> bool:
@@ -37,18 +45,21 @@ def set_verbosity(*, state: bool | int = True, temporary: bool = False) -> None:
             return
     elif isinstance(state, int) and state < 3:
         return  # old format, will be replaced
-    set_log_verbose_level(console_handler, 3)
+    # NOTE: shepherd_core.logger is not used here, as it would load the whole core-lib
+    console_handler.setLevel(logging.DEBUG)
     if temporary:
         return
     global verbosity_state  # noqa: PLW0603
     verbosity_state = True
 
 
-def reset_verbosity() -> None:
-    """Will reset only if it was increased temporary before."""
-    if verbosity_state:
+def reset_verbosity(*, force: bool = False) -> None:
+    """Will reset only if it was increased temporary before (or when forced)."""
+    global verbosity_state  # noqa: PLW0603
+    if verbosity_state and not force:
         return
-    set_log_verbose_level(console_handler, 2)
+    verbosity_state = False
+    console_handler.setLevel(logging.INFO)
 
 
 def get_message_queue() -> multiprocessing.Queue:
@@ -61,6 +72,12 @@ def get_message_queue() -> multiprocessing.Queue:
     return queue
 
 
+def set_message_queue_limit(limit: int | None) -> None:
+    """Caps records waiting in queue, None is unbounded."""
+    global queue_limit  # noqa: PLW0603
+    queue_limit = limit
+
+
 def clear_message_queue() -> None:
     """If no one reads the queue, the thread will not finish, so add option to empty it"""
     log.removeHandler(queue_handler)
@@ -0,0 +1,119 @@
+"""
+shepherd.loop_timing
+~~~~~
+Instrumentation of the main-loops of emulator & harvester.
+
+Every stage of an iteration (reading input, filling buffers, writing to file, ...)
+gets a latency histogram. The buckets are log-linear like in HDR-histograms:
+each power of two is divided into linear sub-buckets, so resolution stays
+relative (~3 %) from nanoseconds up to minutes while recording is just a bit of
+integer-math and a list-increment.
+
+"""
+
+from time import perf_counter_ns
+
+SUB_BUCKET_BITS: int = 5  # 32 sub-buckets per power of two -> ~3 % resolution
+SUB_BUCKET_COUNT: int = 1 << SUB_BUCKET_BITS
+MAGNITUDES: int = 40  # covers up to 2**40 ns ~ 18 min
+BUCKET_COUNT: int = (MAGNITUDES + 1) * SUB_BUCKET_COUNT
+
+
+def bucket_index(value: int) -> int:
+    """Maps value to bucket, log-linear."""
+    if value < SUB_BUCKET_COUNT:
+        return max(value, 0)
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return min(
+        (shift + 1) * SUB_BUCKET_COUNT + (value >> shift) - SUB_BUCKET_COUNT,
+        BUCKET_COUNT - 1,
+    )
+
+
+def bucket_value(index: int) -> int:
+    """Lowest value that maps to bucket."""
+    if index < SUB_BUCKET_COUNT:
+        return index
+    shift = index // SUB_BUCKET_COUNT - 1
+    return (index % SUB_BUCKET_COUNT + SUB_BUCKET_COUNT) << shift
+
+
+class LatencyHistogram:
+    """Records durations in nanoseconds."""
+
+    def __init__(self) -> None:
+        self.counts: list[int] = [0] * BUCKET_COUNT
+        self.count: int = 0
+        self.sum_ns: int = 0
+        self.min_ns: int = 0
+        self.max_ns: int = 0
+
+    def record(self, value_ns: int) -> None:
+        self.counts[bucket_index(value_ns)] += 1
+        if self.count == 0 or value_ns < self.min_ns:
+            self.min_ns = value_ns
+        self.max_ns = max(self.max_ns, value_ns)
+        self.count += 1
+        self.sum_ns += value_ns
+
+    def mean_ns(self) -> float:
+        return self.sum_ns / self.count if self.count else 0.0
+
+    def percentile_ns(self, percent: float) -> int:
+        """Lower bound of bucket that contains the percentile."""
+        if self.count == 0:
+            return 0
+        threshold = percent / 100 * self.count
+        total = 0
+        for index, count in enumerate(self.counts):
+            total += count
+            if total >= threshold and count > 0:
+                return max(bucket_value(index), self.min_ns)
+        return self.max_ns
+
+    def nonzero(self) -> list[tuple[int, int]]:
+        """Compact form: (lower bucket-bound in ns, count) of occupied buckets."""
+        return [(bucket_value(_i), _c) for _i, _c in enumerate(self.counts) if _c > 0]
+
+
+class LoopTiming:
+    """Latency histograms for the stages of a main-loop.
+
+    Stamps are chained to keep overhead low:
+
+        ts = perf_counter_ns()
+        data = buffer.read()
+        ts = timing.add("buffer_read", ts)
+        writer.write(data)
+        ts = timing.add("write", ts)
+    """
+
+    percentiles: tuple[float, ...] = (50, 90, 99, 99.9)
+
+    def __init__(self) -> None:
+        self.stages: dict[str, LatencyHistogram] = {}
+
+    def add(self, stage: str, ts_start_ns: int) -> int:
+        """Records time since ts_start_ns and returns the current timestamp."""
+        ts_now = perf_counter_ns()
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = LatencyHistogram()
+        histogram.record(ts_now - ts_start_ns)
+        return ts_now
+
+    def summary(self) -> str:
+        """Table of stages, sorted by share of total time."""
+        total_ns = sum(_h.sum_ns for _h in self.stages.values()) or 1
+        header = (
+            f"{'stage':<20} {'count':>9} {'share':>6} {'mean':>9} {'p50':>9} "
+            f"{'p99':>9} {'max':>9}  [us]"
+        )
+        lines = [header]
+        for stage, hist in sorted(self.stages.items(), key=lambda _s: -_s[1].sum_ns):
+            lines.append(
+                f"{stage:<20} {hist.count:>9} {100 * hist.sum_ns / total_ns:>5.1f}% "
+                f"{hist.mean_ns() / 1e3:>9.1f} {hist.percentile_ns(50) / 1e3:>9.1f} "
+                f"{hist.percentile_ns(99) / 1e3:>9.1f} {hist.max_ns / 1e3:>9.1f}",
+            )
+        return "\n".join(lines)
@@ -0,0 +1,137 @@
+"""
+shepherd.looped_input
+~~~~~
+Repeats a short emulation-input for the whole duration of a task.
+
+The input gets decoded once into RAM (already in units of the PRU: uV, nA)
+and is replayed seamlessly from there - no continuous hdf5-decoding for
+multi-day runs. Inputs that don't fit into the cache are re-read and
+calibrated per segment instead.
+Each repetition can start shifted into the trace, so periodic
+artifacts don't line up between repetitions.
+
+"""
+
+import math
+from collections.abc import Generator
+from datetime import timedelta
+from itertools import count
+
+import numpy as np
+from shepherd_core import CalibrationSeries
+from shepherd_core import Reader as CoreReader
+
+from .logger import log
+from .synthetic_input import SyntheticReader
+
+
+class LoopedReader:
+    """Wraps a reader and repeats its segments until duration is reached.
+
+    Args:
+        reader: source of segments (raw values)
+        cal_pru: converts raw values to PRU-units, None if already scaled
+        duration: length of emulation, None repeats until stopped
+        shift_s: offset into the trace that each repetition starts later
+        cache_nbytes: max RAM for decoded trace, larger inputs are streamed
+    """
+
+    def __init__(
+        self,
+        reader: CoreReader | SyntheticReader,
+        cal_pru: CalibrationSeries | None,
+        duration: timedelta | None,
+        shift_s: float = 0.0,
+        cache_nbytes: int = 256 * 2**20,
+    ) -> None:
+        self.reader = reader
+        self.cal_pru = cal_pru
+        self.CHUNK_SAMPLES_N: int = reader.CHUNK_SAMPLES_N
+        self.samplerate_sps: int = reader.samplerate_sps
+        self.segments_n: int = int(reader.samples_n // self.CHUNK_SAMPLES_N)
+        if self.segments_n < 1:
+            msg = f"Input is shorter than a segment ({reader.samples_n} samples)"
+            raise ValueError(msg)
+        segment_s = self.CHUNK_SAMPLES_N / self.samplerate_sps
+        self.shift_n: int = round(shift_s / segment_s) % self.segments_n
+        # infinite without duration -> end of run comes from stop-signal
+        self.runtime_s: float = math.inf
+        if duration is not None:
+            self.runtime_s = duration.total_seconds()
+        else:
+            log.warning("Looped input without duration will repeat until stopped")
+
+        self._cache: tuple[np.ndarray, np.ndarray] | None = None
+        cache_size = self.segments_n * self.CHUNK_SAMPLES_N * 2 * 4
+        if cache_size <= cache_nbytes:
+            self._cache = self._decode()
+        else:
+            log.warning(
+                "Looped input exceeds cache (%d > %d MiB) -> will be re-read per repetition",
+                cache_size // 2**20,
+                cache_nbytes // 2**20,
+            )
+        log.info(
+            "Looping input of %.1f s (%d segments, shifted by %d per repetition, %s)",
+            self.segments_n * segment_s,
+            self.segments_n,
+            self.shift_n,
+            "cached" if self._cache is not None else "streamed",
+        )
+
+    def _decode(self) -> tuple[np.ndarray, np.ndarray]:
+        shape = (self.segments_n, self.CHUNK_SAMPLES_N)
+        voltage = np.empty(shape, dtype=np.uint32)
+        current = np.empty(shape, dtype=np.uint32)
+        for index, (dsv, dsc) in enumerate(self._read_source(0, self.segments_n)):
+            voltage[index] = dsv
+            current[index] = dsc
+        return voltage, current
+
+    def _read_source(
+        self, start_n: int, end_n: int
+    ) -> Generator[tuple[np.ndarray, np.ndarray], None, None]:
+        for _, dsv, dsc in self.reader.read(
+            start_n=start_n, end_n=end_n, is_raw=True, omit_timestamps=True
+        ):
+            if self.cal_pru is None:
+                yield dsv, dsc
+            else:
+                yield (
+                    self.cal_pru.voltage.raw_to_si(dsv).astype("u4"),
+                    self.cal_pru.current.raw_to_si(dsc).astype("u4"),
+                )
+
+    def position(self, index: int) -> int:
+        """Segment of the trace that gets played at global segment-index."""
+        repetition, offset = divmod(index, self.segments_n)
+        return (offset + repetition * self.shift_n) % self.segments_n
+
+    def read(
+        self,
+        start_n: int = 0,
+        end_n: int | None = None,
+        *,
+        is_raw: bool = True,  # noqa: ARG002
+        omit_timestamps: bool = True,  # noqa: ARG002
+    ) -> Generator[tuple[None, np.ndarray, np.ndarray], None, None]:
+        """Segments between start_n and end_n, already in PRU-units (uV, nA).
+
+        Without duration and end_n the segments don't end.
+
+        Arguments is_raw & omit_timestamps exist for compatibility only.
+        """
+        if math.isfinite(self.runtime_s):
+            end_max = int(self.runtime_s * self.samplerate_sps) // self.CHUNK_SAMPLES_N
+            end_n = end_max if end_n is None else min(end_n, end_max)
+        indices = count(start_n) if end_n is None else range(start_n, end_n)
+        for index in indices:
+            position = self.position(index)
+            if self._cache is not None:
+                yield None, self._cache[0][position], self._cache[1][position]
+            else:
+                yield None, *next(self._read_source(position, position + 1))
+
+    def __exit__(self, *args: object) -> None:
+        self._cache = None
+        self.reader.__exit__()
@@ -0,0 +1,78 @@
+"""
+shepherd.memory_budget
+~~~~~
+Caps memory-use of long measurements on nodes with little RAM.
+
+A single limit sizes the chunk-caches of the hdf5-file, the pre-growth
+of datasets, the log-queue, the cache of looped input and whether the
+next task gets prepared while the current one runs. Without a limit,
+everything keeps its default.
+
+"""
+
+from dataclasses import dataclass
+
+# share of budget that the caches & queues may take
+CACHE_SHARE: float = 1 / 64
+QUEUE_SHARE: float = 1 / 16
+# decoded looped input, current & prefetched task can each hold one
+LOOP_CACHE_SHARE: float = 1 / 8
+# estimate for a queued log-record (pickled)
+LOG_RECORD_SIZE: int = 2**10
+# below this, the prepared input of the next task would compete with current one
+PREFETCH_MIN_MB: int = 256
+
+
+@dataclass(frozen=True)
+class MemoryBudget:
+    """Sizes of caches, queues & batches derived from a memory-limit.
+
+    Args:
+        limit_mb: RAM the sheep-process should stay below, None keeps defaults
+    """
+
+    limit_mb: int | None = None
+
+    def __post_init__(self) -> None:
+        if self.limit_mb is not None and self.limit_mb < 32:
+            msg = f"Memory-budget must be at least 32 MB, got {self.limit_mb}"
+            raise ValueError(msg)
+
+    @property
+    def limit_bytes(self) -> int | None:
+        return None if self.limit_mb is None else self.limit_mb * 2**20
+
+    @property
+    def h5_cache_nbytes(self) -> int | None:
+        """Chunk-cache per dataset (h5py-default is 8 MiB), None keeps default."""
+        if self.limit_bytes is None:
+            return None
+        return min(max(int(self.limit_bytes * CACHE_SHARE), 2**17), 2**23)
+
+    @property
+    def writer_increment_s(self) -> int:
+        """Duration that IV-datasets get pre-grown by."""
+        return 100 if self.limit_bytes is None else 10
+
+    @property
+    def message_queue_n(self) -> int | None:
+        """Max log-records waiting for the SheepMonitor, None is unbounded."""
+        if self.limit_bytes is None:
+            return None
+        return int(self.limit_bytes * QUEUE_SHARE) // LOG_RECORD_SIZE
+
+    @property
+    def loop_cache_nbytes(self) -> int:
+        """RAM for the decoded trace of looped input (per task).
+
+        With prefetch, the next task decodes its input while the current one
+        still holds its cache - both together stay below 1/4 of the budget.
+        """
+        if self.limit_bytes is None:
+            return 256 * 2**20
+        return int(self.limit_bytes * LOOP_CACHE_SHARE)
+
+    @property
+    def prefetch(self) -> bool:
+        """Prepare next task (incl. its initial buffer-fill) while current one runs."""
+        return self.limit_mb is None or self.limit_mb >= PREFETCH_MIN_MB
@@ -0,0 +1,425 @@
+"""
+shepherd.pru_simulator
+~~~~~
+Software stand-in for the PRUs and the kernel module. It allows to exercise
+and benchmark the data path of the sheep on any linux-machine (no cape needed).
+
+The simulator owns a memfd with the exact layout of the PRU-shared memory
+and serves a fake sysfs-tree. It honors mode, start, stop & state and moves
+samples like the firmware would:
+
+- emulator-modes consume iv_inp and hand it back unchanged as iv_out
+- harvester-modes produce a synthetic ramp as iv_out
+- gpio-trace gets a toggling edge on gpio0 every n samples
+- util-trace reports the load of the simulator itself
+
+The sample-clock runs in real-time or accelerated (speed > 1). Other processes
+attach via environment (the memfd is reachable through /proc/<pid>/fd/<n>,
+that path is also written to 'memory/device' of the tree):
+
+    python -m shepherd_sheep.pru_simulator /tmp/shepherd --speed 10
+    export SHEPHERD_SYSFS_PATH=/tmp/shepherd
+    export SHEPHERD_MEM_PATH=$(cat /tmp/shepherd/memory/device)
+
+NOTE: this does not model the virtual source / harvester of the firmware
+and GPIOs of the BeagleBone are not covered.
+
+"""
+
+import mmap
+import os
+import signal
+import time
+from pathlib import Path
+from types import FrameType
+from types import TracebackType
+
+import click
+import numpy as np
+from typing_extensions import Self
+
+from . import commons
+from .logger import log
+from .logger import set_verbosity
+from .shared_mem_gpio_output import SharedMemGPIOOutput
+from .shared_mem_iv_input import SharedMemIVInput
+from .shared_mem_iv_output import SharedMemIVOutput
+from .shared_mem_util_output import SharedMemUtilOutput
+from .sysfs_interface import shepherd_modes
+
+harvester_modes = {"harvester", "hrv_adc_read"}
+
+
+def ring_slices(position: int, length: int, size: int) -> list[tuple[int, int, int]]:
+    """Splits access to a ring-buffer at its end.
+
+    Returns:
+        list of (position in ring, position in data, length)
+    """
+    first = min(length, size - position)
+    if first == length:
+        return [(position, 0, length)]
+    return [(position, 0, first), (0, first, length - first)]
+
+
+class PruSimulator:
+    """Serves a fake sysfs-tree & shared memory while in context.
+
+    Args:
+        path: root of fake sysfs-tree
+        speed: 1 runs the sample-clock in real-time, higher values accelerate it
+        edge_interval_n: samples between two gpio-edges
+    """
+
+    # layout of shared memory, derived from buffer-classes of the host-side
+    # NOTE: mmap() needs page-aligned offset -> start at 0
+    ADDR_IV_INP: int = 0
+    ADDR_IV_OUT: int = ADDR_IV_INP + SharedMemIVInput.SIZE_SECTION
+    ADDR_GPIO: int = ADDR_IV_OUT + SharedMemIVOutput.SIZE_SECTION
+    ADDR_UTIL: int = ADDR_GPIO + SharedMemGPIOOutput.SIZE_SECTION
+    SIZE_TOTAL: int = ADDR_UTIL + SharedMemUtilOutput.SIZE_SECTION
+
+    N_INP: int = SharedMemIVInput.N_SAMPLES
+    N_OUT: int = SharedMemIVOutput.N_SAMPLES
+    N_GPIO: int = SharedMemGPIOOutput.N_SAMPLES
+    N_UTIL: int = SharedMemUtilOutput.N_SAMPLES
+
+    TICK_S: float = 0.01
+    # limits work per batch, so the output-ring is never lapped in one go
+    BATCH_N: int = N_OUT // 8
+
+    def __init__(self, path: Path, speed: float = 1.0, edge_interval_n: int = 1000) -> None:
+        if speed <= 0:
+            msg = f"[{type(self).__name__}] Speed must be positive (is {speed})"
+            raise ValueError(msg)
+        self.path = path
+        self.speed = speed
+        self.edge_interval_n = edge_interval_n
+
+        self.fd: int | None = None
+        self._mm: mmap.mmap | None = None
+        self._views: dict[str, np.ndarray] = {}
+        self._mtimes: dict[str, int] = {}
+        self._serving: bool = False
+
+        self.mode: str = "none"
+        self.state: str = "idle"
+        self.ts_start: float | None = None
+        self.ts_stop: float | None = None
+        self.ts_xp_start_ns: int = 0
+        self.samples_done: int = 0
+        self.edges_done: int = 0
+        self.syncs_done: int = 0
+        self.load_ns: int = 0
+        self.underruns_n: int = 0
+
+    def __enter__(self) -> Self:
+        self.fd = os.memfd_create("shepherd-pru-sim")
+        os.ftruncate(self.fd, self.SIZE_TOTAL)
+        self._mm = mmap.mmap(self.fd, self.SIZE_TOTAL)
+        self._map_views()
+        self._view("inp_idx_pru")[0] = commons.IDX_OUT_OF_BOUND
+        self._create_tree()
+        log.info(
+            "[%s] Serving %s (memory: %s, speed: %.1fx)",
+            type(self).__name__,
+            self.path.as_posix(),
+            self.mem_path.as_posix(),
+            self.speed,
+        )
+        return self
+
+    def __exit__(
+        self,
+        typ: type[BaseException] | None = None,
+        exc: BaseException | None = None,
+        tb: TracebackType | None = None,
+        extra_arg: int = 0,
+    ) -> None:
+        self._remove_tree()
+        self._views.clear()  # exported buffers would block closing
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    @property
+    def mem_path(self) -> Path:
+        return Path(f"/proc/{os.getpid()}/fd/{self.fd}")
+
+    def _view(self, name: str) -> np.ndarray:
+        return self._views[name]
+
+    def _map_views(self) -> None:
+        layout = [
+            # name, dtype, address, count
+            ("inp_idx_pru", np.uint32, self.ADDR_IV_INP, 1),
+            ("inp_idx_sys", np.uint32, self.ADDR_IV_INP + 4, 1),
+            ("inp_samples", np.uint32, self.ADDR_IV_INP + 8, 2 * self.N_INP),
+            ("out_idx", np.uint32, self.ADDR_IV_OUT, 1),
+            ("out_timestamps", np.uint64, self.ADDR_IV_OUT + 4, self.N_OUT),
+            ("out_voltages", np.uint32, self.ADDR_IV_OUT + 4 + 8 * self.N_OUT, self.N_OUT),
+            ("out_currents", np.uint32, self.ADDR_IV_OUT + 4 + 12 * self.N_OUT, self.N_OUT),
+            ("gpio_idx", np.uint32, self.ADDR_GPIO, 1),
+            ("gpio_timestamps", np.uint64, self.ADDR_GPIO + 4, self.N_GPIO),
+            ("gpio_bitmasks", np.uint16, self.ADDR_GPIO + 4 + 8 * self.N_GPIO, self.N_GPIO),
+            ("util_idx", np.uint32, self.ADDR_UTIL, 1),
+            ("util_timestamps", np.uint64, self.ADDR_UTIL + 4, self.N_UTIL),
+            ("util_tsample_max", np.uint32, self.ADDR_UTIL + 4 + 8 * self.N_UTIL, self.N_UTIL),
+            ("util_tsample_sum", np.uint32, self.ADDR_UTIL + 4 + 12 * self.N_UTIL, self.N_UTIL),
+            ("util_sample_count", np.uint32, self.ADDR_UTIL + 4 + 16 * self.N_UTIL, self.N_UTIL),
+            ("util_pru1_max", np.uint32, self.ADDR_UTIL + 4 + 20 * self.N_UTIL, self.N_UTIL),
+        ]
+        for name, dtype, address, count in layout:
+            self._views[name] = np.frombuffer(self._mm, dtype, count=count, offset=address)
+
+    def _attributes(self) -> dict[str, str]:
+        return {
+            "mode": self.mode,
+            "state": self.state,
+            "time_start": "0",
+            "time_stop": "0",
+            "pru_msg_box": "",
+            "gpio_tracer_mask": "0",
+            "pru0_firmware": "am335x-pru0-shepherd-EMU-fw",
+            "pru1_firmware": "am335x-pru1-shepherd-fw",
+            "dac_auxiliary_voltage_raw": "0",
+            "calibration_settings": "0 0 \n0 0 \n0 0",
+            "virtual_converter_settings": "0",
+            "virtual_harvester_settings": "0",
+            "programmer/state": "idle",
+            "programmer/datasize": "0",
+            "memory/iv_inp_address": str(self.ADDR_IV_INP),
+            "memory/iv_inp_size": str(SharedMemIVInput.SIZE_SECTION),
+            "memory/iv_out_address": str(self.ADDR_IV_OUT),
+            "memory/iv_out_size": str(SharedMemIVOutput.SIZE_SECTION),
+            "memory/gpio_address": str(self.ADDR_GPIO),
+            "memory/gpio_size": str(SharedMemGPIOOutput.SIZE_SECTION),
+            "memory/util_address": str(self.ADDR_UTIL),
+            "memory/util_size": str(SharedMemUtilOutput.SIZE_SECTION),
+            # last one, signals that tree is complete
+            "memory/device": self.mem_path.as_posix(),
+        }
+
+    def _create_tree(self) -> None:
+        for name, value in self._attributes().items():
+            self._write(name, value)
+            self._mtimes[name] = (self.path / name).stat().st_mtime_ns
+
+    def _remove_tree(self) -> None:
+        for name in self._attributes():
+            (self.path / name).unlink(missing_ok=True)
+        for name in ["programmer", "memory"]:
+            if (self.path / name).is_dir() and not any((self.path / name).iterdir()):
+                (self.path / name).rmdir()
+
+    def _write(self, name: str, value: str) -> None:
+        """Atomic, so readers never see a partial value."""
+        path = self.path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path_tmp = path.with_name(f".{path.name}.tmp")
+        path_tmp.write_text(value, encoding="utf-8")
+        path_tmp.replace(path)
+
+    def _read_changed(self, name: str) -> str | None:
+        """Returns content of attribute if it was written since last call."""
+        path = self.path / name
+        mtime = path.stat().st_mtime_ns
+        if mtime == self._mtimes.get(name):
+            return None
+        value = path.read_text(encoding="utf-8").strip()
+        if not value:
+            # writer has truncated, but not yet written -> check again next time
+            return None
+        self._mtimes[name] = mtime
+        return value
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            log.debug("[%s] State %s -> %s", type(self).__name__, self.state, state)
+        self.state = state
+        self._write("state", state)
+
+    def stop(self) -> None:
+        self._serving = False
+
+    def serve(self, duration_s: float | None = None) -> None:
+        """Runs until duration has passed or stop() was called."""
+        self._serving = True
+        ts_end = time.time() + duration_s if duration_s else None
+        while self._serving and (ts_end is None or time.time() < ts_end):
+            self.step()
+            time.sleep(self.TICK_S)
+
+    def step(self) -> None:
+        """Handles requests from host and moves samples up to current time."""
+        self._poll_attributes()
+        ts_now = time.time()
+        if self.state == "armed" and ts_now >= self.ts_start:
+            self.start(self.ts_start)
+        if self.state == "running":
+            if self.ts_stop is not None and ts_now >= self.ts_stop:
+                self._set_state("stopped")
+                return
+            samples_due = int((ts_now - self.ts_start) * self.speed / commons.SAMPLE_INTERVAL_S)
+            while self.samples_done < samples_due:
+                self.advance(min(samples_due - self.samples_done, self.BATCH_N))
+
+    def _poll_attributes(self) -> None:
+        mode = self._read_changed("mode")
+        if mode in shepherd_modes:
+            self.mode = mode
+        elif mode is not None:
+            log.warning("[%s] Ignored invalid mode '%s'", type(self).__name__, mode)
+
+        time_stop = self._read_changed("time_stop")
+        if time_stop == "now":
+            self._reset()
+        elif time_stop is not None and int(time_stop) > 0:
+            self.ts_stop = int(time_stop)
+
+        time_start = self._read_changed("time_start")
+        if time_start is not None and self.state == "idle":
+            self.ts_start = time.time() if time_start == "now" else int(time_start)
+            self._set_state("armed")
+
+        if self._read_changed("pru_msg_box") is not None:
+            # messages to PRU are consumed, but not answered
+            self._write("pru_msg_box", "")
+            self._mtimes["pru_msg_box"] = (self.path / "pru_msg_box").stat().st_mtime_ns
+
+    def start(self, ts_start: float | None = None) -> None:
+        """Begins sampling, also usable to drive the simulator directly (without serve())."""
+        self.ts_start = time.time() if ts_start is None else ts_start
+        self.ts_xp_start_ns = int(self.ts_start * 1e9)
+        self.samples_done = 0
+        self.edges_done = 0
+        self.syncs_done = 0
+        self.underruns_n = 0
+        for name in ["inp_idx_pru", "out_idx", "gpio_idx", "util_idx"]:
+            self._view(name)[0] = 0
+        self._set_state("running")
+
+    def _reset(self) -> None:
+        if self.underruns_n > 0:
+            log.warning("[%s] Input ran dry for %d samples", type(self).__name__, self.underruns_n)
+        self.ts_start = None
+        self.ts_stop = None
+        self._view("inp_idx_pru")[0] = commons.IDX_OUT_OF_BOUND
+        self._set_state("idle")
+
+    def advance(self, length: int) -> None:
+        """Produces the next samples of all traces."""
+        ts_start_ns = time.perf_counter_ns()
+        first = self.samples_done
+        timestamps = (
+            self.ts_xp_start_ns
+            + np.arange(first, first + length, dtype=np.uint64) * commons.SAMPLE_INTERVAL_NS
+        )
+        if self.mode in harvester_modes:
+            voltages, currents = self._harvest(first, length)
+        else:
+            voltages, currents = self._consume_input(length)
+        self._put("out", {"timestamps": timestamps, "voltages": voltages, "currents": currents})
+
+        edges = np.arange(
+            -(-first // self.edge_interval_n) * self.edge_interval_n,
+            first + length,
+            self.edge_interval_n,
+            dtype=np.uint64,
+        )
+        if edges.size > 0:
+            self._put(
+                "gpio",
+                {
+                    "timestamps": self.ts_xp_start_ns + edges * commons.SAMPLE_INTERVAL_NS,
+                    "bitmasks": ((edges // self.edge_interval_n) % 2).astype(np.uint16),
+                },
+            )
+            self.edges_done += edges.size
+
+        syncs = (first + length) // commons.SAMPLES_PER_SYNC - self.syncs_done
+        if syncs > 0:
+            periods = np.arange(self.syncs_done, self.syncs_done + syncs, dtype=np.uint64)
+            count = np.full(syncs, commons.SAMPLES_PER_SYNC, dtype=np.uint32)
+            self._put(
+                "util",
+                {
+                    "timestamps": self.ts_xp_start_ns + periods * commons.SYNC_INTERVAL_NS,
+                    "tsample_max": np.full(syncs, self.load_ns, dtype=np.uint32),
+                    "tsample_sum": count * self.load_ns,
+                    "sample_count": count,
+                    "pru1_max": np.zeros(syncs, dtype=np.uint32),
+                },
+            )
+            self.syncs_done += syncs
+
+        self.samples_done += length
+        # load relative to the (accelerated) sample-interval, expressed in ns like the PRU
+        duration_ns = (time.perf_counter_ns() - ts_start_ns) * self.speed / length
+        self.load_ns = int(min(duration_ns, 2 * commons.SAMPLE_INTERVAL_NS))
+
+    def _harvest(self, first: int, length: int) -> tuple[np.ndarray, np.ndarray]:
+        ramp = np.arange(first, first + length, dtype=np.uint32) % commons.SAMPLES_PER_SYNC
+        voltages = ramp * 100  # up to 1 V in uV
+        currents = np.full(length, 1000, dtype=np.uint32)
+        return voltages, currents
+
+    def _consume_input(self, length: int) -> tuple[np.ndarray, np.ndarray]:
+        """Takes samples that host made available, missing ones are zero."""
+        voltages = np.zeros(length, dtype=np.uint32)
+        currents = np.zeros(length, dtype=np.uint32)
+        index_pru = int(self._view("inp_idx_pru")[0])
+        index_sys = int(self._view("inp_idx_sys")[0])
+        available = (index_sys - index_pru) % self.N_INP if index_sys < self.N_INP else 0
+        usable = min(length, available)
+        samples = self._view("inp_samples")
+        for pos_ring, pos_data, size in ring_slices(index_pru, usable, self.N_INP):
+            voltages[pos_data : pos_data + size] = samples[2 * pos_ring : 2 * (pos_ring + size) : 2]
+            currents[pos_data : pos_data + size] = samples[
+                2 * pos_ring + 1 : 2 * (pos_ring + size) : 2
+            ]
+        self._view("inp_idx_pru")[0] = (index_pru + usable) % self.N_INP
+        self.underruns_n += length - usable
+        return voltages, currents
+
+    def _put(self, buffer: str, data: dict[str, np.ndarray]) -> None:
+        """Writes into a ring-buffer of the host and moves its index after that."""
+        size = self._view(f"{buffer}_timestamps").size
+        index = int(self._view(f"{buffer}_idx")[0])
+        length = data["timestamps"].size
+        for pos_ring, pos_data, part in ring_slices(index, length, size):
+            for name, values in data.items():
+                self._view(f"{buffer}_{name}")[pos_ring : pos_ring + part] = values[
+                    pos_data : pos_data + part
+                ]
+        self._view(f"{buffer}_idx")[0] = (index + length) % size
+
+
+@click.command(short_help="Runs a software stand-in for PRUs & kernel module")
+@click.argument("path", type=click.Path(file_okay=False, path_type=Path))
+@click.option(
+    "--speed",
+    "-s",
+    type=click.FLOAT,
+    default=1.0,
+    help="Acceleration of sample-clock, 1 is real-time",
+)
+@click.option("--verbose", "-v", is_flag=True)
+def main(path: Path, speed: float, *, verbose: bool) -> None:
+    if verbose:
+        set_verbosity()
+    with PruSimulator(path, speed) as sim:
+
+        def exit_gracefully(_signum: int, _frame: FrameType | None) -> None:
+            sim.stop()
+
+        signal.signal(signal.SIGTERM, exit_gracefully)
+        signal.signal(signal.SIGINT, exit_gracefully)
+        sim.serve()
+
+
+if __name__ == "__main__":
+    main()
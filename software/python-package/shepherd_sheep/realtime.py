@@ -0,0 +1,226 @@
+"""
+shepherd.realtime
+~~~~~
+Opt-in real-time profile for the measurement-loop. Occasional stalls
+(scheduler-preemption, page-faults, cyclic garbage-collection) are what
+overflows the PRU-buffers, so this targets tail-latency:
+
+- pin the loop to CPU-cores and use a real-time scheduling-policy
+- lock all memory (mlockall) & prefault the shared memory with the PRUs
+- defer cyclic GC, the loop collects when idle (older generations as often
+  as the regular GC-thresholds would)
+- lower priority of monitor-threads
+
+Every change gets reported and restored on exit. Failing steps
+(i.e. missing privileges) are skipped with a warning.
+
+NOTE: sched_setaffinity() & sched_setscheduler() with pid 0 only affect
+the calling thread on linux, helper-threads keep their settings.
+
+"""
+
+import ctypes
+import ctypes.util
+import gc
+import os
+import threading
+from collections.abc import Callable
+from contextlib import ExitStack
+from types import TracebackType
+from typing import TYPE_CHECKING
+
+from typing_extensions import Self
+
+from .logger import log
+from .run_options import RunOptions
+
+if TYPE_CHECKING:
+    from .shared_memory import SharedMemory
+
+# from linux/mman.h
+MCL_CURRENT: int = 1
+MCL_FUTURE: int = 2
+
+sched_policies = {
+    "fifo": os.SCHED_FIFO,
+    "rr": os.SCHED_RR,
+}
+sched_names = {
+    os.SCHED_OTHER: "SCHED_OTHER",
+    os.SCHED_FIFO: "SCHED_FIFO",
+    os.SCHED_RR: "SCHED_RR",
+}
+
+# threads of the hdf5-monitors, see h5_monitor_*.py
+monitor_prefix = "Shp.H5Mon"
+monitor_nice = 10
+
+
+class RealtimeProfile:
+    """Applies the real-time profile while in context (does nothing if not enabled).
+
+    Args:
+        options: node-local run-settings
+        shared_mem: memory that gets prefaulted
+    """
+
+    def __init__(self, options: RunOptions | None, shared_mem: "SharedMemory | None") -> None:
+        self.options = options if options is not None else RunOptions()
+        if self.options.realtime_policy not in sched_policies:
+            msg = f"Real-time policy must be one of {list(sched_policies)}"
+            raise ValueError(msg)
+        self.shared_mem = shared_mem
+        self._stack = ExitStack()
+        self.gc_deferred: bool = False
+        # idle-collections between collecting gen1 & gen2, from gc.get_threshold()
+        self.gc_every: tuple[int, int] = (10, 100)
+        self._collects_n: int = 0
+
+    def __enter__(self) -> Self:
+        if not self.options.realtime:
+            return self
+        log.info("[%s] Activating real-time profile", type(self).__name__)
+        for step in [
+            self._set_affinity,
+            self._set_scheduler,
+            self._lock_memory,
+            self._prefault,
+            self._defer_gc,
+            self._lower_monitors,
+        ]:
+            try:
+                step()
+            except OSError as xcp:  # noqa: PERF203
+                log.warning("[%s] Skipped %s (%s)", type(self).__name__, step.__name__[1:], xcp)
+        return self
+
+    def __exit__(
+        self,
+        typ: type[BaseException] | None = None,
+        exc: BaseException | None = None,
+        tb: TracebackType | None = None,
+        extra_arg: int = 0,
+    ) -> None:
+        if self.options.realtime:
+            self._stack.close()
+            log.info("[%s] Restored previous settings", type(self).__name__)
+
+    def collect(self) -> None:
+        """Runs GC if deferred, to be called between segments.
+
+        Mostly the youngest generation, but cyclic garbage that got promoted
+        would otherwise pile up over multi-day runs -> every gc_every calls
+        gen1 / gen2 get collected as well.
+        """
+        if not self.gc_deferred:
+            return
+        self._collects_n += 1
+        generation = 0
+        if self._collects_n % self.gc_every[1] == 0:
+            generation = 2
+        elif self._collects_n % self.gc_every[0] == 0:
+            generation = 1
+        gc.collect(generation=generation)
+
+    def _restore(self, message: str, fn: Callable[..., object], *args: object) -> None:
+        def restore() -> None:
+            try:
+                fn(*args)
+            except OSError as xcp:
+                log.warning("[%s] Failed to restore %s (%s)", type(self).__name__, message, xcp)
+            else:
+                log.debug("[%s] Restored %s", type(self).__name__, message)
+
+        self._stack.callback(restore)
+
+    def _set_affinity(self) -> None:
+        if self.options.realtime_cpus is None:
+            return
+        cpus_old = os.sched_getaffinity(0)
+        os.sched_setaffinity(0, self.options.realtime_cpus)
+        self._restore("cpu-affinity", os.sched_setaffinity, 0, cpus_old)
+        log.info(
+            "[%s] CPU-affinity: %s -> %s",
+            type(self).__name__,
+            sorted(cpus_old),
+            sorted(self.options.realtime_cpus),
+        )
+
+    def _set_scheduler(self) -> None:
+        policy = sched_policies[self.options.realtime_policy]
+        policy_old = os.sched_getscheduler(0)
+        param_old = os.sched_getparam(0)
+        os.sched_setscheduler(0, policy, os.sched_param(self.options.realtime_priority))
+        self._restore("scheduler", os.sched_setscheduler, 0, policy_old, param_old)
+        log.info(
+            "[%s] Scheduler: %s (prio %d) -> %s (prio %d)",
+            type(self).__name__,
+            sched_names.get(policy_old, policy_old),
+            param_old.sched_priority,
+            sched_names[policy],
+            self.options.realtime_priority,
+        )
+
+    def _lock_memory(self) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        if libc.mlockall(MCL_CURRENT | MCL_FUTURE) != 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self._restore("memory-lock", libc.munlockall)
+        log.info("[%s] Memory: locked (current & future pages)", type(self).__name__)
+
+    def _prefault(self) -> None:
+        if self.shared_mem is None:
+            return
+        pages = self.shared_mem.prefault()
+        log.info("[%s] Shared memory: prefaulted %d pages", type(self).__name__, pages)
+
+    def _defer_gc(self) -> None:
+        enabled = gc.isenabled()
+        gc.collect()
+        # objects from setup don't get scanned again
+        gc.freeze()
+        gc.disable()
+        # same ratios as automatic GC: gen1 after threshold1 gen0-runs, gen2 after threshold2 gen1
+        _, threshold1, threshold2 = gc.get_threshold()
+        self.gc_every = (max(threshold1, 1), max(threshold1, 1) * max(threshold2, 1))
+        self._collects_n = 0
+        self.gc_deferred = True
+        self._stack.callback(self._resume_gc, enabled=enabled)
+        log.info(
+            "[%s] Garbage-collection: deferred, %d objects frozen",
+            type(self).__name__,
+            gc.get_freeze_count(),
+        )
+
+    def _resume_gc(self, *, enabled: bool) -> None:
+        self.gc_deferred = False
+        gc.unfreeze()
+        if enabled:
+            gc.enable()
+        log.debug("[%s] Restored garbage-collection", type(self).__name__)
+
+    def _lower_monitors(self) -> None:
+        for thread in threading.enumerate():
+            if not thread.name.startswith(monitor_prefix) or thread.native_id is None:
+                continue
+            nice_old = os.getpriority(os.PRIO_PROCESS, thread.native_id)
+            os.setpriority(os.PRIO_PROCESS, thread.native_id, monitor_nice)
+            self._restore(
+                f"nice of {thread.name}",
+                _set_thread_nice,
+                thread,
+                nice_old,
+            )
+            log.info(
+                "[%s] Thread %s: nice %d -> %d",
+                type(self).__name__,
+                thread.name,
+                nice_old,
+                monitor_nice,
+            )
+
+
+def _set_thread_nice(thread: threading.Thread, nice: int) -> None:
+    if thread.is_alive() and thread.native_id is not None:
+        os.setpriority(os.PRIO_PROCESS, thread.native_id, nice)
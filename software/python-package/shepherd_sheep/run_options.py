@@ -0,0 +1,46 @@
+"""
+shepherd.run_options
+~~~~~
+Settings for running tasks on this node. They complement the task-models
+of the core-lib (shared by the whole testbed) with knobs that only concern
+the local sheep-process.
+
+"""
+
+from dataclasses import dataclass
+from dataclasses import field
+
+from .memory_budget import MemoryBudget
+
+
+@dataclass(frozen=True)
+class RunOptions:
+    """Node-local settings for the measurement-process.
+
+    Args:
+        realtime: activates the real-time profile during measurement (see realtime.py)
+        realtime_cpus: cores the measurement-loop is pinned to, None keeps current affinity
+        realtime_priority: static priority for the real-time scheduler [1, 99]
+        realtime_policy: "fifo" or "rr" (round-robin)
+        memory_budget: sizes caches & queues to stay below a RAM-limit
+        loop_input: repeats input of emulations for the whole duration (see looped_input.py)
+        loop_shift_s: each repetition starts this much later in the input
+        tune_segments: measures & picks size of input-segments and poll-cadence of emulation
+        swmr: output-file stays readable for other processes while recording
+        telemetry_port: publishes decimated live-stream for the herd on this TCP-port (None = off)
+        gpio_filter: removes redundant records from gpio-traces before writing (see gpio_filter.py)
+        gpio_glitch_ns: with gpio_filter, also removes pin-states shorter than this
+    """
+
+    realtime: bool = False
+    realtime_cpus: tuple[int, ...] | None = None
+    realtime_priority: int = 50
+    realtime_policy: str = "fifo"
+    memory_budget: MemoryBudget = field(default_factory=MemoryBudget)
+    loop_input: bool = False
+    loop_shift_s: float = 0.0
+    tune_segments: bool = False
+    swmr: bool = False
+    telemetry_port: int | None = None
+    gpio_filter: bool = False
+    gpio_glitch_ns: int = 0
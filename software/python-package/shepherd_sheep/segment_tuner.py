@@ -0,0 +1,142 @@
+"""
+shepherd.segment_tuner
+~~~~~
+Picks the size of segments written to the IV-input-buffer (and the
+poll-cadence of the main-loop) by measuring the emulator on this node.
+
+During the first seconds of a run, candidate sizes are tried one after
+another. For each, the busy-time (everything but idling) per served segment
+is compared to the time the PRU needs to consume it. The size with the
+largest headroom is kept for the rest of the run.
+
+"""
+
+from collections.abc import Callable
+from collections.abc import Generator
+from collections.abc import Iterable
+
+import numpy as np
+
+from . import commons
+from .logger import log
+from .shared_mem_iv_input import SharedMemIVInput
+
+# samples per segment, 25 ms to 400 ms
+CANDIDATES_N: tuple[int, ...] = (2_500, 5_000, 10_000, 20_000, 40_000)
+# data-time each candidate gets measured with
+TRIAL_S: float = 1.0
+# idling takes at most this share of the remaining slack per segment
+POLL_SHARE: float = 1 / 4
+POLL_MIN_S: float = 1e-3
+
+
+class SegmentTuner:
+    """Tries segment-sizes one after another and keeps the one with most headroom.
+
+    Args:
+        candidates: samples per segment, invalid sizes for the IV-buffer get dropped
+        trial_s: data-time each candidate is measured with
+    """
+
+    def __init__(
+        self,
+        candidates: Iterable[int] = CANDIDATES_N,
+        trial_s: float = TRIAL_S,
+    ) -> None:
+        self.candidates: list[int] = [
+            _n for _n in candidates if SharedMemIVInput.chunk_size_valid(_n)
+        ]
+        if len(self.candidates) < 1:
+            msg = f"[{type(self).__name__}] No valid segment-size in candidates"
+            raise ValueError(msg)
+        self.trial_samples_n: int = round(trial_s / commons.SAMPLE_INTERVAL_S)
+        # per candidate: busy-time [ns] & samples served
+        self.busy_ns: dict[int, int] = {}
+        self.samples_n: dict[int, int] = {}
+        self._index: int = 0
+        self.segment_n: int = self.candidates[0]
+        self.poll_s: float = self.segment_period_s / 10
+        self.done: bool = False
+
+    @property
+    def segment_period_s(self) -> float:
+        return self.segment_n * commons.SAMPLE_INTERVAL_S
+
+    def record(self, busy_ns: int, samples_n: int) -> None:
+        """Adds busy-time it took to serve a segment, switches candidate when trial is over."""
+        if self.done:
+            return
+        self.busy_ns[self.segment_n] = self.busy_ns.get(self.segment_n, 0) + busy_ns
+        self.samples_n[self.segment_n] = self.samples_n.get(self.segment_n, 0) + samples_n
+        if self.samples_n[self.segment_n] < self.trial_samples_n:
+            return
+        self._index += 1
+        if self._index < len(self.candidates):
+            self.segment_n = self.candidates[self._index]
+            self.poll_s = self.segment_period_s / 10
+        else:
+            self.finish()
+
+    def headroom(self, segment_n: int) -> float:
+        """Share of PRU-time the main-loop was not busy while serving segments of this size."""
+        samples_n = self.samples_n.get(segment_n, 0)
+        if samples_n < 1:
+            return 0.0
+        return 1.0 - self.busy_ns[segment_n] / (samples_n * commons.SAMPLE_INTERVAL_NS)
+
+    def finish(self) -> None:
+        """Picks best candidate measured so far (also for runs shorter than the trials)."""
+        if self.done:
+            return
+        self.done = True
+        measured = [_n for _n in self.candidates if self.samples_n.get(_n, 0) > 0]
+        if len(measured) < 1:
+            return
+        self.segment_n = max(measured, key=self.headroom)
+        headroom = self.headroom(self.segment_n)
+        self.poll_s = min(
+            max(self.segment_period_s * headroom * POLL_SHARE, POLL_MIN_S),
+            self.segment_period_s / 2,
+        )
+        log.info(
+            "[%s] Segments of %d samples (headroom %.1f %%), polling every %.1f ms",
+            type(self).__name__,
+            self.segment_n,
+            100 * headroom,
+            1e3 * self.poll_s,
+        )
+
+    def results(self) -> list[tuple[int, int, int, float]]:
+        """Rows of (samples per segment, samples served, busy-time [ns], headroom)."""
+        return [
+            (_n, self.samples_n[_n], self.busy_ns[_n], self.headroom(_n))
+            for _n in self.candidates
+            if _n in self.samples_n
+        ]
+
+
+def rechunk(
+    segments: Iterable[tuple[np.ndarray, np.ndarray]],
+    size: Callable[[], int],
+) -> Generator[tuple[np.ndarray, np.ndarray], None, None]:
+    """Regroups voltage- & current-segments into pieces of (changing) size.
+
+    size() gets evaluated right before a piece is cut, the remainder comes last.
+    """
+    pending_v: list[np.ndarray] = []
+    pending_c: list[np.ndarray] = []
+    pending_n = 0
+    for dsv, dsc in segments:
+        pending_v.append(dsv)
+        pending_c.append(dsc)
+        pending_n += dsv.size
+        while pending_n >= size():
+            length = size()
+            voltage = pending_v[0] if len(pending_v) == 1 else np.concatenate(pending_v)
+            current = pending_c[0] if len(pending_c) == 1 else np.concatenate(pending_c)
+            yield voltage[:length], current[:length]
+            pending_n -= length
+            pending_v = [voltage[length:]] if pending_n > 0 else []
+            pending_c = [current[length:]] if pending_n > 0 else []
+    if pending_n > 0:
+        yield np.concatenate(pending_v), np.concatenate(pending_c)
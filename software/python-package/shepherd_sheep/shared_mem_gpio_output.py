@@ -15,6 +15,8 @@ from .logger import log
 from .sysfs_interface import wait_for_state
 from .sysfs_interface import write_gpio_tracer_mask
 from .target_io import target_port_to_cape_v24_mapping
+from .trace_pool import TracePool
+from .trace_window import clip_to_window
 
 
 @dataclass
@@ -95,6 +97,13 @@ class SharedMemGPIOOutput:
 
         self.fill_level: float = 0
         self.fill_last: float = 0
+        self.overflows_n: int = 0
+
+        self.pool = TracePool(
+            GPIOTrace,
+            {"timestamps_ns": np.uint64, "bitmasks": np.uint16},
+            capacity=self.N_SAMPLES_PER_CHUNK,
+        )
 
         # time - boundaries
 
@@ -125,6 +134,7 @@ class SharedMemGPIOOutput:
                     mask_v24 |= 2**_pin
         wait_for_state("idle", 4)
         write_gpio_tracer_mask(mask_v24)
+        self.mask: int = mask_v24
         log.debug(
             "[%s] Tracer GPIO mask = %s (max is 0x3FF for cape 2.4)",
             type(self).__name__,
@@ -171,6 +181,7 @@ class SharedMemGPIOOutput:
         # detect overflow
         if (self.fill_level <= 0.5 - self.FILL_GAP) and (self.fill_last >= 0.5 + self.FILL_GAP):
             log.error("[%s] Possible overflow detected!", type(self).__name__)
+            self.overflows_n += 1
         self.fill_last = self.fill_level
         return avail_length
 
@@ -210,17 +221,18 @@ class SharedMemGPIOOutput:
             offset=self._offset_timestamps + self.index_next * 8,
         )
 
-        if (not self.ts_set) or (
-            (timestamps[0] <= self.ts_stop) and (timestamps[-1] >= self.ts_start)
-        ):
-            data = GPIOTrace(
-                timestamps_ns=timestamps,
-                bitmasks=np.frombuffer(
-                    self._mm,
-                    np.uint16,
-                    count=read_length,
-                    offset=self._offset_bitmasks + self.index_next * 2,
-                ),
+        idx_start, idx_stop = clip_to_window(
+            timestamps, ts_set=self.ts_set, ts_start=self.ts_start, ts_stop=self.ts_stop
+        )
+        if idx_stop > idx_start:
+            # copy out of ring, PRU reuses this segment after index advances
+            data = self.pool.acquire(idx_stop - idx_start)
+            data.timestamps_ns[:] = timestamps[idx_start:idx_stop]
+            data.bitmasks[:] = np.frombuffer(
+                self._mm,
+                np.uint16,
+                count=idx_stop - idx_start,
+                offset=self._offset_bitmasks + (self.index_next + idx_start) * 2,
             )
         else:
             data = None
@@ -235,3 +247,7 @@ class SharedMemGPIOOutput:
             self.check_canary()
 
         return data
+
+    def release(self, data: GPIOTrace | None) -> None:
+        """Hands a trace from read() back for reuse."""
+        self.pool.release(data)
@@ -7,6 +7,7 @@ from types import MappingProxyType
 from types import TracebackType
 
 import numpy as np
+from shepherd_core import CalibrationPair
 from shepherd_core import CalibrationSeries
 from typing_extensions import Self
 
@@ -127,6 +128,11 @@ class SharedMemIVInput:
 
         self.fill_level: float = 0
         self.fill_last: float = 0
+        self.overflows_n: int = 0
+
+        # reused by every write (calibration & interleaving), writes never exceed a chunk
+        self._scratch = np.empty(self.n_samples_per_chunk, dtype=np.float64)
+        self._iv_data = np.empty(2 * self.n_samples_per_chunk, dtype=np.uint32)
 
     def __enter__(self) -> Self:
         self._mm.seek(self._offset_idx_sys)
@@ -168,6 +174,7 @@ class SharedMemIVInput:
         # detect overflow
         if (self.fill_level <= 0.5 - self.FILL_GAP) and (self.fill_last >= 0.5 + self.FILL_GAP):
             log.error("[%s] Possible overflow detected!", type(self).__name__)
+            self.overflows_n += 1
         self.fill_last = self.fill_level
         return min(
             avail_length,
@@ -191,24 +198,25 @@ class SharedMemIVInput:
         ts_start = time.time() if verbose else None
         if self.index_next is None:
             self.index_next = 0
-        # TODO: This part could be optimized further - write a benchmark
-        # transform raw ADC data to SI-Units -> the virtual-source-emulator in PRU expects uV and nV
+        # interweave data (voltage | current in parallel), into preallocated buffer
+        length = len(data)
+        iv_data = self._iv_data[: 2 * length]
         if cal:
+            # transform raw ADC data to SI-Units -> virtual-source-emulator in PRU expects uV and nV
             # option to disable scaling here if already done (performance improvement)
-            data.voltage = cal.voltage.raw_to_si(data.voltage).astype("u4")
-            data.current = cal.current.raw_to_si(data.current).astype("u4")
-        # interweave data (voltage | current in parallel)
-        iv_data = np.empty((2 * len(data),), dtype=data.voltage.dtype)
-        iv_data[0::2] = data.voltage[: len(data)]
-        iv_data[1::2] = data.current[: len(data)]
+            iv_data[0::2] = self._raw_to_si(data.voltage[:length], cal.voltage)
+            iv_data[1::2] = self._raw_to_si(data.current[:length], cal.current)
+        else:
+            iv_data[0::2] = data.voltage[:length]
+            iv_data[1::2] = data.current[:length]
         # Seek buffer location in memory and skip header
-        if self.index_next + len(data) <= self.N_SAMPLES:
+        if self.index_next + length <= self.N_SAMPLES:
             self._mm.seek(self._offset_samples + self.index_next * self.SIZE_SAMPLE)
-            self._mm.write(iv_data.tobytes())
+            self._mm.write(iv_data)
         else:
             cut_position = 2 * (self.N_SAMPLES - self.index_next)
             self._mm.seek(self._offset_samples + self.index_next * self.SIZE_SAMPLE)
-            self._mm.write(iv_data[:cut_position].tobytes())
+            self._mm.write(iv_data[:cut_position])
             if len(iv_data[:cut_position]) + len(iv_data[cut_position:]) > len(iv_data):
                 log.error(
                     "NUMPY specific error %d, %d, %d",
@@ -217,7 +225,7 @@ class SharedMemIVInput:
                     len(iv_data),
                 )
             self._mm.seek(self._offset_samples)
-            self._mm.write(iv_data[cut_position:].tobytes())
+            self._mm.write(iv_data[cut_position:])
 
         if verbose:
             log.debug(
@@ -228,7 +236,7 @@ class SharedMemIVInput:
                 100 * self.fill_level,
             )
         # update sys-index
-        self.index_next = (self.index_next + len(data)) % self.N_SAMPLES
+        self.index_next = (self.index_next + length) % self.N_SAMPLES
         self._mm.seek(self._offset_idx_sys)
         self._mm.write(struct.pack("=L", self.index_next))
 
@@ -237,6 +245,55 @@ class SharedMemIVInput:
 
         return True
 
+    @classmethod
+    def chunk_size_valid(cls, n_samples: int) -> bool:
+        """Chunk has to leave enough time between polls for overflow detection."""
+        if n_samples < 1 or n_samples > cls.N_SAMPLES // 4:
+            return False
+        fill_gap = 1.0 / (cls.N_SAMPLES // n_samples)
+        return (0.5 - fill_gap) * commons.BUFFER_IV_INP_INTERVAL_S >= 0.1
+
+    def set_chunk_size(self, n_samples: int) -> None:
+        """Changes max length of writes (i.e. segment-size) during operation."""
+        if not self.chunk_size_valid(n_samples):
+            msg = f"[{type(self).__name__}] Chunk-size of {n_samples} samples is not supported"
+            raise ValueError(msg)
+        self.n_samples_per_chunk = n_samples
+        self.n_buffer_chunks = self.N_SAMPLES // n_samples
+        if self._scratch.size < n_samples:
+            self._scratch = np.empty(n_samples, dtype=np.float64)
+            self._iv_data = np.empty(2 * n_samples, dtype=np.uint32)
+
+    def write_bulk(self, iv_data: np.ndarray) -> None:
+        """Initial fill of the empty buffer in one contiguous write.
+
+        Args:
+            iv_data: interleaved samples (voltage | current) in PRU-units (uV, nA)
+        """
+        if self.index_next is not None:
+            msg = f"[{type(self).__name__}] Bulk-write is only possible into an empty buffer"
+            raise BufferError(msg)
+        length = iv_data.size // 2
+        if length >= self.N_SAMPLES:
+            msg = f"[{type(self).__name__}] Initial fill exceeds buffer ({length} samples)"
+            raise BufferError(msg)
+        if length < 1:
+            return
+        self._mm.seek(self._offset_samples)
+        self._mm.write(np.ascontiguousarray(iv_data[: 2 * length], dtype=np.uint32))
+        # update sys-index
+        self.index_next = length
+        self._mm.seek(self._offset_idx_sys)
+        self._mm.write(struct.pack("=L", self.index_next))
+        self.check_canary()
+
+    def _raw_to_si(self, values: np.ndarray, cal: CalibrationPair) -> np.ndarray:
+        """Same as CalibrationPair.raw_to_si(), but without allocating a result."""
+        values_si = self._scratch[: values.size]
+        np.multiply(values, cal.gain, out=values_si)
+        np.add(values_si, cal.offset, out=values_si)
+        return values_si
+
     def write_firmware(self, data: bytes) -> int:
         data_size = len(data)
         if data_size > self.SIZE_SAMPLES:
@@ -12,6 +12,8 @@ from . import commons
 from . import sysfs_interface as sfs
 from .logger import log
 from .shared_mem_iv_input import IVTrace
+from .trace_pool import TracePool
+from .trace_window import clip_to_window
 
 
 class SharedMemIVOutput:
@@ -83,6 +85,7 @@ class SharedMemIVOutput:
 
         self.fill_level: float = 0
         self.fill_last: float = 0
+        self.overflows_n: int = 0
 
         self.xp_start: float = ts_xp_start_ns * 1e-9
 
@@ -105,6 +108,12 @@ class SharedMemIVOutput:
 
         self.timestamp_last: int = 0
 
+        self.pool = TracePool(
+            IVTrace,
+            {"voltage": np.uint32, "current": np.uint32, "timestamp_ns": np.uint64},
+            capacity=self.N_SAMPLES_PER_CHUNK,
+        )
+
     def __enter__(self) -> Self:
         self._mm.seek(self._offset_base)
         self._mm.write(bytes(bytearray(self.SIZE_SECTION - self.SIZE_CANARY)))
@@ -146,6 +155,7 @@ class SharedMemIVOutput:
         # detect overflow
         if (self.fill_level <= 0.5 - self.FILL_GAP) and (self.fill_last >= 0.5 + self.FILL_GAP):
             log.error("[%s] Possible overflow detected!", type(self).__name__)
+            self.overflows_n += 1
         self.fill_last = self.fill_level
         return avail_length
 
@@ -154,7 +164,7 @@ class SharedMemIVOutput:
 
         :param verbose: chatter-prevention, performance-critical computation saver
 
-        Returns: IVTrace if available
+        Returns: IVTrace if available, owned by caller until release()
         """
         avail_length = self.get_size_available()
 
@@ -199,23 +209,24 @@ class SharedMemIVOutput:
         self.timestamp_last = pru_timestamp
 
         # prepare & fetch data
-        if (not self.ts_set) or (
-            (timestamps_ns[0] <= self.ts_stop) and (timestamps_ns[-1] >= self.ts_start)
-        ):
-            data = IVTrace(
-                voltage=np.frombuffer(
-                    self._mm,
-                    np.uint32,
-                    count=self.N_SAMPLES_PER_CHUNK,
-                    offset=self._offset_voltages + self.index_next * 4,
-                ),
-                current=np.frombuffer(
-                    self._mm,
-                    np.uint32,
-                    count=self.N_SAMPLES_PER_CHUNK,
-                    offset=self._offset_currents + self.index_next * 4,
-                ),
-                timestamp_ns=timestamps_ns,
+        idx_start, idx_stop = clip_to_window(
+            timestamps_ns, ts_set=self.ts_set, ts_start=self.ts_start, ts_stop=self.ts_stop
+        )
+        if idx_stop > idx_start:
+            # copy out of ring, PRU reuses this segment after index advances
+            data = self.pool.acquire(idx_stop - idx_start)
+            data.timestamp_ns[:] = timestamps_ns[idx_start:idx_stop]
+            data.voltage[:] = np.frombuffer(
+                self._mm,
+                np.uint32,
+                count=idx_stop - idx_start,
+                offset=self._offset_voltages + (self.index_next + idx_start) * 4,
+            )
+            data.current[:] = np.frombuffer(
+                self._mm,
+                np.uint32,
+                count=idx_stop - idx_start,
+                offset=self._offset_currents + (self.index_next + idx_start) * 4,
             )
         else:
             data = None
@@ -243,3 +254,7 @@ class SharedMemIVOutput:
             self.check_canary()
 
         return data
+
+    def release(self, data: IVTrace | None) -> None:
+        """Hands a trace from read() back for reuse."""
+        self.pool.release(data)
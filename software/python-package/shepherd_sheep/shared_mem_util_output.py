@@ -10,6 +10,8 @@ from typing_extensions import Self
 from . import commons
 from . import sysfs_interface as sfs
 from .logger import log
+from .trace_pool import TracePool
+from .util_analyzer import UtilAnalyzer
 
 
 @dataclass
@@ -103,8 +105,22 @@ class SharedMemUtilOutput:
 
         self.fill_level: float = 0
         self.fill_last: float = 0
-
-        self.warn_counter: int = 10
+        self.overflows_n: int = 0
+
+        # reports every critical window, merged to events
+        self.analyzer = UtilAnalyzer()
+
+        self.pool = TracePool(
+            UtilTrace,
+            {
+                "timestamps_ns": np.uint64,
+                "pru0_tsample_mean": np.float64,
+                "pru0_tsample_max": np.uint32,
+                "pru1_tsample_max": np.uint32,
+                "sample_count": np.uint32,
+            },
+            capacity=self.N_SAMPLES_PER_CHUNK,
+        )
 
     def __enter__(self) -> Self:
         # TODO: there should also be alternative access: _mm[a:b] = b'...'
@@ -141,6 +157,7 @@ class SharedMemUtilOutput:
         # detect overflow
         if (self.fill_level <= 0.5 - self.FILL_GAP) and (self.fill_last >= 0.5 + self.FILL_GAP):
             log.error("[%s] Possible overflow detected!", type(self).__name__)
+            self.overflows_n += 1
         self.fill_last = self.fill_level
         return avail_length
 
@@ -168,43 +185,42 @@ class SharedMemUtilOutput:
                 time.time(),
                 100 * self.fill_level,
             )
-        # prepare & fetch data
-        sample_count = np.frombuffer(
+        # prepare & fetch data, copy out of ring (PRU reuses segment after index advances)
+        data = self.pool.acquire(read_length)
+        data.sample_count[:] = np.frombuffer(
             self._mm,
             np.uint32,
             count=read_length,
             offset=self._offset_sample_count + self.index_next * 4,
         )
-        sample_count_safe = sample_count
-        sample_count_safe[sample_count_safe < 1] = 1
-
-        data = UtilTrace(
-            timestamps_ns=np.frombuffer(
-                self._mm,
-                np.uint64,
-                count=read_length,
-                offset=self._offset_timestamps + self.index_next * 8,
-            ),
-            pru0_tsample_max=np.frombuffer(
-                self._mm,
-                np.uint32,
-                count=read_length,
-                offset=self._offset_pru0_tsample_max + self.index_next * 4,
-            ),
-            pru1_tsample_max=np.frombuffer(
-                self._mm,
-                np.uint32,
-                count=read_length,
-                offset=self._offset_pru1_tsample_max + self.index_next * 4,
-            ),
-            pru0_tsample_mean=np.frombuffer(
+        np.maximum(data.sample_count, 1, out=data.sample_count)
+        data.timestamps_ns[:] = np.frombuffer(
+            self._mm,
+            np.uint64,
+            count=read_length,
+            offset=self._offset_timestamps + self.index_next * 8,
+        )
+        data.pru0_tsample_max[:] = np.frombuffer(
+            self._mm,
+            np.uint32,
+            count=read_length,
+            offset=self._offset_pru0_tsample_max + self.index_next * 4,
+        )
+        data.pru1_tsample_max[:] = np.frombuffer(
+            self._mm,
+            np.uint32,
+            count=read_length,
+            offset=self._offset_pru1_tsample_max + self.index_next * 4,
+        )
+        np.divide(
+            np.frombuffer(
                 self._mm,
                 np.uint32,
                 count=read_length,
                 offset=self._offset_pru0_tsample_sum + self.index_next * 4,
-            )
-            / sample_count_safe,
-            sample_count=sample_count,
+            ),
+            data.sample_count,
+            out=data.pru0_tsample_mean,
         )
         # TODO: segment should be reset to ZERO to better detect errors
         self.index_next = (self.index_next + read_length) % self.N_SAMPLES
@@ -218,24 +234,10 @@ class SharedMemUtilOutput:
         return data
 
     def check_status(self, data: UtilTrace, *, verbose: bool = False) -> None:
-        # TODO: cleanup, every crit-instance should be reported
-        util_mean_val = data.pru0_tsample_mean.mean() * 100 / commons.SAMPLE_INTERVAL_NS
-        util_max_val = data.pru0_tsample_max.max() * 100 / commons.SAMPLE_INTERVAL_NS
-        util_mean_crit = util_mean_val > 95.0
-        util_max_crit = util_max_val >= 100.0
-
-        if (self.warn_counter > 0) and (util_mean_crit or util_max_crit):
-            log.warning(
-                "Pru0-Util: mean = %.3f %%, max = %.3f %% "
-                "-> WARNING: probably broken real-time-condition",
-                util_mean_val,
-                util_max_val,
-            )
-            self.warn_counter -= 1
-            if self.warn_counter == 0:
-                # silenced because this is causing overhead without a cape
-                log.warning("Pru0-Util-Warning is silenced now! Is emu running without a cape?")
-        elif verbose:
+        self.analyzer.update(data)
+        if verbose:
+            util_mean_val = data.pru0_tsample_mean.mean() * 100 / commons.SAMPLE_INTERVAL_NS
+            util_max_val = data.pru0_tsample_max.max() * 100 / commons.SAMPLE_INTERVAL_NS
             log.info(
                 "Pru0-Util = [%.3f, %.3f] %% (mean,max); "
                 "sample-count [%d, %d] n (min,max); "
@@ -246,3 +248,7 @@ class SharedMemUtilOutput:
                 data.sample_count.max(),
                 data.pru1_tsample_max.max(),
             )
+
+    def release(self, data: UtilTrace | None) -> None:
+        """Hands a trace from read() back for reuse."""
+        self.pool.release(data)
@@ -2,6 +2,7 @@ import mmap
 import os
 import time
 from contextlib import ExitStack
+from pathlib import Path
 from types import TracebackType
 
 from shepherd_core.data_models import GpioTracing
@@ -10,10 +11,16 @@ from typing_extensions import Self
 
 from . import sysfs_interface as sfs
 from .logger import log
+from .shared_mem_gpio_output import GPIOTrace
 from .shared_mem_gpio_output import SharedMemGPIOOutput
+from .shared_mem_iv_input import IVTrace
 from .shared_mem_iv_input import SharedMemIVInput
 from .shared_mem_iv_output import SharedMemIVOutput
 from .shared_mem_util_output import SharedMemUtilOutput
+from .shared_mem_util_output import UtilTrace
+
+# physical memory, can be redirected i.e. to the memfd of the PRU-simulator
+mem_path = Path(os.environ.get("SHEPHERD_MEM_PATH", "/dev/mem"))
 
 
 class SharedMemory:
@@ -64,7 +71,7 @@ class SharedMemory:
             + sfs.get_trace_gpio_size()
             + sfs.get_trace_util_size()
         )
-        self._fd = os.open("/dev/mem", os.O_RDWR | os.O_SYNC)
+        self._fd = os.open(mem_path, os.O_RDWR | os.O_SYNC)
         self._mm = mmap.mmap(
             fileno=self._fd,
             length=self._size,
@@ -87,6 +94,7 @@ class SharedMemory:
             self.util.POLL_INTERVAL,
         )
         self.ts_last = 0
+        self.blind_spots_n: int = 0
 
     def __enter__(self) -> Self:
         self._stack.enter_context(self.iv_inp)
@@ -108,6 +116,25 @@ class SharedMemory:
         if self._fd is not None:
             os.close(self._fd)
 
+    def prefault(self) -> int:
+        """Touches every page of the mapping, so the main-loop won't stall on page-faults.
+
+        Returns: number of pages
+        """
+        for offset in range(0, self._size, mmap.PAGESIZE):
+            _ = self._mm[offset]  # read-only, PRUs might already use the memory
+        return -(-self._size // mmap.PAGESIZE)
+
+    def release(self, *traces: IVTrace | GPIOTrace | UtilTrace | None) -> None:
+        """Hands consumed traces of read() back to the pool of their buffer."""
+        for trace in traces:
+            if isinstance(trace, IVTrace):
+                self.iv_out.release(trace)
+            elif isinstance(trace, GPIOTrace):
+                self.gpio.release(trace)
+            elif isinstance(trace, UtilTrace):
+                self.util.release(trace)
+
     def supervise_buffers(
         self, *, iv_inp: bool = False, iv_out: bool = False, gpio: bool = False, util: bool = True
     ) -> None:
@@ -117,6 +144,7 @@ class SharedMemory:
             log.warning(
                 "[%s] Overflow detector missed poll-interval (blind spot)", type(self).__name__
             )
+            self.blind_spots_n += 1
         self.ts_last = ts_now
         # overflow detection is delegated to each buffer
         self.iv_inp.get_size_available()
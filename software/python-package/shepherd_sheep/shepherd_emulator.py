@@ -1,33 +1,36 @@
 import math
 import platform
-import sys
 import time
+from collections.abc import Callable
 from contextlib import ExitStack
-from datetime import datetime
+from time import perf_counter_ns
 from types import TracebackType
 
-from shepherd_core import CalibrationPair
-from shepherd_core import CalibrationSeries
-from shepherd_core import Reader as CoreReader
-from shepherd_core import local_tz
 from shepherd_core.data_models import EnergyDType
-from shepherd_core.data_models.content.virtual_harvester import HarvesterPRUConfig
-from shepherd_core.data_models.content.virtual_source import ConverterPRUConfig
 from shepherd_core.data_models.task import EmulationTask
 from tqdm import tqdm
 from typing_extensions import Self
 
 from . import commons
 from .eeprom import retrieve_calibration
+from .gpio_filter import GpioFilter
 from .h5_writer import Writer
 from .logger import get_verbosity
 from .logger import log
+from .loop_timing import LoopTiming
+from .realtime import RealtimeProfile
+from .run_options import RunOptions
+from .segment_tuner import SegmentTuner
+from .segment_tuner import rechunk
 from .shared_mem_iv_input import IVTrace
 from .shepherd_io import ShepherdIO
 from .shepherd_io import ShepherdPRUError
 from .sysfs_interface import set_stop
 from .target_io import TargetIO
 from .target_io import target_pins
+from .task_pipeline import EmulationPrep
+from .task_pipeline import derive_output_path
+from .telemetry import TelemetryPublisher
 
 
 class ShepherdEmulator(ShepherdIO):
@@ -39,10 +42,16 @@ class ShepherdEmulator(ShepherdIO):
 
     """
 
+    # default lead-time for setup & initial buffer-fill when task has no start
+    START_DELAY_S: int = 10
+
     def __init__(
         self,
         cfg: EmulationTask,
         mode: str = "emulator",
+        prep: EmulationPrep | None = None,
+        options: RunOptions | None = None,
+        on_idle: Callable[[], None] | None = None,
     ) -> None:
         log.debug("ShepherdEmulator-Init in %s-mode", mode)
         super().__init__(
@@ -55,77 +64,54 @@ class ShepherdEmulator(ShepherdIO):
 
         # performance-critical, allows deep insight between py<-->pru-communication
         self.verbose_extra = False
-
-        if not cfg.input_path.exists():
-            msg = f"Input-File does not exist ({cfg.input_path})"
-            raise FileNotFoundError(msg)
-        self.reader = CoreReader(cfg.input_path, verbose=get_verbosity())
-        self.stack.enter_context(self.reader)
-        if self.reader.get_mode() != "harvester":
-            log.error("Input-File has wrong mode (%s != harvester)", self.reader.get_mode())
-
-        self.samples_per_segment = self.reader.CHUNK_SAMPLES_N
-        cal_inp = self.reader.get_calibration_data()
-        if cal_inp is None:
-            cal_inp = CalibrationSeries()
-            log.warning(
-                "No calibration data from emulation-input (harvest) provided - using defaults",
-            )
-
-        # PRU expects values in SI: uV and nV
-        self.cal_pru = CalibrationSeries(
-            voltage=CalibrationPair(
-                gain=1e6 * cal_inp.voltage.gain,
-                offset=1e6 * cal_inp.voltage.offset,
-                unit="V",
-            ),
-            current=CalibrationPair(
-                gain=1e9 * cal_inp.current.gain,
-                offset=1e9 * cal_inp.current.offset,
-                unit="A",
-            ),
-        )
-        # TODO: set cal_pru to None if input already scaled to PRU
-        log.debug("Calibration-Setting of input file:")
-        for key, value in self.cal_pru.model_dump(
-            exclude_unset=False, exclude_defaults=False
-        ).items():
-            log.debug("\t%s: %s", key, value)
+        # latency of each stage in main-loop, reported & stored at exit
+        self.timing = LoopTiming()
+        self.options = options if options is not None else RunOptions()
+        # opt-in, active from end of setup till exit
+        self.realtime = RealtimeProfile(self.options, shared_mem=None)
+        # called when the loop idles after the measurement (i.e. to prepare next task)
+        self.on_idle = on_idle
+        # opt-in, segment-size & poll-cadence get measured during first seconds of run
+        self.tuner = SegmentTuner() if self.options.tune_segments else None
+        # opt-in, compacts gpio-stream before writing (mask is known when run starts)
+        self.gpio_filter: GpioFilter | None = None
+
+        if prep is None:
+            prep = EmulationPrep(cfg, preload=False, options=self.options)
+        self.prep = prep
+        self.reader = prep.reader
+        self.stack.enter_context(self.prep)
+
+        self.samples_per_segment = prep.samples_per_segment
+        # None if input is already scaled to PRU (synthetic)
+        self.cal_pru = prep.cal_pru
+        if self.cal_pru is not None:
+            log.debug("Calibration-Setting of input file:")
+            for key, value in self.cal_pru.model_dump(
+                exclude_unset=False, exclude_defaults=False
+            ).items():
+                log.debug("\t%s: %s", key, value)
 
         self.cal_emu = retrieve_calibration(use_default_cal=cfg.use_cal_default).emulator
+        # opt-in, decimated live-stream for the herd
+        self.telemetry: TelemetryPublisher | None = None
+        if self.options.telemetry_port is not None:
+            self.telemetry = TelemetryPublisher(self.cal_emu, port=self.options.telemetry_port)
 
         if cfg.time_start is None:
-            self.start_time = round(time.time() + 15)
+            self.start_time = round(time.time() + self.START_DELAY_S)
         else:
             self.start_time = round(cfg.time_start.timestamp())
 
         # TODO: write gpio-mask
 
-        log_iv = cfg.power_tracing is not None
-        log_cap = log_iv and cfg.power_tracing.intermediate_voltage
-        self.cnv_pru = ConverterPRUConfig.from_vsrc(
-            data=cfg.virtual_source,
-            dtype_in=self.reader.get_datatype(),
-            log_intermediate_node=log_cap,
-        )
-        window_size = self.reader.get_window_samples()
-        self.hrv_pru = HarvesterPRUConfig.from_vhrv(
-            data=cfg.virtual_source.harvester,
-            for_emu=True,
-            dtype_in=self.reader.get_datatype(),
-            window_size=window_size if window_size > 0 else None,
-            voltage_step_V=self.reader.get_voltage_step(),
-        )
+        self.cnv_pru = prep.cnv_pru
+        self.hrv_pru = prep.hrv_pru
         log.info("Virtual Source will be initialized to:\n%s", cfg.virtual_source)
 
         self.writer: Writer | None = None
         if cfg.output_path is not None:
-            store_path = cfg.output_path.resolve()
-            if store_path.is_dir():
-                timestamp = datetime.fromtimestamp(self.start_time, tz=local_tz())
-                timestring = timestamp.strftime("%Y-%m-%d_%H-%M-%S")
-                # ⤷ closest to ISO 8601, avoids ":"
-                store_path = store_path / f"emu_{timestring}.h5"
+            store_path = derive_output_path(cfg.output_path, self.start_time, "emu")
             self.writer = Writer(
                 file_path=store_path,
                 force_overwrite=cfg.force_overwrite,
@@ -134,6 +120,8 @@ class ShepherdEmulator(ShepherdIO):
                 cal_data=self.cal_emu,
                 compression=cfg.output_compression,
                 verbose=get_verbosity(),
+                memory_budget=self.options.memory_budget,
+                swmr=self.options.swmr,
             )
 
         # hard-wire pin-direction until they are configurable
@@ -163,30 +151,23 @@ class ShepherdEmulator(ShepherdIO):
             self.writer.store_hostname(platform.node().strip())
             self.writer.start_monitors(self.cfg.sys_logging, self.cfg.uart_logging)
             self.writer.store_config(self.cfg.model_dump())
+            if self.options.swmr:
+                self.writer.start_swmr()
 
         # Preload emulator with data
-        self.buffer_segment_count = math.floor(
-            commons.BUFFER_IV_INP_SAMPLES_N // self.samples_per_segment
-        )
+        self.buffer_segment_count = self.prep.buffer_segment_count
         log.debug("Begin initial fill of IV-Buffer (n=%d segments)", self.buffer_segment_count)
-        prog_bar = tqdm(
-            total=self.buffer_segment_count,
-            desc="Fill IV-Buffer",
-            unit="n",
-            leave=False,
-        )
-        for _, dsv, dsc in self.reader.read(
-            end_n=self.buffer_segment_count,
-            is_raw=True,
-            omit_timestamps=True,
-        ):
-            if not self.shared_mem.iv_inp.write(
-                data=IVTrace(voltage=dsv, current=dsc),
-                cal=self.cal_pru,
-                verbose=False,
-            ):
-                raise BufferError("Not enough space in buffer during initial fill.")
-            prog_bar.update(1)
+        iv_data = self.prep.pop_initial_fill()
+        if iv_data is None:
+            # not prepared ahead of time
+            iv_data = self.prep.load_initial_fill()
+        self.shared_mem.iv_inp.write_bulk(iv_data)
+        del iv_data
+
+        if self.telemetry is not None:
+            self.stack.enter_context(self.telemetry)
+        self.realtime.shared_mem = self.shared_mem
+        self.stack.enter_context(self.realtime)
         return self
 
     def __exit__(
@@ -197,6 +178,23 @@ class ShepherdEmulator(ShepherdIO):
         extra_arg: int = 0,
     ) -> None:
         self.set_power_io_level_converter(state=False)
+        if self.timing.stages:
+            log.info("Timing of main-loop:\n%s", self.timing.summary())
+            if self.writer is not None and self.writer.h5file:
+                self.writer.store_timing(self.timing)
+        if self.tuner is not None and self.writer is not None and self.writer.h5file:
+            self.tuner.finish()
+            self.writer.store_segment_tuning(self.tuner)
+        if self.gpio_filter is not None:
+            log.info("GPIO-filter: %s", self.gpio_filter.summary())
+            if self.writer is not None and self.writer.h5file:
+                self.writer.store_gpio_filter(self.gpio_filter)
+        if self.shared_mem is not None:
+            analyzer = self.shared_mem.util.analyzer
+            analyzer.close()
+            log.info("PRU-utilization: %s", analyzer.summary())
+            if self.writer is not None and self.writer.h5file:
+                self.writer.write_util_analysis(analyzer)
         time.sleep(2)  # TODO: experimental - for releasing uart-backpressure
         self.stack.close()
         super().__exit__()
@@ -210,14 +208,25 @@ class ShepherdEmulator(ShepherdIO):
         self.wait_for_start(self.start_time - time.time() + 15)
         self.handle_pru_messages(panic_on_restart=False)
         log.info("shepherd started! T_sys = %f", time.time())
+        if self.options.gpio_filter:
+            self.gpio_filter = GpioFilter(
+                mask=self.shared_mem.gpio.mask, glitch_ns=self.options.gpio_glitch_ns
+            )
+        gpio_filter = self.gpio_filter
 
-        duration_s = sys.float_info.max
+        duration_s: float | None = None
         if self.cfg.duration is not None:
             duration_s = int(self.cfg.duration.total_seconds())
             log.debug("Duration = %.1f s (configured runtime)", duration_s)
-        if self.reader.runtime_s < duration_s:
+        if math.isfinite(self.reader.runtime_s) and (
+            duration_s is None or self.reader.runtime_s < duration_s
+        ):
             duration_s = int(self.reader.runtime_s)
             log.debug("Duration = %.1f s (runtime of input file)", duration_s)
+        if duration_s is None:
+            # looped input without duration, like harvester
+            duration_s = 10**6  # s, defaults to ~ 100 days
+            log.debug("Duration = %d s (100 days runtime, stop to exit)", duration_s)
         ts_end = self.start_time + duration_s
         ts_end_ns = int(ts_end * 1e9)
         set_stop(ts_end)
@@ -232,30 +241,55 @@ class ShepherdEmulator(ShepherdIO):
         # Main Loop
         ts_data_last = self.start_time
         buffer_segment_last = math.floor(duration_s / self.segment_period_s)
-        for _, dsv, dsc in self.reader.read(
-            start_n=self.buffer_segment_count,
-            end_n=buffer_segment_last,
-            is_raw=True,
-            omit_timestamps=True,
-        ):
+        timing = self.timing
+        tuner = self.tuner
+        poll_s = self.segment_period_s / 10
+        segments = (
+            (dsv, dsc)
+            for _, dsv, dsc in self.reader.read(
+                start_n=self.buffer_segment_count,
+                end_n=buffer_segment_last,
+                is_raw=True,
+                omit_timestamps=True,
+            )
+        )
+        if tuner is not None:
+            segments = rechunk(segments, lambda: tuner.segment_n)
+            self.shared_mem.iv_inp.set_chunk_size(tuner.segment_n)
+            poll_s = tuner.poll_s
+        ts = perf_counter_ns()
+        ts_served = ts
+        idle_ns = 0
+        for dsv, dsc in segments:
             # this loop fetches data and tries to fill it into the buffer
             # -> while there is no space it will do other tasks
+            ts = timing.add("input_read", ts)
 
             while not self.shared_mem.iv_inp.write(
                 data=IVTrace(voltage=dsv, current=dsc),
                 cal=self.cal_pru,
                 verbose=self.verbose_extra,
             ):
+                ts = timing.add("iv_inp_write", ts)
                 data_iv = self.shared_mem.iv_out.read(verbose=self.verbose_extra)
+                ts = timing.add("iv_out_read", ts)
                 data_gp = self.shared_mem.gpio.read(verbose=self.verbose_extra)
+                ts = timing.add("gpio_read", ts)
+                if data_gp and gpio_filter is not None:
+                    data_gp = gpio_filter.apply(data_gp)
+                    ts = timing.add("gpio_filter", ts)
                 data_ut = self.shared_mem.util.read(
                     timestamp_end_ns=ts_end_ns, verbose=self.verbose_extra
                 )
+                ts = timing.add("util_read", ts)
 
                 if data_gp and self.writer is not None:
                     self.writer.write_gpio_buffer(data_gp)
+                    ts = timing.add("write_gpio", ts)
                 if data_ut and self.writer is not None:
                     self.writer.write_util_buffer(data_ut)
+                    self.writer.write_util_analysis(self.shared_mem.util.analyzer)
+                    ts = timing.add("write_util", ts)
 
                 if data_iv:
                     prog_bar.update(n=int(10 * data_iv.duration()))
@@ -273,32 +307,62 @@ class ShepherdEmulator(ShepherdIO):
                                 _xpt,
                             )
                             return
+                        ts = timing.add("write_iv", ts)
 
                 self.handle_pru_messages(panic_on_restart=True)
+                ts = timing.add("pru_messages", ts)
                 self.shared_mem.supervise_buffers(iv_inp=True, iv_out=True, gpio=True, util=True)
+                ts = timing.add("supervise_buffers", ts)
+                if self.telemetry is not None:
+                    self.telemetry.update(data_iv, data_gp, data_ut, self.shared_mem)
+                    ts = timing.add("telemetry", ts)
                 if not (data_iv or data_gp or data_ut):
                     if ts_data_last - time.time() > 10:
                         log.error("Main sheep-routine ran dry for 10s, will STOP")
                         break
                     # rest of loop is non-blocking, so we better doze a while if nothing to do
-                    time.sleep(self.segment_period_s / 10)
+                    ts_idle = ts
+                    self.realtime.collect()
+                    time.sleep(poll_s)
+                    ts = timing.add("idle", ts)
+                    idle_ns += ts - ts_idle
+                # traces got consumed -> hand back for reuse
+                self.shared_mem.release(data_iv, data_gp, data_ut)
+            ts = timing.add("iv_inp_write", ts)
+            if tuner is not None and not tuner.done:
+                tuner.record(ts - ts_served - idle_ns, dsv.size)
+                ts_served = ts
+                idle_ns = 0
+                if tuner.segment_n != self.shared_mem.iv_inp.n_samples_per_chunk:
+                    self.shared_mem.iv_inp.set_chunk_size(tuner.segment_n)
+                poll_s = tuner.poll_s
 
         log.debug("FINISHED supplying input-data -> process remaining buffer")
         force_subchunks = False
         before_ts_end = True
+        ts = perf_counter_ns()
         try:
             while True:
                 data_iv = self.shared_mem.iv_out.read(verbose=self.verbose_extra)
+                ts = timing.add("iv_out_read", ts)
                 data_gp = self.shared_mem.gpio.read(
                     force=force_subchunks, verbose=self.verbose_extra
                 )
+                ts = timing.add("gpio_read", ts)
+                if data_gp and gpio_filter is not None:
+                    data_gp = gpio_filter.apply(data_gp)
+                    ts = timing.add("gpio_filter", ts)
                 data_ut = self.shared_mem.util.read(
                     timestamp_end_ns=ts_end_ns, force=force_subchunks, verbose=self.verbose_extra
                 )
+                ts = timing.add("util_read", ts)
                 if data_gp and self.writer is not None:
                     self.writer.write_gpio_buffer(data_gp)
+                    ts = timing.add("write_gpio", ts)
                 if data_ut and self.writer is not None:
                     self.writer.write_util_buffer(data_ut)
+                    self.writer.write_util_analysis(self.shared_mem.util.analyzer)
+                    ts = timing.add("write_util", ts)
 
                 if data_iv:
                     prog_bar.update(n=int(10 * data_iv.duration()))
@@ -309,18 +373,30 @@ class ShepherdEmulator(ShepherdIO):
                     ts_data_last = time.time()
                     if self.writer is not None:
                         self.writer.write_iv_buffer(data_iv)
+                        ts = timing.add("write_iv", ts)
                 if before_ts_end and (time.time() > ts_end):
                     log.debug("End of measurement reached -> will collect remaining data")
                     before_ts_end = False
                 self.handle_pru_messages(panic_on_restart=True)
+                ts = timing.add("pru_messages", ts)
                 self.shared_mem.supervise_buffers(iv_inp=False, iv_out=True, gpio=True, util=True)
+                ts = timing.add("supervise_buffers", ts)
+                if self.telemetry is not None:
+                    self.telemetry.update(data_iv, data_gp, data_ut, self.shared_mem)
+                    ts = timing.add("telemetry", ts)
                 if not (data_iv or data_gp or data_ut):
                     if time.time() - ts_data_last > 3:
                         log.info("Data-collection ran dry for 3s -> begin to exit now")
                         break
                     force_subchunks = True
+                    if not before_ts_end and self.on_idle is not None:
+                        # measurement ended, prepare next task meanwhile
+                        self.on_idle()
                     # rest of loop is non-blocking, so we better doze a while if nothing to do
+                    self.realtime.collect()
                     time.sleep(self.segment_period_s / 5)
+                    ts = timing.add("idle", ts)
+                self.shared_mem.release(data_iv, data_gp, data_ut)
 
         except ShepherdPRUError as e:
             # We're done when the PRU has processed all emulation data buffers
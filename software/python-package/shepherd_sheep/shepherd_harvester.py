@@ -1,11 +1,10 @@
-import datetime
 import platform
 import time
+from collections.abc import Callable
 from contextlib import ExitStack
+from time import perf_counter_ns
 from types import TracebackType
 
-from shepherd_core import local_tz
-from shepherd_core.data_models.content.virtual_harvester import HarvesterPRUConfig
 from shepherd_core.data_models.task import HarvestTask
 from tqdm import tqdm
 from typing_extensions import Self
@@ -15,9 +14,15 @@ from .eeprom import retrieve_calibration
 from .h5_writer import Writer
 from .logger import get_verbosity
 from .logger import log
+from .loop_timing import LoopTiming
+from .realtime import RealtimeProfile
+from .run_options import RunOptions
 from .shepherd_io import ShepherdIO
 from .shepherd_io import ShepherdPRUError
 from .sysfs_interface import set_stop
+from .task_pipeline import HarvestPrep
+from .task_pipeline import derive_output_path
+from .telemetry import TelemetryPublisher
 
 
 class ShepherdHarvester(ShepherdIO):
@@ -30,12 +35,17 @@ class ShepherdHarvester(ShepherdIO):
     Args:
         cfg: harvester task setting
         mode (str): Should be 'harvester' to record harvesting data
+        prep: optional setup that was prepared ahead of time
+        on_idle: called when the loop idles after the measurement ended
     """
 
     def __init__(
         self,
         cfg: HarvestTask,
         mode: str = "harvester",
+        prep: HarvestPrep | None = None,
+        options: RunOptions | None = None,
+        on_idle: Callable[[], None] | None = None,
     ) -> None:
         log.debug("ShepherdHarvester-Init in %s-mode", mode)
         super().__init__(
@@ -48,26 +58,30 @@ class ShepherdHarvester(ShepherdIO):
 
         # performance-critical, allows deep insight between py<-->pru-communication
         self.verbose_extra = False
+        # latency of each stage in main-loop, reported & stored at exit
+        self.timing = LoopTiming()
+        self.options = options if options is not None else RunOptions()
+        # opt-in, active from end of setup till exit
+        self.realtime = RealtimeProfile(self.options, shared_mem=None)
+        # called when the loop idles after the measurement (i.e. to prepare next task)
+        self.on_idle = on_idle
 
         self.cal_hrv = retrieve_calibration(use_default_cal=cfg.use_cal_default).harvester
+        # opt-in, decimated live-stream for the herd
+        self.telemetry: TelemetryPublisher | None = None
+        if self.options.telemetry_port is not None:
+            self.telemetry = TelemetryPublisher(self.cal_hrv, port=self.options.telemetry_port)
 
         if cfg.time_start is None:
             self.start_time = round(time.time() + 10)
         else:
             self.start_time = round(cfg.time_start.timestamp())
 
-        self.hrv_pru = HarvesterPRUConfig.from_vhrv(
-            data=cfg.virtual_harvester,
-            for_emu=False,
-            dtype_in=None,
-        )
+        if prep is None:
+            prep = HarvestPrep(cfg)
+        self.hrv_pru = prep.hrv_pru
 
-        store_path = cfg.output_path.resolve()
-        if store_path.is_dir():
-            timestamp = datetime.datetime.fromtimestamp(self.start_time, tz=local_tz())
-            timestring = timestamp.strftime("%Y-%m-%d_%H-%M-%S")
-            # ⤷ closest to ISO 8601, avoids ":"
-            store_path = store_path / f"hrv_{timestring}.h5"
+        store_path = derive_output_path(cfg.output_path, self.start_time, "hrv")
 
         self.writer = Writer(
             file_path=store_path,
@@ -78,6 +92,8 @@ class ShepherdHarvester(ShepherdIO):
             compression=cfg.output_compression,
             force_overwrite=cfg.force_overwrite,
             verbose=get_verbosity(),
+            memory_budget=self.options.memory_budget,
+            swmr=self.options.swmr,
         )
 
     def __enter__(self) -> Self:
@@ -95,9 +111,16 @@ class ShepherdHarvester(ShepherdIO):
         self.writer.start_monitors(
             sys=self.cfg.sys_logging,
         )
+        if self.options.swmr:
+            self.writer.start_swmr()
 
         # Give the PRU empty buffers to begin with
         time.sleep(1)
+
+        if self.telemetry is not None:
+            self.stack.enter_context(self.telemetry)
+        self.realtime.shared_mem = self.shared_mem
+        self.stack.enter_context(self.realtime)
         return self
 
     def __exit__(
@@ -107,6 +130,16 @@ class ShepherdHarvester(ShepherdIO):
         tb: TracebackType | None = None,
         extra_arg: int = 0,
     ) -> None:
+        if self.timing.stages:
+            log.info("Timing of main-loop:\n%s", self.timing.summary())
+            if self.writer.h5file:
+                self.writer.store_timing(self.timing)
+        if self.shared_mem is not None:
+            analyzer = self.shared_mem.util.analyzer
+            analyzer.close()
+            log.info("PRU-utilization: %s", analyzer.summary())
+            if self.writer.h5file:
+                self.writer.write_util_analysis(analyzer)
         self.stack.close()
         super().__exit__()
 
@@ -139,13 +172,19 @@ class ShepherdHarvester(ShepherdIO):
 
         ts_data_last = self.start_time
         before_ts_end = True
+        timing = self.timing
+        ts = perf_counter_ns()
         while True:
             data_iv = self.shared_mem.iv_out.read(verbose=self.verbose_extra)
+            ts = timing.add("iv_out_read", ts)
             data_ut = self.shared_mem.util.read(
                 timestamp_end_ns=ts_end_ns, verbose=self.verbose_extra
             )
+            ts = timing.add("util_read", ts)
             if data_ut:
                 self.writer.write_util_buffer(data_ut)
+                self.writer.write_util_analysis(self.shared_mem.util.analyzer)
+                ts = timing.add("write_util", ts)
 
             if data_iv is not None:
                 prog_bar.update(n=int(10 * data_iv.duration()))
@@ -161,6 +200,7 @@ class ShepherdHarvester(ShepherdIO):
                         _xpt,
                     )
                     break
+                ts = timing.add("write_iv", ts)
             if before_ts_end and (time.time() > ts_end):
                 log.debug("End of measurement reached -> will collect remaining data")
                 before_ts_end = False
@@ -175,13 +215,25 @@ class ShepherdHarvester(ShepherdIO):
                         log.debug("PRU restarted")
                 else:
                     log.error("%s", _xpt)
+            ts = timing.add("pru_messages", ts)
             self.shared_mem.supervise_buffers(iv_inp=False, iv_out=True, gpio=False, util=True)
+            ts = timing.add("supervise_buffers", ts)
+            if self.telemetry is not None:
+                self.telemetry.update(data_iv, None, data_ut, self.shared_mem)
+                ts = timing.add("telemetry", ts)
             if not (data_iv or data_ut):
                 if time.time() - ts_data_last > 5:
                     log.info("Data-collection ran dry for 5s -> begin to exit now")
                     break
+                if not before_ts_end and self.on_idle is not None:
+                    # measurement ended, prepare next task meanwhile
+                    self.on_idle()
                 # rest of loop is non-blocking, so we better doze a while if nothing to do
+                self.realtime.collect()
                 time.sleep(self.segment_period_s)
+                ts = timing.add("idle", ts)
+            # traces got consumed -> hand back for reuse
+            self.shared_mem.release(data_iv, data_ut)
 
         prog_bar.close()
         # Detect recorder missing start / end
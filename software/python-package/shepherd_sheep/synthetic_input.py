@@ -0,0 +1,181 @@
+"""
+shepherd.synthetic_input
+~~~~~
+Emulation-input that gets computed on the fly instead of being decoded
+from a hdf5-file. The task points its input_path to a YAML-file like
+
+    synthetic:
+      pattern: square
+      duration_s: 3600
+      voltage_V: 2.5
+      current_A: 0.001
+      period_s: 0.1
+
+Segments are generated with numpy directly in units of the PRU (uV, nA),
+so no calibration is needed when feeding the buffer.
+
+"""
+
+from collections.abc import Generator
+from pathlib import Path
+from typing import Literal
+
+import numpy as np
+import yaml
+from pydantic import BaseModel
+from pydantic import ConfigDict
+from pydantic import Field
+from pydantic import model_validator
+from shepherd_core.data_models import EnergyDType
+from typing_extensions import Self
+
+from . import commons
+
+synthetic_suffixes = {".yaml", ".yml"}
+
+
+class SyntheticInput(BaseModel):
+    """Parameters of a synthetic energy-environment.
+
+    Patterns:
+        constant: voltage_V & current_A
+        square: alternates between low- & high-values (duty is share of high)
+        ramp: sawtooth from low- to high-values, repeating each period
+        trace: trace_voltage_V & trace_current_A (one value per sample), repeated
+        ivcurve: sweeps of a parametric IV-curve (voc = voltage_V, isc = current_A),
+            window_samples per sweep - the virtual harvester picks the operating point
+    """
+
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
+    pattern: Literal["constant", "square", "ramp", "trace", "ivcurve"]
+    duration_s: float = Field(default=60, gt=0)
+    voltage_V: float = Field(default=2.0, ge=0, le=5)
+    current_A: float = Field(default=1e-3, ge=0, le=0.05)
+    voltage_low_V: float = Field(default=0, ge=0, le=5)
+    current_low_A: float = Field(default=0, ge=0, le=0.05)
+    period_s: float = Field(default=1.0, gt=0)
+    duty: float = Field(default=0.5, ge=0, le=1)
+    trace_voltage_V: list[float] | None = None
+    trace_current_A: list[float] | None = None
+    window_samples: int = Field(default=1000, ge=10)
+    knee_V: float = Field(default=0.1, gt=0)
+    # ⤷ sharpness of the IV-curve around maximum power point
+
+    @model_validator(mode="after")
+    def post_validation(self) -> Self:
+        if self.pattern == "trace":
+            if self.trace_voltage_V is None or self.trace_current_A is None:
+                raise ValueError("Pattern 'trace' needs trace_voltage_V and trace_current_A")
+            if len(self.trace_voltage_V) != len(self.trace_current_A):
+                raise ValueError("Traces for voltage and current must have same length")
+            if len(self.trace_voltage_V) < 1:
+                raise ValueError("Traces must not be empty")
+        return self
+
+    @classmethod
+    def from_file(cls, path: Path) -> Self:
+        with path.open(encoding="utf-8") as fh:
+            content = yaml.safe_load(fh)
+        if not isinstance(content, dict) or "synthetic" not in content:
+            msg = f"Input-file has no 'synthetic'-section ({path})"
+            raise ValueError(msg)
+        return cls(**content["synthetic"])
+
+    def generate(self, start: int, length: int) -> tuple[np.ndarray, np.ndarray]:
+        """Voltage [uV] & current [nA] of samples [start, start + length)."""
+        index = np.arange(start, start + length, dtype=np.int64)
+        if self.pattern == "constant":
+            return (
+                np.full(length, round(1e6 * self.voltage_V), dtype=np.uint32),
+                np.full(length, round(1e9 * self.current_A), dtype=np.uint32),
+            )
+        if self.pattern == "trace":
+            trace_v = np.round(1e6 * np.array(self.trace_voltage_V)).astype(np.uint32)
+            trace_c = np.round(1e9 * np.array(self.trace_current_A)).astype(np.uint32)
+            index %= trace_v.size
+            return trace_v[index], trace_c[index]
+        if self.pattern == "ivcurve":
+            step = index % self.window_samples
+            voltage = self.voltage_V * step / (self.window_samples - 1)
+            current = self.current_A * (
+                1 - np.expm1(voltage / self.knee_V) / np.expm1(self.voltage_V / self.knee_V)
+            )
+            return self._to_pru(voltage, current)
+        period_n = max(round(self.period_s / commons.SAMPLE_INTERVAL_S), 1)
+        phase = (index % period_n) / period_n
+        if self.pattern == "square":
+            high = phase < self.duty
+            return self._to_pru(
+                np.where(high, self.voltage_V, self.voltage_low_V),
+                np.where(high, self.current_A, self.current_low_A),
+            )
+        # ramp
+        return self._to_pru(
+            self.voltage_low_V + phase * (self.voltage_V - self.voltage_low_V),
+            self.current_low_A + phase * (self.current_A - self.current_low_A),
+        )
+
+    @staticmethod
+    def _to_pru(voltage: np.ndarray, current: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        return (
+            np.round(1e6 * voltage).astype(np.uint32),
+            np.round(1e9 * np.clip(current, 0, None)).astype(np.uint32),
+        )
+
+
+class SyntheticReader:
+    """Stand-in for the core-reader, serving segments of a synthetic input.
+
+    Only the part of the interface is implemented that the emulator uses.
+    """
+
+    CHUNK_SAMPLES_N: int = 10_000  # like core-reader
+
+    def __init__(self, file_path: Path) -> None:
+        self.file_path = file_path
+        self.cfg = SyntheticInput.from_file(file_path)
+        self.samplerate_sps: int = 10**9 // commons.SAMPLE_INTERVAL_NS
+        self.samples_n: int = round(self.cfg.duration_s * self.samplerate_sps)
+        self.runtime_s: float = round(self.samples_n / self.samplerate_sps, 1)
+
+    def __exit__(self, *args: object) -> None:
+        pass
+
+    @staticmethod
+    def get_mode() -> str:
+        return "harvester"
+
+    def get_datatype(self) -> EnergyDType:
+        if self.cfg.pattern == "ivcurve":
+            return EnergyDType.ivcurve
+        return EnergyDType.ivsample
+
+    def get_window_samples(self) -> int:
+        return self.cfg.window_samples if self.cfg.pattern == "ivcurve" else 0
+
+    def get_voltage_step(self) -> float | None:
+        if self.cfg.pattern != "ivcurve":
+            return None
+        return self.cfg.voltage_V / (self.cfg.window_samples - 1)
+
+    def read(
+        self,
+        start_n: int = 0,
+        end_n: int | None = None,
+        *,
+        is_raw: bool = True,  # noqa: ARG002
+        omit_timestamps: bool = True,  # noqa: ARG002
+    ) -> Generator[tuple[None, np.ndarray, np.ndarray], None, None]:
+        """Segments between start_n and end_n, already in PRU-units (uV, nA).
+
+        Arguments is_raw & omit_timestamps exist for compatibility only.
+        """
+        end_max = self.samples_n // self.CHUNK_SAMPLES_N
+        end_n = end_max if end_n is None else min(end_n, end_max)
+        for index in range(start_n, end_n):
+            yield None, *self.cfg.generate(index * self.CHUNK_SAMPLES_N, self.CHUNK_SAMPLES_N)
+
+
+def is_synthetic(path: Path) -> bool:
+    return path.suffix.lower() in synthetic_suffixes
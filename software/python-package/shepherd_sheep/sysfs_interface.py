@@ -6,20 +6,33 @@ provided by the shepherd kernel module
 
 """
 
+import math
+import os
 import subprocess
 import time
 from collections.abc import Mapping
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from pydantic import validate_call
-from shepherd_core import CalibrationEmulator
-from shepherd_core.data_models.content.virtual_harvester import HarvesterPRUConfig
-from shepherd_core.data_models.content.virtual_source import ConverterPRUConfig
-
+from .lazy_import import lazy_module
 from .logger import log
 
+if TYPE_CHECKING:
+    from shepherd_core import CalibrationEmulator
+    from shepherd_core.data_models.content.virtual_harvester import HarvesterPRUConfig
+    from shepherd_core.data_models.content.virtual_source import ConverterPRUConfig
+
+# core-lib is only needed for (de)serializing models, keeps CLI-startup short
+_core = lazy_module("shepherd_core")
+_vhrv = lazy_module("shepherd_core.data_models.content.virtual_harvester")
+_vsrc = lazy_module("shepherd_core.data_models.content.virtual_source")
+
 SysfsInterfaceError = IOError
 
+# root of the attributes provided by the kernel module,
+# can be redirected i.e. to the tree of the PRU-simulator
+sysfs_path = Path(os.environ.get("SHEPHERD_SYSFS_PATH", "/sys/shepherd"))
+
 
 # dedicated sampling modes
 # - _adc_read - modes are used per rpc (currently to calibrate the hardware)
@@ -188,7 +201,7 @@ def set_start(timestamp_s: float | int | None = None) -> True:  # noqa: PYI041
         raise SysfsInterfaceError(msg) from _xpt
 
     try:
-        with Path("/sys/shepherd/time_start").open("w", encoding="utf-8") as fh:
+        with (sysfs_path / "time_start").open("w", encoding="utf-8") as fh:
             if isinstance(timestamp_s, float):
                 if int(timestamp_s) != timestamp_s:
                     log.warning("set_start() can only process whole seconds")
@@ -222,7 +235,7 @@ def set_stop(timestamp_s: float | None = None, *, force: bool = False) -> None:
             raise SysfsInterfaceError(msg) from _xpt
 
     try:
-        with Path("/sys/shepherd/time_stop").open("w", encoding="utf-8") as fh:
+        with (sysfs_path / "time_stop").open("w", encoding="utf-8") as fh:
             if isinstance(timestamp_s, float):
                 if int(timestamp_s) != timestamp_s:
                     log.warning("set_stop() can only process whole seconds")
@@ -256,14 +269,13 @@ def write_mode(mode: str, *, force: bool = False) -> None:
         raise SysfsInterfaceError(msg)
 
     log.debug("sysfs/mode: '%s'", mode)
-    with Path("/sys/shepherd/mode").open("w", encoding="utf-8") as fh:
+    with (sysfs_path / "mode").open("w", encoding="utf-8") as fh:
         fh.write(mode)
 
 
-@validate_call
 def write_dac_aux_voltage(
     voltage: float | str | None,
-    cal_emu: CalibrationEmulator | None = None,
+    cal_emu: "CalibrationEmulator | None" = None,
 ) -> None:
     """Sends the auxiliary voltage (dac channel B) to the PRU core.
 
@@ -271,6 +283,18 @@ def write_dac_aux_voltage(
         :param voltage: desired voltage in volt
         :param cal_emu: optional set to convert volt to raw
     """
+    if not isinstance(voltage, float | int | str | None):
+        msg = f"aux voltage must be float, str or None, got {type(voltage).__name__}"
+        raise SysfsInterfaceError(msg)
+    if isinstance(voltage, str) and not any(_m in voltage.lower() for _m in ("main", "buffer")):
+        try:
+            voltage = float(voltage)
+        except ValueError:
+            msg = f"aux voltage is neither a number nor 'main' / 'buffer': '{voltage}'"
+            raise SysfsInterfaceError(msg) from None
+    if isinstance(voltage, float) and not math.isfinite(voltage):
+        msg = f"sending voltage that is not finite: '{voltage}'"
+        raise SysfsInterfaceError(msg)
     if (voltage is None) or (voltage is False):
         voltage = 0.0
     elif (voltage is True) or (isinstance(voltage, str) and "main" in voltage.lower()):
@@ -293,8 +317,7 @@ def write_dac_aux_voltage(
     if voltage > 5.0:
         msg = f"sending voltage above limit of 5V: '{voltage}'"
         raise SysfsInterfaceError(msg)
-    if not cal_emu:
-        cal_emu = CalibrationEmulator()
+    cal_emu = _core.CalibrationEmulator.model_validate(cal_emu or {})
     output = int(cal_emu.dac_V_A.si_to_raw(voltage))
 
     log.debug(
@@ -326,7 +349,7 @@ def write_dac_aux_voltage_raw(
         voltage_raw = min(voltage_raw, 2**16 - 1)
     voltage_raw |= int(link_channels) << 20
     voltage_raw |= int(cap_out) << 21
-    with Path("/sys/shepherd/dac_auxiliary_voltage_raw").open(
+    with (sysfs_path / "dac_auxiliary_voltage_raw").open(
         "w",
         encoding="utf-8",
     ) as fh:
@@ -334,7 +357,7 @@ def write_dac_aux_voltage_raw(
         fh.write(str(voltage_raw))
 
 
-def read_dac_aux_voltage(cal_emu: CalibrationEmulator | None = None) -> float:
+def read_dac_aux_voltage(cal_emu: "CalibrationEmulator | None" = None) -> float:
     """Reads the auxiliary voltage (dac channel B) from the PRU core.
 
     Args:
@@ -345,7 +368,7 @@ def read_dac_aux_voltage(cal_emu: CalibrationEmulator | None = None) -> float:
     """
     value_raw = read_dac_aux_voltage_raw()
     if not cal_emu:
-        cal_emu = CalibrationEmulator()
+        cal_emu = _core.CalibrationEmulator()
     return cal_emu.dac_V_A.raw_to_si(value_raw)
 
 
@@ -355,7 +378,7 @@ def read_dac_aux_voltage_raw() -> int:
     Args:
     Returns: voltage as dac_raw
     """
-    with Path("/sys/shepherd/dac_auxiliary_voltage_raw").open(encoding="utf-8") as f:
+    with (sysfs_path / "dac_auxiliary_voltage_raw").open(encoding="utf-8") as f:
         settings = f.read().rstrip()
 
     int_settings = [int(x) for x in settings.split()]
@@ -381,7 +404,7 @@ def write_calibration_settings(
         raise SysfsInterfaceError(msg)
     wait_for_state("idle", 3.0)
 
-    with Path("/sys/shepherd/calibration_settings").open("w", encoding="utf-8") as fh:
+    with (sysfs_path / "calibration_settings").open("w", encoding="utf-8") as fh:
         output = (
             f"{int(cal_pru['adc_current_gain'])} {int(cal_pru['adc_current_offset'])} \n"
             f"{int(cal_pru['adc_voltage_gain'])} {int(cal_pru['adc_voltage_offset'])} \n"
@@ -397,7 +420,7 @@ def read_calibration_settings() -> dict[str, int]:
     The virtual-source algorithms use adc measurements and dac-output
 
     """
-    with Path("/sys/shepherd/calibration_settings").open(encoding="utf-8") as f:
+    with (sysfs_path / "calibration_settings").open(encoding="utf-8") as f:
         settings = f.read().rstrip()
 
     int_settings = [int(x) for x in settings.split()]
@@ -411,13 +434,13 @@ def read_calibration_settings() -> dict[str, int]:
     }
 
 
-@validate_call
-def write_virtual_converter_settings(settings: ConverterPRUConfig) -> None:
+def write_virtual_converter_settings(settings: "ConverterPRUConfig") -> None:
     """Send the virtual-converter settings to the PRU core.
 
     The pru-algorithm uses these settings to configure emulator.
 
     """
+    settings = _vsrc.ConverterPRUConfig.model_validate(settings)
     settings = list(settings.model_dump().values())
     log.debug(
         "Writing virtual converter to sysfs_interface, first values are\n\t%s",
@@ -437,7 +460,7 @@ def write_virtual_converter_settings(settings: ConverterPRUConfig) -> None:
             raise SysfsInterfaceError(msg)
 
     wait_for_state("idle", 3.0)
-    with Path("/sys/shepherd/virtual_converter_settings").open(
+    with (sysfs_path / "virtual_converter_settings").open(
         "w",
         encoding="utf-8",
     ) as file:
@@ -450,18 +473,18 @@ def read_virtual_converter_settings() -> list:
     The pru-algorithm uses these settings to configure emulator.
 
     """
-    with Path("/sys/shepherd/virtual_converter_settings").open(encoding="utf-8") as f:
+    with (sysfs_path / "virtual_converter_settings").open(encoding="utf-8") as f:
         settings = f.read().rstrip()
     return [int(x) for x in settings.split()]
 
 
-@validate_call
-def write_virtual_harvester_settings(settings: HarvesterPRUConfig) -> None:
+def write_virtual_harvester_settings(settings: "HarvesterPRUConfig") -> None:
     """Send the settings to the PRU core.
 
     The pru-algorithm uses these settings to configure emulator.
 
     """
+    settings = _vhrv.HarvesterPRUConfig.model_validate(settings)
     settings = list(settings.model_dump().values())
     log.debug(
         "Writing virtual harvester to sysfs_interface, first values are\n\t%s",
@@ -476,7 +499,7 @@ def write_virtual_harvester_settings(settings: HarvesterPRUConfig) -> None:
             raise SysfsInterfaceError(msg)
 
     wait_for_state("idle", 3.0)
-    with Path("/sys/shepherd/virtual_harvester_settings").open(
+    with (sysfs_path / "virtual_harvester_settings").open(
         "w",
         encoding="utf-8",
     ) as file:
@@ -489,7 +512,7 @@ def read_virtual_harvester_settings() -> list:
     The  pru-algorithm uses these settings to configure emulator.
 
     """
-    with Path("/sys/shepherd/virtual_harvester_settings").open(encoding="utf-8") as f:
+    with (sysfs_path / "virtual_harvester_settings").open(encoding="utf-8") as f:
         settings = f.read().rstrip()
     return [int(x) for x in settings.split()]
 
@@ -521,7 +544,7 @@ def write_pru_msg(msg_type: int, values: list | float | int) -> None:  # noqa: P
             )
             raise SysfsInterfaceError(msg)
 
-    with Path("/sys/shepherd/pru_msg_box").open("w", encoding="utf-8") as file:
+    with (sysfs_path / "pru_msg_box").open("w", encoding="utf-8") as file:
         file.write(f"{msg_type} {values[0]} {values[1]}")
 
 
@@ -529,7 +552,7 @@ def read_pru_msg() -> tuple[int, list[int]]:
     """
     Returns:
     """
-    with Path("/sys/shepherd/pru_msg_box").open(encoding="utf-8") as f:
+    with (sysfs_path / "pru_msg_box").open(encoding="utf-8") as f:
         message = f.read().rstrip()
     msg_parts = [int(x) for x in message.split()]
     if len(msg_parts) < 2:
@@ -575,7 +598,7 @@ def write_programmer_ctrl(
     # processing
     args = locals()
     log.debug("set programmerCTRL")
-    prog_path = Path("/sys/shepherd/programmer")
+    prog_path = sysfs_path / "programmer"
     for num, attribute in enumerate(prog_attribs):
         value = args[attribute]
         if value is None:
@@ -593,7 +616,7 @@ def write_programmer_ctrl(
 
 def read_programmer_ctrl() -> list:
     parameters = []
-    prog_path = Path("/sys/shepherd/programmer")
+    prog_path = sysfs_path / "programmer"
     for attribute in prog_attribs:
         with (prog_path / attribute).open(encoding="utf-8") as file:
             parameters.append(file.read().rstrip())
@@ -601,17 +624,17 @@ def read_programmer_ctrl() -> list:
 
 
 def write_programmer_datasize(value: int) -> None:
-    with Path("/sys/shepherd/programmer/datasize").open("w", encoding="utf-8") as file:
+    with (sysfs_path / "programmer/datasize").open("w", encoding="utf-8") as file:
         file.write(str(value))
 
 
 def start_programmer() -> None:
-    with Path("/sys/shepherd/programmer/state").open("w", encoding="utf-8") as file:
+    with (sysfs_path / "programmer/state").open("w", encoding="utf-8") as file:
         file.write("start")
 
 
 def check_programmer() -> str:
-    with Path("/sys/shepherd/programmer/state").open(encoding="utf-8") as file:
+    with (sysfs_path / "programmer/state").open(encoding="utf-8") as file:
         return file.read().rstrip()
 
 
@@ -640,7 +663,7 @@ def load_pru_firmware(value: str) -> None:
             break
     pru_num = 1 if ("pru1" in request) else 0
     log.debug("\t- set pru%d-firmware to '%s'", pru_num, request)
-    sys_path = Path(f"/sys/shepherd/pru{pru_num}_firmware")
+    sys_path = sysfs_path / f"pru{pru_num}_firmware"
     _count = 0
     while _count < 6:
         _count += 1
@@ -677,10 +700,10 @@ def pru_firmware_is_default() -> bool:
     _count = 1
     while _count < 6:
         try:
-            with Path("/sys/shepherd/pru0_firmware").open(encoding="utf-8") as file:
+            with (sysfs_path / "pru0_firmware").open(encoding="utf-8") as file:
                 if "shepherd-fw" not in file.read().rstrip():
                     return False
-            with Path("/sys/shepherd/pru1_firmware").open(encoding="utf-8") as file:
+            with (sysfs_path / "pru1_firmware").open(encoding="utf-8") as file:
                 if "shepherd-fw" not in file.read().rstrip():
                     return False
         except OSError:  # noqa: PERF203
@@ -698,13 +721,13 @@ def pru_firmware_is_default() -> bool:
 
 
 def read_gpio_tracer_mask() -> int:
-    with Path("/sys/shepherd/gpio_tracer_mask").open(encoding="utf-8") as f:
+    with (sysfs_path / "gpio_tracer_mask").open(encoding="utf-8") as f:
         return int(f.read().rstrip())
 
 
 def write_gpio_tracer_mask(value: int) -> None:
     try:
-        with Path("/sys/shepherd/gpio_tracer_mask").open("w", encoding="utf-8") as f:
+        with (sysfs_path / "gpio_tracer_mask").open("w", encoding="utf-8") as f:
             f.write(str(value))
     except OSError:
         log.error("Could not write GpioTracer-mask to PRU (it will record all)")
@@ -726,50 +749,50 @@ attribs = [
 
 
 def get_mode() -> str:
-    with Path("/sys/shepherd/mode").open(encoding="utf-8") as f:
+    with (sysfs_path / "mode").open(encoding="utf-8") as f:
         return str(f.read().rstrip())
 
 
 def get_state() -> str:
-    with Path("/sys/shepherd/state").open(encoding="utf-8") as f:
+    with (sysfs_path / "state").open(encoding="utf-8") as f:
         return str(f.read().rstrip())
 
 
 def get_trace_iv_inp_address() -> int:
-    with Path("/sys/shepherd/memory/iv_inp_address").open(encoding="utf-8") as f:
+    with (sysfs_path / "memory/iv_inp_address").open(encoding="utf-8") as f:
         return int(f.read().rstrip())
 
 
 def get_trace_iv_inp_size() -> int:
-    with Path("/sys/shepherd/memory/iv_inp_size").open(encoding="utf-8") as f:
+    with (sysfs_path / "memory/iv_inp_size").open(encoding="utf-8") as f:
         return int(f.read().rstrip())
 
 
 def get_trace_iv_out_address() -> int:
-    with Path("/sys/shepherd/memory/iv_out_address").open(encoding="utf-8") as f:
+    with (sysfs_path / "memory/iv_out_address").open(encoding="utf-8") as f:
         return int(f.read().rstrip())
 
 
 def get_trace_iv_out_size() -> int:
-    with Path("/sys/shepherd/memory/iv_out_size").open(encoding="utf-8") as f:
+    with (sysfs_path / "memory/iv_out_size").open(encoding="utf-8") as f:
         return int(f.read().rstrip())
 
 
 def get_trace_gpio_address() -> int:
-    with Path("/sys/shepherd/memory/gpio_address").open(encoding="utf-8") as f:
+    with (sysfs_path / "memory/gpio_address").open(encoding="utf-8") as f:
         return int(f.read().rstrip())
 
 
 def get_trace_gpio_size() -> int:
-    with Path("/sys/shepherd/memory/gpio_size").open(encoding="utf-8") as f:
+    with (sysfs_path / "memory/gpio_size").open(encoding="utf-8") as f:
         return int(f.read().rstrip())
 
 
 def get_trace_util_address() -> int:
-    with Path("/sys/shepherd/memory/util_address").open(encoding="utf-8") as f:
+    with (sysfs_path / "memory/util_address").open(encoding="utf-8") as f:
         return int(f.read().rstrip())
 
 
 def get_trace_util_size() -> int:
-    with Path("/sys/shepherd/memory/util_size").open(encoding="utf-8") as f:
+    with (sysfs_path / "memory/util_size").open(encoding="utf-8") as f:
         return int(f.read().rstrip())
@@ -0,0 +1,328 @@
+"""
+shepherd.task_pipeline
+~~~~~
+Pipelined execution of task-sets. Once the real-time loop of one task winds
+down, the hardware-independent setup of the following task (config-derivation,
+opening the input, reading the first buffer-fill) is done by a background-thread.
+
+"""
+
+import math
+from collections.abc import Generator
+from collections.abc import Sequence
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from types import TracebackType
+
+import numpy as np
+from shepherd_core import CalibrationPair
+from shepherd_core import CalibrationSeries
+from shepherd_core import Reader as CoreReader
+from shepherd_core import local_tz
+from shepherd_core.data_models.content.virtual_harvester import HarvesterPRUConfig
+from shepherd_core.data_models.content.virtual_source import ConverterPRUConfig
+from shepherd_core.data_models.task import EmulationTask
+from shepherd_core.data_models.task import HarvestTask
+from typing_extensions import Self
+
+from . import commons
+from .logger import get_verbosity
+from .logger import log
+from .looped_input import LoopedReader
+from .run_options import RunOptions
+from .synthetic_input import SyntheticReader
+from .synthetic_input import is_synthetic
+
+
+def derive_output_path(path: Path, start_time: float, prefix: str) -> Path:
+    """Resolves output-path, directories get a filename with timestamp of start."""
+    store_path = path.resolve()
+    if store_path.is_dir():
+        timestamp = datetime.fromtimestamp(start_time, tz=local_tz())
+        timestring = timestamp.strftime("%Y-%m-%d_%H-%M-%S")
+        # ⤷ closest to ISO 8601, avoids ":"
+        store_path = store_path / f"{prefix}_{timestring}.h5"
+    return store_path
+
+
+class EmulationPrep:
+    """Hardware-independent setup of an emulation.
+
+    Everything in here can be done ahead of time, even while another
+    task is still occupying the PRUs.
+
+    Args:
+        cfg: emulation task setting
+        preload: read & calibrate the initial buffer-fill into RAM
+        options: node-local run-settings (looping the input)
+    """
+
+    def __init__(
+        self,
+        cfg: EmulationTask,
+        *,
+        preload: bool = True,
+        options: RunOptions | None = None,
+    ) -> None:
+        self.cfg = cfg
+        options = options if options is not None else RunOptions()
+
+        if not cfg.input_path.exists():
+            msg = f"Input-File does not exist ({cfg.input_path})"
+            raise FileNotFoundError(msg)
+        self.reader: CoreReader | SyntheticReader | LoopedReader | None
+        if is_synthetic(cfg.input_path):
+            # segments get computed on the fly
+            self.reader = SyntheticReader(cfg.input_path)
+            log.info("Synthetic input: %s", self.reader.cfg)
+        else:
+            self.reader = CoreReader(cfg.input_path, verbose=get_verbosity())
+        if self.reader.get_mode() != "harvester":
+            log.error("Input-File has wrong mode (%s != harvester)", self.reader.get_mode())
+
+        self.samples_per_segment: int = self.reader.CHUNK_SAMPLES_N
+        self.buffer_segment_count: int = math.floor(
+            commons.BUFFER_IV_INP_SAMPLES_N // self.samples_per_segment
+        )
+
+        # PRU expects values in SI: uV and nV, synthetic input is already scaled
+        self.cal_pru: CalibrationSeries | None = None
+        if isinstance(self.reader, CoreReader):
+            self.cal_pru = self._derive_cal_pru(self.reader)
+
+        log_iv = cfg.power_tracing is not None
+        log_cap = log_iv and cfg.power_tracing.intermediate_voltage
+        self.cnv_pru = ConverterPRUConfig.from_vsrc(
+            data=cfg.virtual_source,
+            dtype_in=self.reader.get_datatype(),
+            log_intermediate_node=log_cap,
+        )
+        window_size = self.reader.get_window_samples()
+        self.hrv_pru = HarvesterPRUConfig.from_vhrv(
+            data=cfg.virtual_source.harvester,
+            for_emu=True,
+            dtype_in=self.reader.get_datatype(),
+            window_size=window_size if window_size > 0 else None,
+            voltage_step_V=self.reader.get_voltage_step(),
+        )
+
+        if options.loop_input:
+            # decoded once, already scaled to PRU
+            self.reader = LoopedReader(
+                self.reader,
+                self.cal_pru,
+                duration=cfg.duration,
+                shift_s=options.loop_shift_s,
+                cache_nbytes=options.memory_budget.loop_cache_nbytes,
+            )
+            self.cal_pru = None
+
+        # initial buffer-fill, already in PRU-units
+        self.initial_fill: np.ndarray | None = None
+        if preload:
+            self.initial_fill = self.load_initial_fill()
+
+    def load_initial_fill(self) -> np.ndarray:
+        """Samples for the initial buffer-fill, interleaved (voltage | current) in PRU-units.
+
+        hdf5-input gets read with one slice per channel and is calibrated at once.
+        """
+        if isinstance(self.reader, CoreReader):
+            segments_n = min(
+                self.buffer_segment_count,
+                int(self.reader.samples_n // self.samples_per_segment),
+            )
+            samples_n = segments_n * self.samples_per_segment
+            voltage = self.reader.ds_voltage[:samples_n]
+            current = self.reader.ds_current[:samples_n]
+            if self.cal_pru is not None:
+                voltage = self.cal_pru.voltage.raw_to_si(voltage)
+                current = self.cal_pru.current.raw_to_si(current)
+            iv_data = np.empty(2 * samples_n, dtype=np.uint32)
+            iv_data[0::2] = voltage
+            iv_data[1::2] = current
+            return iv_data
+        # generated & looped segments are already scaled
+        iv_data = np.empty(2 * self.buffer_segment_count * self.samples_per_segment, np.uint32)
+        offset = 0
+        for _, dsv, dsc in self.reader.read(end_n=self.buffer_segment_count):
+            iv_data[offset : offset + 2 * dsv.size : 2] = dsv
+            iv_data[offset + 1 : offset + 2 * dsc.size : 2] = dsc
+            offset += 2 * dsv.size
+        return iv_data[:offset]
+
+    @staticmethod
+    def _derive_cal_pru(reader: CoreReader) -> CalibrationSeries:
+        cal_inp = reader.get_calibration_data()
+        if cal_inp is None:
+            cal_inp = CalibrationSeries()
+            log.warning(
+                "No calibration data from emulation-input (harvest) provided - using defaults",
+            )
+        return CalibrationSeries(
+            voltage=CalibrationPair(
+                gain=1e6 * cal_inp.voltage.gain,
+                offset=1e6 * cal_inp.voltage.offset,
+                unit="V",
+            ),
+            current=CalibrationPair(
+                gain=1e9 * cal_inp.current.gain,
+                offset=1e9 * cal_inp.current.offset,
+                unit="A",
+            ),
+        )
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        typ: type[BaseException] | None = None,
+        exc: BaseException | None = None,
+        tb: TracebackType | None = None,
+        extra_arg: int = 0,
+    ) -> None:
+        self.initial_fill = None
+        if self.reader is not None:
+            self.reader.__exit__()
+            self.reader = None
+
+    def pop_initial_fill(self) -> np.ndarray | None:
+        """Hands over the preloaded buffer-fill (only once) to free RAM after use."""
+        iv_data = self.initial_fill
+        self.initial_fill = None
+        return iv_data
+
+
+class HarvestPrep:
+    """Hardware-independent setup of a harvest."""
+
+    def __init__(self, cfg: HarvestTask) -> None:
+        self.cfg = cfg
+        self.hrv_pru = HarvesterPRUConfig.from_vhrv(
+            data=cfg.virtual_harvester,
+            for_emu=False,
+            dtype_in=None,
+        )
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        typ: type[BaseException] | None = None,
+        exc: BaseException | None = None,
+        tb: TracebackType | None = None,
+        extra_arg: int = 0,
+    ) -> None:
+        pass
+
+
+TaskPrep = EmulationPrep | HarvestPrep
+
+
+def prepare(task: object, options: RunOptions | None = None) -> TaskPrep | None:
+    if isinstance(task, EmulationTask):
+        return EmulationPrep(task, options=options)
+    if isinstance(task, HarvestTask):
+        return HarvestPrep(task)
+    return None
+
+
+class TaskPipeline:
+    """Iterates over a task-set while preparing the next task in the background.
+
+    The preparation of task N+1 is started when task N calls prefetch_next()
+    (once its real-time loop idles after the measurement) or, at the latest,
+    when task N returns - it never competes with the loop while it is busy.
+    Preparation errors are not fatal - the task will then
+    be set up synchronously (and fail there if it has to).
+    Without prefetch, each task gets prepared right before it is handed out.
+    """
+
+    def __init__(
+        self,
+        tasks: Sequence,
+        *,
+        prefetch: bool = True,
+        options: RunOptions | None = None,
+    ) -> None:
+        self.tasks = [task for task in tasks if task is not None]
+        self.prefetch = prefetch
+        self.options = options
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="Shp.TaskPrep")
+        self._futures: dict[int, Future] = {}
+        # next task that may be prepared, waits for prefetch_next()
+        self._pending: int | None = None
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        typ: type[BaseException] | None = None,
+        exc: BaseException | None = None,
+        tb: TracebackType | None = None,
+        extra_arg: int = 0,
+    ) -> None:
+        # release preparations that were never picked up
+        for index in list(self._futures):
+            prep = self._result(index)
+            if prep is not None:
+                prep.__exit__()
+        self._executor.shutdown(wait=True)
+
+    def __iter__(self) -> Generator[tuple[object, TaskPrep | None], None, None]:
+        for index, task in enumerate(self.tasks):
+            if index == 0 or not self.prefetch:
+                self._submit(index)
+            if (
+                self.prefetch
+                and index + 1 < len(self.tasks)
+                and self._can_prefetch(task, self.tasks[index + 1])
+            ):
+                self._pending = index + 1
+            yield task, self._result(index)
+            # task is done, in case it never idled
+            self.prefetch_next()
+
+    def prefetch_next(self) -> None:
+        """Starts preparing the following task, to be called by the running task when idle."""
+        if self._pending is None:
+            return
+        self._submit(self._pending)
+        self._pending = None
+
+    def _submit(self, index: int) -> None:
+        if index in self._futures or not isinstance(self.tasks[index], EmulationTask | HarvestTask):
+            return
+        log.debug("Preparing task %d (%s)", index, type(self.tasks[index]).__name__)
+        self._futures[index] = self._executor.submit(prepare, self.tasks[index], self.options)
+
+    def _result(self, index: int) -> TaskPrep | None:
+        future = self._futures.pop(index, None)
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception as xcp:  # noqa: BLE001
+            log.warning(
+                "Preparing task %d failed (%s) -> will retry synchronously",
+                index,
+                xcp,
+            )
+            return None
+
+    @staticmethod
+    def _can_prefetch(task: object, task_next: object) -> bool:
+        """Chained tasks are not prefetched - input might be the output of the current task."""
+        if not isinstance(task_next, EmulationTask):
+            return True
+        path_out = getattr(task, "output_path", None)
+        if path_out is None:
+            return True
+        path_inp = task_next.input_path.resolve()
+        path_out = path_out.resolve()
+        return path_inp != path_out and path_out not in path_inp.parents
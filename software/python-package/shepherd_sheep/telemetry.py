@@ -0,0 +1,272 @@
+"""
+shepherd.telemetry
+~~~~~
+Decimated live-view of a running measurement for the herd.
+
+Once per interval the traces passing through the main-loop get reduced to
+one small binary frame (IV-statistics, GPIO-edges per pin, PRU-utilization,
+fill-levels & overflow-counters of the shared buffers). Frames are sent to
+every collector connected to the TCP-port of the sheep (see telemetry.py of
+shepherd-herd). Sending never blocks - a collector that can't keep up gets
+disconnected. Full-rate data still only goes to the Writer.
+
+"""
+
+import socket
+import struct
+import time
+from dataclasses import astuple
+from dataclasses import dataclass
+from types import TracebackType
+
+import numpy as np
+from shepherd_core import CalibrationEmulator as CalEmu
+from shepherd_core import CalibrationHarvester as CalHrv
+from shepherd_core import CalibrationSeries as CalSeries
+from typing_extensions import Self
+
+from .logger import log
+from .shared_mem_gpio_output import GPIOTrace
+from .shared_mem_iv_input import IVTrace
+from .shared_mem_util_output import UtilTrace
+from .shared_memory import SharedMemory
+
+TELEMETRY_PORT: int = 51_451
+INTERVAL_S: float = 1.0
+GPIO_PINS_N: int = 16
+
+# NOTE: frame-format is duplicated in shepherd_herd/telemetry.py -> keep in sync
+FRAME_MAGIC: bytes = b"SHTL"
+FRAME_VERSION: int = 1
+# magic, version, length of body
+FRAME_HEADER = struct.Struct("<4sBH")
+FRAME_BODY = struct.Struct(f"<QI3f3ffI{GPIO_PINS_N}IIfII4B5I")
+
+
+@dataclass
+class TelemetryFrame:
+    """Statistics of one interval, buffer-states at its end."""
+
+    timestamp_ns: int = 0
+    samples_n: int = 0
+    # min, mean, max
+    voltage_V: tuple[float, float, float] = (0.0, 0.0, 0.0)
+    current_A: tuple[float, float, float] = (0.0, 0.0, 0.0)
+    power_mean_W: float = 0.0
+    gpio_samples_n: int = 0
+    gpio_edges: tuple[int, ...] = (0,) * GPIO_PINS_N
+    util_n: int = 0
+    pru0_tsample_mean_ns: float = 0.0
+    pru0_tsample_max_ns: int = 0
+    pru1_tsample_max_ns: int = 0
+    # iv_inp, iv_out, gpio, util [%]
+    fill_levels: tuple[int, ...] = (0, 0, 0, 0)
+    # iv_inp, iv_out, gpio, util, blind spots of detector (all since start)
+    overflows: tuple[int, ...] = (0, 0, 0, 0, 0)
+
+    def pack(self) -> bytes:
+        values: list = []
+        for value in astuple(self):
+            values.extend(value if isinstance(value, tuple) else (value,))
+        return FRAME_HEADER.pack(FRAME_MAGIC, FRAME_VERSION, FRAME_BODY.size) + FRAME_BODY.pack(
+            *values
+        )
+
+    @classmethod
+    def unpack(cls, body: bytes) -> "TelemetryFrame":
+        values = FRAME_BODY.unpack(body)
+        return cls(
+            timestamp_ns=values[0],
+            samples_n=values[1],
+            voltage_V=values[2:5],
+            current_A=values[5:8],
+            power_mean_W=values[8],
+            gpio_samples_n=values[9],
+            gpio_edges=values[10 : 10 + GPIO_PINS_N],
+            util_n=values[10 + GPIO_PINS_N],
+            pru0_tsample_mean_ns=values[11 + GPIO_PINS_N],
+            pru0_tsample_max_ns=values[12 + GPIO_PINS_N],
+            pru1_tsample_max_ns=values[13 + GPIO_PINS_N],
+            fill_levels=values[14 + GPIO_PINS_N : 18 + GPIO_PINS_N],
+            overflows=values[18 + GPIO_PINS_N :],
+        )
+
+
+class TelemetryPublisher:
+    """Reduces traces of the main-loop and publishes a frame per interval.
+
+    Args:
+        cal: calibration of the IV-data (same as for the Writer)
+        port: TCP-port collectors connect to, 0 picks a free one
+        interval_s: time between frames
+    """
+
+    def __init__(
+        self,
+        cal: CalSeries | CalEmu | CalHrv,
+        port: int = TELEMETRY_PORT,
+        interval_s: float = INTERVAL_S,
+    ) -> None:
+        if isinstance(cal, CalEmu | CalHrv):
+            cal = CalSeries.from_cal(cal)
+        self.gain_v: float = cal.voltage.gain
+        self.offset_v: float = cal.voltage.offset
+        self.gain_c: float = cal.current.gain
+        self.offset_c: float = cal.current.offset
+        self.port = port
+        self.interval_ns: int = round(interval_s * 1e9)
+        self.server: socket.socket | None = None
+        self.clients: list[socket.socket] = []
+        self.frames_n: int = 0
+        self._ts_last_ns: int = 0
+        self._gpio_last: int | None = None
+        self._pin_masks = 1 << np.arange(GPIO_PINS_N, dtype=np.uint16)
+        self._reset()
+
+    def __enter__(self) -> Self:
+        self.server = socket.create_server(("", self.port))
+        self.server.setblocking(False)  # noqa: FBT003
+        self.port = self.server.getsockname()[1]
+        self._ts_last_ns = time.monotonic_ns()
+        log.info("[%s] Publishing on port %d", type(self).__name__, self.port)
+        return self
+
+    def __exit__(
+        self,
+        typ: type[BaseException] | None = None,
+        exc: BaseException | None = None,
+        tb: TracebackType | None = None,
+        extra_arg: int = 0,
+    ) -> None:
+        for client in self.clients:
+            client.close()
+        self.clients = []
+        if self.server is not None:
+            self.server.close()
+            self.server = None
+        log.debug("[%s] Sent %d frames", type(self).__name__, self.frames_n)
+
+    def _reset(self) -> None:
+        """Starts statistics of a new interval."""
+        self.samples_n: int = 0
+        self.voltage_raw: list[int] = [2**32, 0]  # min, max
+        self.current_raw: list[int] = [2**32, 0]
+        self.voltage_sum: float = 0.0
+        self.current_sum: float = 0.0
+        self.power_sum: float = 0.0
+        self.gpio_samples_n: int = 0
+        self.gpio_edges = np.zeros(GPIO_PINS_N, dtype=np.uint64)
+        self.util_n: int = 0
+        self.tsample_sum: float = 0.0
+        self.pru0_tsample_max: int = 0
+        self.pru1_tsample_max: int = 0
+
+    def update(
+        self,
+        data_iv: IVTrace | None,
+        data_gp: GPIOTrace | None,
+        data_ut: UtilTrace | None,
+        shared_mem: SharedMemory,
+    ) -> None:
+        """Adds traces of a loop-iteration, publishes a frame when interval is over."""
+        if data_iv:
+            self._add_iv(data_iv)
+        if data_gp:
+            self._add_gpio(data_gp)
+        if data_ut:
+            self._add_util(data_ut)
+        ts_now = time.monotonic_ns()
+        if ts_now - self._ts_last_ns >= self.interval_ns:
+            self._ts_last_ns = ts_now
+            self.publish(self.frame(shared_mem))
+            self._reset()
+
+    def _add_iv(self, data: IVTrace) -> None:
+        voltage_V = data.voltage * self.gain_v
+        voltage_V += self.offset_v
+        current_A = data.current * self.gain_c
+        current_A += self.offset_c
+        self.voltage_raw = [
+            min(self.voltage_raw[0], int(data.voltage.min())),
+            max(self.voltage_raw[1], int(data.voltage.max())),
+        ]
+        self.current_raw = [
+            min(self.current_raw[0], int(data.current.min())),
+            max(self.current_raw[1], int(data.current.max())),
+        ]
+        self.voltage_sum += float(voltage_V.sum())
+        self.current_sum += float(current_A.sum())
+        self.power_sum += float(np.dot(voltage_V, current_A))
+        self.samples_n += voltage_V.size
+
+    def _add_gpio(self, data: GPIOTrace) -> None:
+        bitmasks = data.bitmasks
+        previous = np.empty_like(bitmasks)
+        previous[1:] = bitmasks[:-1]
+        previous[0] = bitmasks[0] if self._gpio_last is None else self._gpio_last
+        changes = np.bitwise_xor(bitmasks, previous)
+        for pin, mask in enumerate(self._pin_masks):
+            self.gpio_edges[pin] += np.count_nonzero(changes & mask)
+        self._gpio_last = int(bitmasks[-1])
+        self.gpio_samples_n += bitmasks.size
+
+    def _add_util(self, data: UtilTrace) -> None:
+        self.util_n += len(data)
+        self.tsample_sum += float(data.pru0_tsample_mean.sum())
+        self.pru0_tsample_max = max(self.pru0_tsample_max, int(data.pru0_tsample_max.max()))
+        self.pru1_tsample_max = max(self.pru1_tsample_max, int(data.pru1_tsample_max.max()))
+
+    def frame(self, shared_mem: SharedMemory) -> TelemetryFrame:
+        """Statistics of current interval."""
+        samples_n = max(self.samples_n, 1)
+        voltage_V = [_r * self.gain_v + self.offset_v for _r in self.voltage_raw]
+        current_A = [_r * self.gain_c + self.offset_c for _r in self.current_raw]
+        buffers = (shared_mem.iv_inp, shared_mem.iv_out, shared_mem.gpio, shared_mem.util)
+        return TelemetryFrame(
+            timestamp_ns=time.time_ns(),
+            samples_n=self.samples_n,
+            voltage_V=(
+                min(voltage_V) if self.samples_n else 0.0,
+                self.voltage_sum / samples_n,
+                max(voltage_V) if self.samples_n else 0.0,
+            ),
+            current_A=(
+                min(current_A) if self.samples_n else 0.0,
+                self.current_sum / samples_n,
+                max(current_A) if self.samples_n else 0.0,
+            ),
+            power_mean_W=self.power_sum / samples_n,
+            gpio_samples_n=self.gpio_samples_n,
+            gpio_edges=tuple(int(_e) for _e in self.gpio_edges),
+            util_n=self.util_n,
+            pru0_tsample_mean_ns=self.tsample_sum / max(self.util_n, 1),
+            pru0_tsample_max_ns=self.pru0_tsample_max,
+            pru1_tsample_max_ns=self.pru1_tsample_max,
+            fill_levels=tuple(min(round(100 * _b.fill_level), 100) for _b in buffers),
+            overflows=(*(_b.overflows_n for _b in buffers), shared_mem.blind_spots_n),
+        )
+
+    def publish(self, frame: TelemetryFrame) -> None:
+        """Accepts waiting collectors and sends frame to all of them."""
+        if self.server is None:
+            return
+        while True:
+            try:
+                client, address = self.server.accept()
+            except BlockingIOError:
+                break
+            client.setblocking(False)  # noqa: FBT003
+            self.clients.append(client)
+            log.debug("[%s] Collector connected from %s", type(self).__name__, address[0])
+        data = frame.pack()
+        for client in list(self.clients):
+            try:
+                complete = client.send(data) == len(data)
+            except OSError:
+                complete = False
+            if not complete:
+                # a partial frame would corrupt the stream
+                log.warning("[%s] Collector too slow or gone -> dropped", type(self).__name__)
+                client.close()
+                self.clients.remove(client)
+        self.frames_n += 1
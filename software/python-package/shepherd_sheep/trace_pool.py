@@ -0,0 +1,95 @@
+"""
+shepherd.trace_pool
+~~~~~
+Recycles trace-containers (IVTrace, GPIOTrace, UtilTrace) and their
+backing arrays, so multi-day runs don't allocate a fresh set of arrays
+for every chunk read from the PRU-buffers.
+
+Ownership: a trace from acquire() belongs to the caller until it is
+handed back via release(). After that its arrays get overwritten by
+later reads, so it must not be used anymore. Traces never reference
+the PRU-ring itself - data is copied before the ring-index advances.
+Traces that don't get released are simply garbage-collected.
+
+"""
+
+from collections.abc import Callable
+from collections.abc import Mapping
+from typing import Generic
+from typing import TypeVar
+
+import numpy as np
+from numpy.typing import DTypeLike
+
+from .logger import log
+
+T = TypeVar("T")
+
+
+class TracePool(Generic[T]):
+    """Preallocated traces of a single stream.
+
+    Args:
+        factory: builds a trace-container from keyword-arrays (i.e. the trace-class)
+        fields: names & dtypes of arrays handed to factory
+        capacity: max samples per trace
+        size: traces allocated ahead of time, also upper limit of retained traces
+    """
+
+    def __init__(
+        self,
+        factory: Callable[..., T],
+        fields: Mapping[str, DTypeLike],
+        capacity: int,
+        size: int = 2,
+    ) -> None:
+        self.factory = factory
+        self.fields = dict(fields)
+        self.capacity = capacity
+        self.size = size
+        self.allocations: int = 0
+        self._free: list[tuple[T, dict[str, np.ndarray]]] = [self._allocate() for _ in range(size)]
+
+    def _allocate(self) -> tuple[T, dict[str, np.ndarray]]:
+        self.allocations += 1
+        arrays = {_n: np.empty(self.capacity, dtype=_t) for _n, _t in self.fields.items()}
+        return self.factory(**arrays), arrays
+
+    def acquire(self, length: int) -> T:
+        """Trace with arrays of given length (content is undefined)."""
+        if length > self.capacity:
+            msg = f"[{type(self).__name__}] Length {length} exceeds capacity {self.capacity}"
+            raise ValueError(msg)
+        if len(self._free) > 0:
+            trace, arrays = self._free.pop()
+        else:
+            # all traces are still owned by consumers
+            trace, arrays = self._allocate()
+            if self.allocations == 2 * self.size + 1:
+                log.debug(
+                    "[%s] Traces of %s are not released - allocating new ones",
+                    type(self).__name__,
+                    self.factory.__name__,
+                )
+        for name, array in arrays.items():
+            setattr(trace, name, array[:length])
+        return trace
+
+    def release(self, trace: T | None) -> None:
+        """Hands trace back to pool, it must not be used afterwards."""
+        if trace is None:
+            return
+        if any(trace is _t for _t, _ in self._free):
+            msg = f"[{type(self).__name__}] Trace was released twice"
+            raise ValueError(msg)
+        if len(self._free) >= self.size:
+            return
+        arrays = {}
+        for name in self.fields:
+            array = getattr(trace, name)
+            base = array if array.base is None else array.base
+            if not isinstance(base, np.ndarray) or base.size != self.capacity:
+                # not from this pool (or modified by consumer)
+                return
+            arrays[name] = base
+        self._free.append((trace, arrays))
@@ -0,0 +1,26 @@
+"""
+shepherd.trace_window
+~~~~~
+Time-window of the tracers (IV & GPIO). Readers copy only the part of a
+chunk that lies inside [ts_start, ts_stop], which is found by bisecting
+the timestamps instead of checking every sample.
+
+"""
+
+import numpy as np
+
+
+def clip_to_window(
+    timestamps_ns: np.ndarray, *, ts_set: bool, ts_start: int | None, ts_stop: int | None
+) -> tuple[int, int]:
+    """Index-range of samples inside the time-boundaries [ts_start, ts_stop].
+
+    Timestamps of a chunk are ascending, so boundary-chunks only contribute
+    their in-window part. Range is empty if chunk is outside.
+    Without a window (ts_set is False) the whole chunk is in range.
+    """
+    if not ts_set:
+        return 0, timestamps_ns.size
+    idx_start = int(np.searchsorted(timestamps_ns, ts_start, side="left"))
+    idx_stop = int(np.searchsorted(timestamps_ns, ts_stop, side="right"))
+    return idx_start, max(idx_start, idx_stop)
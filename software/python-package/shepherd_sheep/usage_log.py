@@ -6,6 +6,8 @@ path_log = Path("/var/shepherd/log.csv")
 
 
 def usage_logger(ts_start: datetime, cmd: str) -> None:
+    if not path_log.parent.exists():
+        return  # not on a node, i.e. for a benchmark
     ts_now = datetime.now().astimezone()
     existed = path_log.exists()
     with path_log.open("a", encoding="utf-8") as fh:
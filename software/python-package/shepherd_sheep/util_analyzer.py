@@ -0,0 +1,198 @@
+"""
+shepherd.util_analyzer
+~~~~~
+Evaluates the PRU-utilization stream, one window per sync-period.
+
+Every window gets checked against the real-time budget of PRU0 (mean & max
+time per sample-loop) and the expected sample-count. Critical windows that
+follow each other get merged into one event, so a broken configuration
+produces one report instead of one per window. A histogram of the
+utilization over the whole run shows how close the config came to the limit.
+
+"""
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from . import commons
+from .logger import log
+
+if TYPE_CHECKING:
+    from .shared_mem_util_output import UtilTrace
+
+# reasons of a critical window, combined as bit-flags
+FLAG_MEAN: int = 1
+FLAG_MAX: int = 2
+FLAG_COUNT: int = 4
+FLAG_NAMES: dict[int, str] = {FLAG_MEAN: "mean", FLAG_MAX: "max", FLAG_COUNT: "sample-count"}
+
+EVENT_COLUMNS: tuple[str, ...] = (
+    "time_start [ns]",
+    "time_stop [ns]",
+    "windows [n]",
+    "flags (1 = mean, 2 = max, 4 = sample-count)",
+    "pru0_tsample_mean max [ns]",
+    "pru0_tsample_max max [ns]",
+    "sample_count min [n]",
+    "sample_count max [n]",
+)
+# [%] of SAMPLE_INTERVAL_NS, last bin collects everything above 100 %
+HISTOGRAM_STEP: int = 5
+HISTOGRAM_EDGES: tuple[int, ...] = tuple(range(0, 101, HISTOGRAM_STEP))
+
+
+class UtilAnalyzer:
+    """Flags critical util-windows, merges them to events and bins the utilization.
+
+    Args:
+        mean_crit: mean time per sample-loop [% of sample-interval] above that is critical
+        max_crit: max time per sample-loop [%] reaching that is critical
+        count_tolerance: allowed deviation of sample-count from SAMPLES_PER_SYNC
+    """
+
+    def __init__(
+        self, mean_crit: float = 95.0, max_crit: float = 100.0, count_tolerance: int = 1
+    ) -> None:
+        self.mean_crit_ns = mean_crit * commons.SAMPLE_INTERVAL_NS / 100
+        self.max_crit_ns = max_crit * commons.SAMPLE_INTERVAL_NS / 100
+        self.count_tolerance = count_tolerance
+        self.windows_n: int = 0
+        self.windows_crit_n: int = 0
+        self.events_n: int = 0
+        # rows by bin, columns: pru0 mean, pru0 max
+        self.histogram = np.zeros((len(HISTOGRAM_EDGES), 2), dtype=np.uint64)
+        # event still growing (last window was critical), same layout as EVENT_COLUMNS
+        self._open: np.ndarray | None = None
+        self._closed: list[np.ndarray] = []
+
+    def update(self, data: "UtilTrace") -> None:
+        """Analyzes windows of trace, events get closed once a regular window follows."""
+        len_new = len(data)
+        if len_new < 1:
+            return
+        timestamps = data.timestamps_ns[:len_new]
+        tsample_mean = data.pru0_tsample_mean[:len_new]
+        tsample_max = data.pru0_tsample_max[:len_new]
+        sample_count = data.sample_count[:len_new].astype(np.int64)
+
+        self.windows_n += len_new
+        for column, values in enumerate((tsample_mean, tsample_max)):
+            bins = values * 100 // (HISTOGRAM_STEP * commons.SAMPLE_INTERVAL_NS)
+            bins = np.minimum(bins, len(HISTOGRAM_EDGES) - 1).astype(np.intp)
+            self.histogram[:, column] += np.bincount(bins, minlength=len(HISTOGRAM_EDGES)).astype(
+                np.uint64
+            )
+
+        flags = np.zeros(len_new, dtype=np.uint8)
+        flags[tsample_mean > self.mean_crit_ns] |= FLAG_MEAN
+        flags[tsample_max >= self.max_crit_ns] |= FLAG_MAX
+        deviation = np.abs(sample_count - commons.SAMPLES_PER_SYNC)
+        flags[deviation > self.count_tolerance] |= FLAG_COUNT
+        crit = np.flatnonzero(flags)
+        self.windows_crit_n += crit.size
+        if crit.size < 1:
+            self._close()
+            return
+
+        # window continues the event before, if it directly follows a critical window
+        gap_ns = commons.SYNC_INTERVAL_NS // 2
+        continues = np.empty(crit.size, dtype=bool)
+        continues[1:] = (np.diff(crit) == 1) & (
+            timestamps[crit[1:]] - timestamps[crit[:-1]] <= commons.SYNC_INTERVAL_NS + gap_ns
+        )
+        continues[0] = (
+            crit[0] == 0
+            and self._open is not None
+            and int(timestamps[0]) <= int(self._open[1]) + gap_ns
+        )
+        starts = np.flatnonzero(~continues)
+        bounds = starts if starts.size > 0 and starts[0] == 0 else np.r_[0, starts]
+        ends = np.r_[bounds[1:], crit.size]
+
+        rows = np.empty((bounds.size, len(EVENT_COLUMNS)), dtype=np.uint64)
+        rows[:, 0] = timestamps[crit[bounds]]
+        rows[:, 1] = timestamps[crit[ends - 1]] + commons.SYNC_INTERVAL_NS
+        rows[:, 2] = ends - bounds
+        rows[:, 3] = np.bitwise_or.reduceat(flags[crit], bounds)
+        rows[:, 4] = np.ceil(np.maximum.reduceat(tsample_mean[crit], bounds))
+        rows[:, 5] = np.maximum.reduceat(tsample_max[crit], bounds)
+        rows[:, 6] = np.minimum.reduceat(sample_count[crit], bounds)
+        rows[:, 7] = np.maximum.reduceat(sample_count[crit], bounds)
+
+        for num, row in enumerate(rows):
+            if num == 0 and continues[0]:
+                self._merge(row)
+            else:
+                self._close()
+                self._open = row
+                log.warning(
+                    "Pru0-Util critical (%s) since t = %.3f s "
+                    "-> WARNING: probably broken real-time-condition",
+                    self._flag_names(int(row[3])),
+                    row[0] / 1e9,
+                )
+        if crit[-1] < len_new - 1:
+            # a regular window follows
+            self._close()
+
+    def _merge(self, row: np.ndarray) -> None:
+        """Extends open event by row that directly follows it."""
+        event = self._open
+        event[1] = row[1]
+        event[2] += row[2]
+        event[3] |= row[3]
+        event[4:6] = np.maximum(event[4:6], row[4:6])
+        event[6] = min(event[6], row[6])
+        event[7] = max(event[7], row[7])
+
+    def _close(self) -> None:
+        if self._open is None:
+            return
+        event = self._open
+        self._open = None
+        self._closed.append(event)
+        self.events_n += 1
+        log.warning(
+            "Pru0-Util critical (%s) for %.1f s (%d windows) from t = %.3f s: "
+            "mean <= %.1f %%, max <= %.1f %%, sample-count [%d, %d] n",
+            self._flag_names(int(event[3])),
+            (event[1] - event[0]) / 1e9,
+            event[2],
+            event[0] / 1e9,
+            event[4] * 100 / commons.SAMPLE_INTERVAL_NS,
+            event[5] * 100 / commons.SAMPLE_INTERVAL_NS,
+            event[6],
+            event[7],
+        )
+
+    @staticmethod
+    def _flag_names(flags: int) -> str:
+        return ", ".join(_name for _flag, _name in FLAG_NAMES.items() if flags & _flag)
+
+    def close(self) -> None:
+        """Ends an ongoing event, call at end of run."""
+        self._close()
+
+    def pop_events(self) -> np.ndarray:
+        """Events closed since last call, rows as in EVENT_COLUMNS."""
+        if len(self._closed) < 1:
+            return np.empty((0, len(EVENT_COLUMNS)), dtype=np.uint64)
+        events = np.vstack(self._closed)
+        self._closed = []
+        return events
+
+    def summary(self) -> str:
+        """Critical windows & histogram of utilization (% of sample-interval)."""
+        lines = [
+            f"{self.windows_crit_n} of {self.windows_n} windows critical, {self.events_n} events",
+            f"{'util [%]':>10} {'mean [n]':>12} {'max [n]':>12}",
+        ]
+        for num, edge in enumerate(HISTOGRAM_EDGES):
+            label = (
+                f">= {edge}"
+                if num == len(HISTOGRAM_EDGES) - 1
+                else f"{edge} - {edge + HISTOGRAM_STEP}"
+            )
+            lines.append(f"{label:>10} {self.histogram[num, 0]:>12} {self.histogram[num, 1]:>12}")
+        return "\n".join(lines)
@@ -0,0 +1,57 @@
+import os
+from pathlib import Path
+from queue import Queue
+
+import pytest
+import yaml
+from click.testing import CliRunner
+from shepherd_sheep import benchmark
+from shepherd_sheep.benchmark import BenchResult
+from shepherd_sheep.benchmark import bench_monitor
+from shepherd_sheep.benchmark import run_benchmarks
+from shepherd_sheep.benchmark import summary
+from shepherd_sheep.cli import cli
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "memfd_create"), reason="needs linux")
+
+
+def test_bench_result_headroom() -> None:
+    result = BenchResult("test", required_sps=100)
+    result.samples_n = 1000
+    result.duration_s = 2.0
+    assert result.samples_per_s == 500
+    assert result.headroom == 5
+    assert BenchResult("test", required_sps=None).headroom is None
+
+
+def test_run_benchmarks(tmp_path: Path) -> None:
+    report = run_benchmarks(duration_s=0.2, data_path=tmp_path)
+    names = [_r["name"] for _r in report["results"]]
+    assert "iv_inp_write" in names
+    assert "writer_iv_lzf" in names
+    for result in report["results"]:
+        assert result["samples_n"] > 0, result["name"]
+        assert result["samples_per_s"] > 0, result["name"]
+    assert "versions" in report["system"]
+    assert "iv_out_read" in summary(report)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_bench_monitor_gives_up(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # entries never reach the monitor, like a dead monitor-thread
+    monkeypatch.setattr(benchmark, "get_message_queue", Queue)
+    result = bench_monitor(100, tmp_path, timeout_s=0.2)
+    assert not result.complete
+    assert result.samples_n < 100
+    report = {"results": [result.to_dict()]}
+    assert "(partial)" in summary(report)
+
+
+def test_cli_bench(cli_runner: CliRunner, tmp_path: Path) -> None:
+    path = tmp_path / "bench.yaml"
+    res = cli_runner.invoke(cli, ["bench", "--duration", "0.1", "--output-path", path.as_posix()])
+    assert res.exit_code == 0
+    with path.open(encoding="utf-8") as fh:
+        report = yaml.safe_load(fh)
+    assert report["duration_s"] == 0.1
+    assert len(report["results"]) > 10
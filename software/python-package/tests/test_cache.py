@@ -0,0 +1,104 @@
+from pathlib import Path
+
+import pytest
+from shepherd_core import CalibrationCape
+from shepherd_sheep import cache
+from shepherd_sheep import eeprom
+
+
+@pytest.fixture(autouse=True)
+def cache_tmp(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    path = tmp_path / "cache"
+    monkeypatch.setattr(cache, "cache_path", path)
+    return path
+
+
+def test_cache_store_load() -> None:
+    assert cache.load("test", "abc") is None
+    cache.store("test", "abc", {"value": 42})
+    assert cache.load("test", "abc") == {"value": 42}
+    assert cache.load("test", "xyz") is None
+
+
+def test_cache_outdated(monkeypatch: pytest.MonkeyPatch) -> None:
+    cache.store("test", "abc", 42)
+    monkeypatch.setattr(cache, "version_stamp", lambda: "sheep=0.0.0")
+    assert cache.load("test", "abc") is None
+
+
+def test_cache_corrupted(cache_tmp: Path) -> None:
+    cache.store("test", "abc", 42)
+    (cache_tmp / "test" / "abc.pickle").write_bytes(b"garbage")
+    assert cache.load("test", "abc") is None
+
+
+def test_cache_limits_entries() -> None:
+    for i in range(5):
+        cache.store("test", f"key{i}", i, max_entries=2)
+    assert cache.load("test", "key0") is None
+    assert cache.load("test", "key4") == 4
+
+
+def test_cache_clear() -> None:
+    cache.store("test", "abc", 42)
+    cache.store("other", "abc", 42)
+    cache.clear("test")
+    assert cache.load("test", "abc") is None
+    assert cache.load("other", "abc") == 42
+    cache.clear()
+    assert cache.load("other", "abc") is None
+
+
+class EEPROMStandIn:
+    """Offers the reading-part of the EEPROM-API."""
+
+    def __init__(self) -> None:
+        self.content = "00000001"
+        self.reads = 0
+
+    def fingerprint(self) -> str:
+        return self.content
+
+    def read_calibration(self) -> CalibrationCape:
+        self.reads += 1
+        return CalibrationCape()
+
+
+def test_calibration_cached() -> None:
+    storage = EEPROMStandIn()
+    eeprom.clear_calibration_cache()
+    cal1 = eeprom._read_calibration_cached(storage)
+    cal2 = eeprom._read_calibration_cached(storage)
+    assert storage.reads == 1
+    assert cal1 is cal2
+    # fresh process only has the disk-cache
+    eeprom._calibration_memo = None
+    cal3 = eeprom._read_calibration_cached(storage)
+    assert storage.reads == 1
+    assert cal3.get_hash() == cal1.get_hash()
+    # EEPROM-content changed
+    storage.content = "00000002"
+    eeprom._read_calibration_cached(storage)
+    assert storage.reads == 2
+    eeprom.clear_calibration_cache()
+    eeprom._read_calibration_cached(storage)
+    assert storage.reads == 3
+
+
+def test_cache_directory_private(cache_tmp: Path) -> None:
+    cache.store("test", "abc", 42)
+    assert (cache_tmp.stat().st_mode & 0o777) == 0o700
+    assert ((cache_tmp / "test").stat().st_mode & 0o777) == 0o700
+    assert ((cache_tmp / "test" / "abc.pickle").stat().st_mode & 0o777) == 0o600
+
+
+def test_cache_ignores_writable_entries(cache_tmp: Path) -> None:
+    cache.store("test", "abc", 42)
+    entry = cache_tmp / "test" / "abc.pickle"
+    entry.chmod(0o666)
+    assert cache.load("test", "abc") is None
+    entry.chmod(0o600)
+    assert cache.load("test", "abc") == 42
+    # i.e. planted by another user in a shared directory
+    (cache_tmp / "test").chmod(0o777)
+    assert cache.load("test", "abc") is None
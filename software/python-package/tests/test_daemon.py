@@ -0,0 +1,140 @@
+import json
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from collections.abc import Generator
+from pathlib import Path
+
+import click
+import pytest
+from shepherd_sheep import daemon
+from shepherd_sheep.daemon import SheepDaemon
+from shepherd_sheep.daemon import forward_to_daemon
+from shepherd_sheep.logger import log
+
+
+@click.group(context_settings={"obj": {}})
+@click.pass_context
+def cli_mock(ctx: click.Context) -> None:
+    assert ctx.obj.get("in_daemon")
+
+
+@cli_mock.command()
+@click.argument("code", type=click.INT, default=0)
+def run(code: int) -> None:
+    log.info("running in %s", Path.cwd().name)
+    if code:
+        raise click.exceptions.Exit(code)
+
+
+@cli_mock.command()
+def fix() -> None:
+    raise RuntimeError("broken")
+
+
+@cli_mock.command()
+def blink() -> None:
+    # stands in for a measurement that only ends when stopped
+    log.info("blinking")
+    try:
+        while True:
+            time.sleep(0.01)
+    finally:
+        log.info("stopped blinking")
+
+
+class _Collector(logging.Handler):
+    def __init__(self) -> None:
+        super().__init__()
+        self.messages: list[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(record.getMessage())
+
+
+@pytest.fixture
+def sock_path(tmp_path: Path) -> Generator[Path, None, None]:
+    path = tmp_path / "sheep.sock"
+    with SheepDaemon(cli_mock, path) as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield path
+        server.shutdown()
+        thread.join()
+    assert not path.exists()
+
+
+@pytest.fixture
+def collector() -> Generator[_Collector, None, None]:
+    handler = _Collector()
+    log.addHandler(handler)
+    yield handler
+    log.removeHandler(handler)
+
+
+def test_daemon_runs_command(
+    sock_path: Path, collector: _Collector, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.chdir(sock_path.parent)
+    assert forward_to_daemon(["run"], sock_path) == 0
+    # log of daemon is replayed by client (daemon runs in same process here)
+    assert collector.messages.count(f"running in {sock_path.parent.name}") == 2
+
+
+def test_daemon_returns_exit_code(sock_path: Path) -> None:
+    assert forward_to_daemon(["run", "3"], sock_path) == 3
+
+
+def test_daemon_survives_failing_command(sock_path: Path) -> None:
+    assert forward_to_daemon(["fix"], sock_path) == 1
+    assert forward_to_daemon(["run"], sock_path) == 0
+
+
+def test_client_sigterm_cancels_command(sock_path: Path, collector: _Collector) -> None:
+    handler_prev = signal.getsignal(signal.SIGTERM)
+    timer = threading.Timer(0.3, os.kill, args=(os.getpid(), signal.SIGTERM))
+    timer.start()
+    assert forward_to_daemon(["blink"], sock_path) == 1
+    assert "stopped blinking" in collector.messages
+    assert signal.getsignal(signal.SIGTERM) is handler_prev
+    assert forward_to_daemon(["run"], sock_path) == 0
+
+
+def test_client_disconnect_cancels_command(sock_path: Path, collector: _Collector) -> None:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(sock_path.as_posix())
+        request = {"version": daemon.__version__, "argv": ["blink"], "cwd": "/"}
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        # wait until command runs
+        assert b"blinking" in sock.makefile("rb").readline()
+    ts_end = time.time() + 5
+    while "stopped blinking" not in collector.messages:
+        assert time.time() < ts_end
+        time.sleep(0.05)
+    assert forward_to_daemon(["run"], sock_path) == 0
+
+
+def test_daemon_rejects_unknown_command(sock_path: Path) -> None:
+    assert forward_to_daemon(["usage"], sock_path) is None
+
+
+def test_daemon_rejects_other_version(sock_path: Path) -> None:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(sock_path.as_posix())
+        request = {"version": "0.0.0", "argv": ["run"], "cwd": "/"}
+        sock.sendall(json.dumps(request).encode() + b"\n")
+        reply = json.loads(sock.makefile("rb").readline())
+    assert "reject" in reply
+
+
+def test_client_without_daemon(tmp_path: Path) -> None:
+    assert forward_to_daemon(["run"], tmp_path / "missing.sock") is None
+
+
+def test_forwarded_commands_exist() -> None:
+    from shepherd_sheep.cli import cli  # noqa: PLC0415
+
+    assert daemon.forwarded_commands <= set(cli.commands)
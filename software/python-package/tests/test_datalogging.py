@@ -9,8 +9,11 @@ from shepherd_core import CalibrationCape
 from shepherd_core import CalibrationHarvester
 from shepherd_core import CalibrationSeries
 from shepherd_core import Reader as CoreReader
+from shepherd_core.data_models import SystemLogging
 from shepherd_sheep import Writer
 from shepherd_sheep.commons import SAMPLE_INTERVAL_NS
+from shepherd_sheep.logger import log
+from shepherd_sheep.loop_timing import LoopTiming
 from shepherd_sheep.shared_mem_iv_input import IVTrace
 
 
@@ -158,3 +161,146 @@ def test_reader_performance(data_h5: Path) -> None:
             read_durations.append(elapsed)
             past = time.time()
     assert np.mean(read_durations) < 0.05
+
+
+def test_summary_levels(data_h5: Path) -> None:
+    with h5py.File(data_h5, "r") as h5file:
+        voltage = h5file["data"]["voltage"][:]
+        current = h5file["data"]["current"][:]
+        summary = h5file["data_summary"]
+        level_ms = summary["1ms"]
+        assert level_ms["voltage"].shape == (voltage.size // 100, 3)
+        blocks = voltage.reshape(-1, 100)
+        assert np.array_equal(level_ms["voltage"][:, 0], blocks.min(axis=1))
+        assert np.array_equal(level_ms["voltage"][:, 1], blocks.max(axis=1))
+        assert np.allclose(level_ms["voltage"][:, 2], blocks.mean(axis=1))
+        assert np.array_equal(level_ms["time"][:], h5file["data"]["time"][::100])
+        assert level_ms["voltage"].attrs["gain"] == h5file["data"]["voltage"].attrs["gain"]
+        # higher levels are reduced from the level below
+        level_10s = summary["10s"]
+        assert level_10s.attrs["window_samples"] == 1_000_000
+        assert level_10s["current"].shape == (1, 3)
+        assert level_10s["current"][0, 0] == current.min()
+        assert level_10s["current"][0, 1] == current.max()
+        assert level_10s["current"][0, 2] == pytest.approx(current.mean())
+        assert summary["100ms"]["time"].shape == (100,)
+
+
+def test_summary_carry_over(tmp_path: Path) -> None:
+    path = tmp_path / "carry.h5"
+    voltage = np.arange(10_050, dtype="u4")
+    with Writer(path, cal_data=CalibrationHarvester(), force_overwrite=True) as store:
+        # segments that don't align with windows
+        for start, end in ((0, 150), (150, 10_000), (10_000, 10_050)):
+            store.write_iv_buffer(
+                IVTrace(voltage[start:end], voltage[start:end], start * SAMPLE_INTERVAL_NS)
+            )
+    with h5py.File(path, "r") as h5file:
+        level_ms = h5file["data_summary"]["1ms"]
+        assert level_ms["voltage"].shape == (100, 3)  # incomplete window is dropped
+        assert np.array_equal(level_ms["voltage"][:, 0], np.arange(0, 10_000, 100))
+        assert np.array_equal(level_ms["time"][:], np.arange(0, 10_000, 100) * SAMPLE_INTERVAL_NS)
+        assert h5file["data_summary"]["100ms"]["voltage"][0, 1] == 9_999
+
+
+def test_summary_reused_buffer(tmp_path: Path) -> None:
+    path = tmp_path / "reused.h5"
+    samples_n = 20_000
+    # one array for all segments, like traces from a pool
+    timestamps = np.empty(samples_n, dtype="u8")
+    voltage = np.ones(samples_n, dtype="u4")
+    with Writer(path, cal_data=CalibrationHarvester(), force_overwrite=True) as store:
+        for index in range(3):
+            timestamps[:] = (np.arange(samples_n) + index * samples_n) * SAMPLE_INTERVAL_NS
+            store.write_iv_buffer(IVTrace(voltage, voltage, timestamps))
+    with h5py.File(path, "r") as h5file:
+        level_ms = h5file["data_summary"]["1ms"]
+        assert np.array_equal(
+            level_ms["time"][:], np.arange(0, 3 * samples_n, 100) * SAMPLE_INTERVAL_NS
+        )
+
+
+def test_summary_disabled(tmp_path: Path, data_buffer: IVTrace) -> None:
+    path = tmp_path / "plain.h5"
+    with Writer(path, cal_data=CalibrationHarvester(), summarize=False) as store:
+        store.write_iv_buffer(data_buffer)
+    with h5py.File(path, "r") as h5file:
+        assert "data_summary" not in h5file
+
+
+def test_energy_statistics(data_h5: Path) -> None:
+    with CoreReader(data_h5, verbose=False) as reader:
+        energy_J = reader.energy()
+        cal = reader.get_calibration_data()
+        current_A = cal.current.raw_to_si(reader.ds_current[:])
+        voltage_V = cal.voltage.raw_to_si(reader.ds_voltage[:])
+    with h5py.File(data_h5, "r") as h5file:
+        grp = h5file["energy"]
+        # reader derives sample-interval from timestamps -> tiny deviation
+        assert grp.attrs["energy_J"] == pytest.approx(energy_J, rel=1e-5)
+        assert grp.attrs["charge_C"] == pytest.approx(current_A.sum() * 1e-5)
+        assert grp.attrs["duration_s"] == pytest.approx(10)
+        assert grp.attrs["power_max_W"] == pytest.approx((voltage_V * current_A).max())
+        values = grp["values"][:]
+        assert values.shape == (100, 5)  # one row per segment
+        assert values[:, 0].sum() == pytest.approx(grp.attrs["energy_J"])
+        assert values[0, 3] == pytest.approx((voltage_V * current_A)[:10_000].mean())
+        assert grp["time"][1] == 10_000 * SAMPLE_INTERVAL_NS
+
+
+def test_swmr_live_reading(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("shepherd_sheep.h5_writer.SWMR_FLUSH_S", 0)
+    path = tmp_path / "live.h5"
+    timing = LoopTiming()
+    timing.add("write", 0)
+    with Writer(path, cal_data=CalibrationHarvester(), swmr=True) as store:
+        store.start_swmr()
+        for i in range(3):
+            store.write_iv_buffer(
+                IVTrace(random_data(10_000), random_data(10_000), i * 10_000 * SAMPLE_INTERVAL_NS)
+            )
+        with h5py.File(path, "r", libver="latest", swmr=True) as live:
+            assert live["index"]["data"].shape[0] == 3
+            assert live["data"]["time"][29_999] == 29_999 * SAMPLE_INTERVAL_NS
+            store.write_iv_buffer(
+                IVTrace(random_data(10_000), random_data(10_000), 3 * 10_000 * SAMPLE_INTERVAL_NS)
+            )
+            live["index"]["data"].refresh()
+            assert live["index"]["data"].shape[0] == 4
+        # metadata waits for end of SWMR-mode
+        store.store_timing(timing)
+        assert "timing" not in store.h5file
+    with h5py.File(path, "r") as h5file:
+        assert h5file["data"]["time"].shape[0] == 40_000
+        assert "write" in h5file["timing"]
+        assert h5file["energy"].attrs["duration_s"] == pytest.approx(0.4)
+
+
+def test_swmr_monitor_live_reading(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr("shepherd_sheep.h5_writer.SWMR_FLUSH_S", 0)
+    path = tmp_path / "live_monitor.h5"
+    sys_logging = SystemLogging(kernel=False, time_sync=False, sys_util=False, sheep=True)
+    with Writer(path, cal_data=CalibrationHarvester(), swmr=True) as store:
+        store.start_monitors(sys=sys_logging)
+        store.start_swmr()
+        for i in range(3):
+            log.info("live message %d", i)
+        time.sleep(1)
+        store.write_iv_buffer(IVTrace(random_data(10_000), random_data(10_000), 10**9))
+        with h5py.File(path, "r", libver="latest", swmr=True) as live:
+            # datasets grow exactly -> no pre-grown rows of zeros
+            assert live["data"]["time"].shape[0] == 10_000
+            ds_time = live["sheep"]["time"]
+            assert ds_time.shape[0] >= 3
+            assert np.all(ds_time[:] > 0)
+            assert live["sheep"]["message"].shape[0] == ds_time.shape[0]
+            for level in live["data_summary"].values():
+                assert np.all(level["time"][:] > 0)
+
+
+def test_swmr_needs_format(tmp_path: Path) -> None:
+    with (
+        Writer(tmp_path / "plain.h5", cal_data=CalibrationHarvester()) as store,
+        pytest.raises(ValueError, match="SWMR"),
+    ):
+        store.start_swmr()
@@ -135,3 +135,12 @@ def test_read_calibration(
     cal_restored = eeprom_with_calibration.read_calibration()
     for component in ["harvester", "emulator"]:
         assert cal_restored[component].get_hash() == cal_cape[component].get_hash()
+
+
+@pytest.mark.eeprom_write
+@pytest.mark.hardware
+def test_fingerprint_follows_content(eeprom_retained: EEPROM, cape_data: CapeData) -> None:
+    fingerprint = eeprom_retained.fingerprint()
+    assert eeprom_retained.fingerprint() == fingerprint
+    eeprom_retained["version"] = "1234"
+    assert eeprom_retained.fingerprint() != fingerprint
@@ -0,0 +1,71 @@
+from pathlib import Path
+
+import h5py
+import numpy as np
+from shepherd_core import CalibrationHarvester
+from shepherd_sheep import Writer
+from shepherd_sheep.gpio_filter import GpioFilter
+from shepherd_sheep.shared_mem_gpio_output import GPIOTrace
+from shepherd_sheep.trace_pool import TracePool
+
+
+def make_trace(timestamps: list[int], bitmasks: list[int]) -> GPIOTrace:
+    return GPIOTrace(np.array(timestamps, dtype=np.uint64), np.array(bitmasks, dtype=np.uint16))
+
+
+def test_filter_removes_duplicates_after_mask() -> None:
+    gpio_filter = GpioFilter(mask=0b0011)
+    # bit 2 is masked -> 5 looks like 1
+    data = gpio_filter.apply(make_trace([0, 1, 2, 3, 4, 5], [1, 5, 1, 3, 3, 0]))
+    assert data.timestamps_ns.tolist() == [0, 3, 5]
+    assert data.bitmasks.tolist() == [1, 3, 0]
+    # state carries over to next trace
+    data = gpio_filter.apply(make_trace([6, 7], [0, 2]))
+    assert data.timestamps_ns.tolist() == [7]
+    assert gpio_filter.samples_n == 8
+    assert gpio_filter.duplicates_n == 4
+    assert gpio_filter.glitches_n == 0
+
+
+def test_filter_removes_glitches() -> None:
+    gpio_filter = GpioFilter(glitch_ns=100)
+    # 5-ns-pulse at 1000 vanishes, 500-ns-pulse at 2000 stays
+    data = gpio_filter.apply(
+        make_trace([0, 1000, 1005, 2000, 2500, 3000], [0, 1, 0, 1, 0, 1]),
+    )
+    assert data.timestamps_ns.tolist() == [0, 2000, 2500, 3000]
+    assert data.bitmasks.tolist() == [0, 1, 0, 1]
+    assert gpio_filter.glitches_n == 1
+    assert gpio_filter.duplicates_n == 1
+    assert "2 of 6" in gpio_filter.summary()
+
+
+def test_filtered_trace_returns_to_pool() -> None:
+    pool = TracePool(GPIOTrace, {"timestamps_ns": np.uint64, "bitmasks": np.uint16}, capacity=8)
+    trace = pool.acquire(4)
+    trace.timestamps_ns[:] = [0, 1, 2, 3]
+    trace.bitmasks[:] = [1, 1, 1, 1]
+    gpio_filter = GpioFilter()
+    assert len(gpio_filter.apply(trace)) == 1
+    assert len(gpio_filter.apply(pool.acquire(0))) == 0
+    allocations = pool.allocations
+    pool.release(trace)
+    assert pool.acquire(8) is trace
+    assert pool.allocations == allocations
+
+
+def test_filter_stored(tmp_path: Path) -> None:
+    path = tmp_path / "filtered.h5"
+    gpio_filter = GpioFilter(mask=0x3FF, glitch_ns=50)
+    with Writer(path, cal_data=CalibrationHarvester()) as store:
+        store.write_gpio_buffer(gpio_filter.apply(make_trace([0, 10, 20], [1, 1, 2])))
+        store.store_gpio_filter(gpio_filter)
+    with h5py.File(path, "r") as h5file:
+        # state 1 lasted only 20 ns -> glitch
+        assert h5file["gpio"]["time"][:].tolist() == [20]
+        attrs = h5file["gpio"]["filter"].attrs
+        assert attrs["mask"] == 0x3FF
+        assert attrs["glitch_ns"] == 50
+        assert attrs["samples_n"] == 3
+        assert attrs["duplicates_n"] == 1
+        assert attrs["glitches_n"] == 1
@@ -0,0 +1,59 @@
+from pathlib import Path
+
+import h5py
+import numpy as np
+import pytest
+from shepherd_core import CalibrationHarvester
+from shepherd_sheep import Writer
+from shepherd_sheep.commons import GPIO_LOG_BIT_POSITIONS
+from shepherd_sheep.shared_mem_gpio_output import GPIOTrace
+
+
+def reference_edges(bitmasks: np.ndarray, timestamps: np.ndarray, pin: int) -> tuple[list, list]:
+    states = (bitmasks >> pin) & 1
+    steps = np.diff(states.astype(np.int8))
+    return (
+        timestamps[1:][steps > 0].tolist(),
+        timestamps[1:][steps < 0].tolist(),
+    )
+
+
+@pytest.fixture
+def bitmasks() -> np.ndarray:
+    rng = np.random.default_rng(42)
+    # sparse toggling of single pins, like PRU1 would log it
+    toggles = 1 << rng.integers(0, 10, size=30_000)
+    return np.bitwise_xor.accumulate(toggles.astype(np.uint16)) ^ np.uint16(0b10)
+
+
+def test_edges_match_raw_stream(tmp_path: Path, bitmasks: np.ndarray) -> None:
+    path = tmp_path / "gpio.h5"
+    timestamps = np.arange(bitmasks.size, dtype=np.uint64) * 1_000 + 10**9
+    with Writer(path, cal_data=CalibrationHarvester()) as store:
+        # split unevenly -> edges across chunk-borders
+        for start, end in ((0, 7), (7, 12_345), (12_345, bitmasks.size)):
+            store.write_gpio_buffer(GPIOTrace(timestamps[start:end], bitmasks[start:end]))
+    with h5py.File(path, "r") as h5file:
+        grp_edges = h5file["gpio"]["edges"]
+        counts = grp_edges["count"][:]
+        for row, (pin, info) in enumerate(GPIO_LOG_BIT_POSITIONS.items()):
+            rising, falling = reference_edges(bitmasks, timestamps, pin)
+            assert grp_edges[info["name"]].attrs["bit"] == pin
+            assert grp_edges[info["name"]]["rising"][:].tolist() == rising
+            assert grp_edges[info["name"]]["falling"][:].tolist() == falling
+            assert counts[row].tolist() == [len(rising), len(falling)]
+        # raw stream stays untouched
+        assert h5file["gpio"]["value"][:].tolist() == bitmasks.tolist()
+
+
+def test_edges_initial_state(tmp_path: Path) -> None:
+    path = tmp_path / "gpio.h5"
+    with Writer(path, cal_data=CalibrationHarvester()) as store:
+        timestamps = np.array([10, 20, 30], dtype=np.uint64)
+        # pin 1 starts high -> no edge, falls at 30
+        store.write_gpio_buffer(GPIOTrace(timestamps, np.array([2, 3, 1], dtype=np.uint16)))
+    with h5py.File(path, "r") as h5file:
+        grp_edges = h5file["gpio"]["edges"]
+        assert grp_edges["tgt_gpio0"]["rising"][:].tolist() == [20]
+        assert grp_edges["tgt_gpio1"]["rising"].shape == (0,)
+        assert grp_edges["tgt_gpio1"]["falling"][:].tolist() == [30]
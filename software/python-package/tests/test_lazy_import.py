@@ -0,0 +1,50 @@
+import subprocess
+import sys
+
+import pytest
+from shepherd_sheep.lazy_import import LazyModule
+from shepherd_sheep.lazy_import import lazy_module
+
+
+def test_lazy_module_returns_loaded() -> None:
+    assert lazy_module("sys") is sys
+
+
+def test_lazy_module_loads_on_access() -> None:
+    name = "xml.dom.minidom"
+    sys.modules.pop(name, None)
+    proxy = lazy_module(name)
+    assert isinstance(proxy, LazyModule)
+    assert name not in sys.modules
+    assert proxy.parseString("<a/>").documentElement.tagName == "a"
+    assert name in sys.modules
+
+
+def test_lazy_module_missing_attribute() -> None:
+    proxy = lazy_module("xml.dom.minidom")
+    with pytest.raises(AttributeError):
+        _ = proxy.not_existing
+
+
+def test_package_members_resolve() -> None:
+    import shepherd_sheep  # noqa: PLC0415
+
+    assert "run_task" in dir(shepherd_sheep)
+    assert callable(shepherd_sheep.run_task)
+    with pytest.raises(AttributeError):
+        _ = shepherd_sheep.not_existing
+
+
+@pytest.mark.parametrize("target", ["shepherd_sheep", "shepherd_sheep.cli"])
+def test_import_defers_core(target: str) -> None:
+    code = (
+        f"import sys, {target}; "
+        "print([m for m in ('shepherd_core', 'h5py', 'zerorpc') if m in sys.modules])"
+    )
+    ret = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert ret.stdout.strip() == "[]"
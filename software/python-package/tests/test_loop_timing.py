@@ -0,0 +1,57 @@
+from pathlib import Path
+from time import perf_counter_ns
+
+import h5py
+import pytest
+from shepherd_core import CalibrationHarvester
+from shepherd_sheep import Writer
+from shepherd_sheep.loop_timing import LatencyHistogram
+from shepherd_sheep.loop_timing import LoopTiming
+from shepherd_sheep.loop_timing import bucket_index
+from shepherd_sheep.loop_timing import bucket_value
+
+
+@pytest.mark.parametrize("value", [0, 1, 31, 32, 33, 1000, 123_456, 10**9, 2**39 + 7])
+def test_bucket_bounds(value: int) -> None:
+    index = bucket_index(value)
+    assert bucket_value(index) <= value < bucket_value(index + 1)
+    # resolution is relative
+    assert value - bucket_value(index) <= value / 32
+
+
+def test_histogram_stats() -> None:
+    hist = LatencyHistogram()
+    for value in range(1, 1001):
+        hist.record(value * 1000)
+    assert hist.count == 1000
+    assert hist.min_ns == 1000
+    assert hist.max_ns == 1_000_000
+    assert hist.mean_ns() == pytest.approx(500_500)
+    assert hist.percentile_ns(50) == pytest.approx(500_000, rel=0.04)
+    assert hist.percentile_ns(99) == pytest.approx(990_000, rel=0.04)
+    assert sum(_c for _, _c in hist.nonzero()) == 1000
+
+
+def test_loop_timing_chain() -> None:
+    timing = LoopTiming()
+    ts = perf_counter_ns()
+    for _ in range(10):
+        ts = timing.add("stage_a", ts)
+        ts = timing.add("stage_b", ts)
+    assert set(timing.stages) == {"stage_a", "stage_b"}
+    assert timing.stages["stage_a"].count == 10
+    assert "stage_b" in timing.summary()
+
+
+def test_store_timing(tmp_path: Path) -> None:
+    timing = LoopTiming()
+    ts = perf_counter_ns()
+    for _ in range(10):
+        ts = timing.add("write_iv", ts)
+    path = tmp_path / "timing.h5"
+    with Writer(path, cal_data=CalibrationHarvester(), force_overwrite=True) as writer:
+        writer.store_timing(timing)
+    with h5py.File(path, "r") as h5file:
+        ds = h5file["timing"]["write_iv"]
+        assert ds.attrs["count"] == 10
+        assert ds[:, 1].sum() == 10
@@ -0,0 +1,99 @@
+from datetime import timedelta
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+import pytest
+import yaml
+from shepherd_core import CalibrationCape
+from shepherd_core.data_models import VirtualSourceConfig
+from shepherd_core.data_models.task import EmulationTask
+from shepherd_sheep import Writer
+from shepherd_sheep.commons import SAMPLE_INTERVAL_NS
+from shepherd_sheep.looped_input import LoopedReader
+from shepherd_sheep.run_options import RunOptions
+from shepherd_sheep.shared_mem_iv_input import IVTrace
+from shepherd_sheep.synthetic_input import SyntheticReader
+from shepherd_sheep.task_pipeline import EmulationPrep
+
+
+@pytest.fixture
+def ramp_path(tmp_path: Path) -> Path:
+    # 5 segments, each 0.1 s long -> voltage tells position in input
+    path = tmp_path / "ramp.yaml"
+    cfg = {"pattern": "ramp", "duration_s": 0.5, "period_s": 0.5, "voltage_V": 5.0}
+    with path.open("w", encoding="utf-8") as fh:
+        yaml.safe_dump({"synthetic": cfg}, fh)
+    return path
+
+
+@pytest.fixture
+def data_h5(tmp_path: Path) -> Path:
+    store_path = tmp_path / "hrv_example.h5"
+    with Writer(store_path, cal_data=CalibrationCape().harvester, force_overwrite=True) as store:
+        for i in range(3):
+            len_ = 10_000
+            store.write_iv_buffer(
+                IVTrace(
+                    voltage=np.full(len_, 1000 * (i + 1), dtype="u4"),
+                    current=np.full(len_, 10, dtype="u4"),
+                    timestamp_ns=i * len_ * SAMPLE_INTERVAL_NS,
+                )
+            )
+    return store_path
+
+
+def segment_ids(reader: LoopedReader, end_n: int) -> list[int]:
+    return [int(dsv[0]) // 1_000_000 for _, dsv, _ in reader.read(end_n=end_n)]
+
+
+def test_loop_repeats_input(ramp_path: Path) -> None:
+    reader = LoopedReader(SyntheticReader(ramp_path), None, duration=timedelta(seconds=1.2))
+    assert segment_ids(reader, 100) == [0, 1, 2, 3, 4] * 2 + [0, 1]
+
+
+def test_loop_shift(ramp_path: Path) -> None:
+    reader = LoopedReader(
+        SyntheticReader(ramp_path), None, duration=timedelta(seconds=1.5), shift_s=0.2
+    )
+    assert segment_ids(reader, 100) == [0, 1, 2, 3, 4, 2, 3, 4, 0, 1, 4, 0, 1, 2, 3]
+
+
+def test_loop_streamed_matches_cached(data_h5: Path) -> None:
+    with EmulationPrep(EmulationTask(input_path=data_h5, virtual_source=_vsrc())) as prep:
+        cal_pru = prep.cal_pru
+        cached = LoopedReader(prep.reader, cal_pru, duration=timedelta(seconds=1))
+        streamed = LoopedReader(prep.reader, cal_pru, duration=timedelta(seconds=1), cache_nbytes=0)
+        assert cached._cache is not None
+        assert streamed._cache is None
+        segments_c = list(cached.read())
+        segments_s = list(streamed.read())
+    assert len(segments_c) == len(segments_s) == 10
+    for (_, dsv_c, dsc_c), (_, dsv_s, dsc_s) in zip(segments_c, segments_s, strict=True):
+        np.testing.assert_array_equal(dsv_c, dsv_s)
+        np.testing.assert_array_equal(dsc_c, dsc_s)
+    assert dsv_c.dtype == np.uint32
+
+
+def test_prep_looped(data_h5: Path) -> None:
+    task = EmulationTask(input_path=data_h5, virtual_source=_vsrc(), duration=60)
+    with EmulationPrep(task, options=RunOptions(loop_input=True)) as prep:
+        assert isinstance(prep.reader, LoopedReader)
+        assert prep.reader.runtime_s == 60
+        assert prep.cal_pru is None  # already scaled to PRU
+        assert prep.initial_fill.size == 2 * prep.buffer_segment_count * prep.samples_per_segment
+
+
+def test_loop_without_duration(ramp_path: Path, data_h5: Path) -> None:
+    reader = LoopedReader(SyntheticReader(ramp_path), None, duration=None)
+    assert segment_ids(reader, 7) == [0, 1, 2, 3, 4, 0, 1]
+    # repeats until stopped
+    assert len(list(islice(reader.read(), 1_000))) == 1_000
+    task = EmulationTask(input_path=data_h5, virtual_source=_vsrc(), duration=None)
+    with EmulationPrep(task, options=RunOptions(loop_input=True)) as prep:
+        assert prep.initial_fill.size == 2 * prep.buffer_segment_count * prep.samples_per_segment
+
+
+def _vsrc() -> VirtualSourceConfig:
+    here = Path(__file__).resolve().parent
+    return VirtualSourceConfig.from_file(here / "_test_config_virtsource.yaml")
@@ -0,0 +1,70 @@
+import logging
+from pathlib import Path
+
+import h5py
+import pytest
+from shepherd_sheep import logger
+from shepherd_sheep.h5_monitor_sysutil import SysUtilMonitor
+from shepherd_sheep.h5_writer import Writer
+from shepherd_sheep.memory_budget import MemoryBudget
+
+
+def test_budget_defaults() -> None:
+    budget = MemoryBudget()
+    assert budget.h5_cache_nbytes is None
+    assert budget.message_queue_n is None
+    assert budget.writer_increment_s == 100
+    assert budget.prefetch
+
+
+def test_budget_limited() -> None:
+    budget = MemoryBudget(64)
+    assert budget.limit_bytes == 64 * 2**20
+    assert budget.h5_cache_nbytes == 2**20
+    assert budget.message_queue_n == 4096
+    assert budget.writer_increment_s == 10
+    assert not budget.prefetch
+    assert budget.loop_cache_nbytes == 8 * 2**20
+    # current & prefetched looped input stay within a quarter of the budget
+    budget = MemoryBudget(256)
+    assert budget.prefetch
+    assert 2 * budget.loop_cache_nbytes <= budget.limit_bytes // 4
+    assert MemoryBudget(2**12).h5_cache_nbytes == 2**23
+    with pytest.raises(ValueError, match="budget"):
+        MemoryBudget(8)
+
+
+def test_writer_limits_chunk_cache(tmp_path: Path) -> None:
+    budget = MemoryBudget(64)
+    with Writer(tmp_path / "budget.h5", memory_budget=budget, force_overwrite=True) as writer:
+        assert writer.data_inc == 10 * writer.samplerate_sps
+        for name in ["data/voltage", "data/time", "gpio/value", "pru_util/time"]:
+            cache = writer.h5file[name].id.get_access_plist().get_chunk_cache()
+            assert cache[1] == budget.h5_cache_nbytes, name
+        assert writer.ds_voltage.id.get_access_plist().get_chunk_cache()[1] == 2**20
+
+
+def test_message_queue_limit() -> None:
+    queue = logger.get_message_queue()
+    while queue.qsize() > 0:
+        queue.get()
+    try:
+        logger.set_message_queue_limit(2)
+        for index in range(5):
+            logger.log.debug("budget-test %d", index)
+        assert queue.qsize() == 2
+    finally:
+        logger.set_message_queue_limit(None)
+        while queue.qsize() > 0:
+            queue.get()
+    assert logger.queue_handler.filter(logging.makeLogRecord({}))
+
+
+def test_sysutil_rss(tmp_path: Path) -> None:
+    with h5py.File(tmp_path / "sysutil.h5", "w") as h5file:
+        monitor = SysUtilMonitor(h5file.create_group("sys_util"), rss_limit=2**20)
+        assert monitor.check_rss() > 2**20
+        assert monitor.rss_warned
+        monitor.__exit__()
+        assert "rss" in h5file["sys_util"]
+        assert h5file["sys_util/rss"].attrs["limit"] == 2**20
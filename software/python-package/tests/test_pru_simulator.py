@@ -0,0 +1,156 @@
+import os
+import subprocess
+import sys
+import time
+from collections.abc import Generator
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+import pytest
+from shepherd_core.data_models import GpioTracing
+from shepherd_core.data_models import PowerTracing
+from shepherd_sheep import shared_memory
+from shepherd_sheep import sysfs_interface as sfs
+from shepherd_sheep.pru_simulator import PruSimulator
+from shepherd_sheep.pru_simulator import ring_slices
+from shepherd_sheep.shared_mem_iv_input import IVTrace
+from shepherd_sheep.shared_memory import SharedMemory
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "memfd_create"), reason="needs linux")
+
+
+@pytest.fixture
+def simulator(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Generator[Path, None, None]:
+    path = tmp_path / "shepherd"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "shepherd_sheep.pru_simulator", path.as_posix(), "--speed", "10"],
+    )
+    device = path / "memory/device"
+    ts_end = time.time() + 30
+    while not device.exists():
+        assert process.poll() is None
+        assert time.time() < ts_end
+        time.sleep(0.1)
+    monkeypatch.setattr(sfs, "sysfs_path", path)
+    monkeypatch.setattr(shared_memory, "mem_path", Path(device.read_text()))
+    yield path
+    process.terminate()
+    assert process.wait(timeout=10) == 0
+    assert not device.exists()
+
+
+def test_ring_slices() -> None:
+    assert ring_slices(2, 3, 10) == [(2, 0, 3)]
+    assert ring_slices(8, 3, 10) == [(8, 0, 2), (0, 2, 1)]
+
+
+def test_simulator_states(simulator: Path) -> None:
+    assert sfs.get_state() == "idle"
+    sfs.write_mode("emulator")
+    sfs.set_start()
+    sfs.wait_for_state("running", 3)
+    sfs.set_stop()
+    sfs.wait_for_state("idle", 3)
+    sfs.set_start(int(time.time()) + 1)
+    sfs.wait_for_state("armed", 3)
+    sfs.wait_for_state("running", 3)
+    sfs.write_mode("harvester", force=True)
+    assert sfs.get_mode() == "harvester"
+
+
+def test_simulator_data_path(simulator: Path) -> None:
+    sfs.write_mode("emulator")
+    shm = SharedMemory(None, None, start_timestamp_ns=time.time_ns())
+    with shm:
+        samples_n = shm.iv_inp.n_samples_per_chunk
+        for index in range(4):
+            voltage = np.arange(samples_n, dtype="u4") + index * samples_n
+            assert shm.iv_inp.write(IVTrace(voltage, 2 * voltage), cal=None)
+        sfs.set_start()
+        sfs.wait_for_state("running", 3)
+        ts_end = time.time() + 10
+        iv_out = None
+        while iv_out is None and time.time() < ts_end:
+            iv_out = shm.iv_out.read()
+            time.sleep(0.1)
+        assert iv_out is not None
+        # emulator-mode returns input
+        assert np.array_equal(iv_out.voltage, np.arange(len(iv_out), dtype="u4"))
+        assert np.array_equal(iv_out.current, 2 * iv_out.voltage)
+        assert np.all(np.diff(iv_out.timestamp_ns.astype("i8")) == 10_000)
+        time.sleep(0.5)
+        gpio = shm.gpio.read(force=True)
+        assert gpio is not None
+        assert len(gpio) > 0
+        util = shm.util.read(force=True)
+        assert util is not None
+        assert np.all(util.sample_count == 10_000)
+        sfs.set_stop()
+        shm.release(iv_out, gpio, util)
+
+
+def test_simulator_bulk_fill(simulator: Path) -> None:
+    sfs.write_mode("emulator")
+    shm = SharedMemory(None, None, start_timestamp_ns=time.time_ns())
+    with shm:
+        samples_n = 4 * shm.iv_inp.n_samples_per_chunk
+        iv_data = np.empty(2 * samples_n, dtype="u4")
+        iv_data[0::2] = np.arange(samples_n)
+        iv_data[1::2] = 3 * iv_data[0::2]
+        shm.iv_inp.write_bulk(iv_data)
+        assert shm.iv_inp.index_next == samples_n
+        with pytest.raises(BufferError):
+            shm.iv_inp.write_bulk(iv_data)
+        sfs.set_start()
+        sfs.wait_for_state("running", 3)
+        ts_end = time.time() + 10
+        iv_out = None
+        while iv_out is None and time.time() < ts_end:
+            iv_out = shm.iv_out.read()
+            time.sleep(0.1)
+        assert iv_out is not None
+        assert np.array_equal(iv_out.voltage, np.arange(len(iv_out), dtype="u4"))
+        assert np.array_equal(iv_out.current, 3 * iv_out.voltage)
+        sfs.set_stop()
+        shm.release(iv_out)
+
+
+def test_tracing_window_clips_chunks(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # window starts & ends within chunks (iv: 200 ms, gpio-edge every 10 ms)
+    delay = timedelta(milliseconds=333)
+    duration = timedelta(milliseconds=500)
+    ts_start_ns = 10**18
+    with PruSimulator(tmp_path / "sysfs", edge_interval_n=1000) as sim:
+        monkeypatch.setattr(sfs, "sysfs_path", sim.path)
+        monkeypatch.setattr(shared_memory, "mem_path", sim.mem_path)
+        shm = SharedMemory(
+            PowerTracing(delay=delay, duration=duration),
+            GpioTracing(delay=delay, duration=duration),
+            start_timestamp_ns=ts_start_ns,
+        )
+        with shm:
+            sim.mode = "harvester"
+            sim.start(ts_start_ns / 1e9)
+            iv_times = []
+            gpio_times = []
+            for _ in range(6):
+                sim.advance(shm.iv_out.N_SAMPLES_PER_CHUNK)
+                iv_out = shm.iv_out.read()
+                gpio = shm.gpio.read(force=True)
+                if iv_out is not None:
+                    assert len(iv_out.voltage) == len(iv_out.timestamp_ns)
+                    iv_times.append(iv_out.timestamp_ns.copy())
+                if gpio is not None:
+                    gpio_times.append(gpio.timestamps_ns.copy())
+                # clipped traces stay recyclable
+                shm.release(iv_out, gpio)
+            assert shm.iv_out.pool.allocations == shm.iv_out.pool.size
+    ts_window = ts_start_ns + 333 * 10**6
+    iv_times = np.concatenate(iv_times)
+    assert iv_times[0] == ts_window
+    assert iv_times[-1] == ts_window + 500 * 10**6
+    assert np.all(np.diff(iv_times.astype("i8")) == 10_000)
+    gpio_times = np.concatenate(gpio_times)
+    assert gpio_times[0] == ts_start_ns + 340 * 10**6
+    assert gpio_times[-1] == ts_start_ns + 830 * 10**6
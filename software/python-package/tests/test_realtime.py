@@ -0,0 +1,60 @@
+import gc
+import os
+import weakref
+
+import pytest
+from shepherd_sheep.realtime import RealtimeProfile
+from shepherd_sheep.run_options import RunOptions
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "sched_setaffinity"), reason="needs linux")
+
+
+def test_realtime_disabled_is_noop() -> None:
+    affinity = os.sched_getaffinity(0)
+    with RealtimeProfile(None, shared_mem=None) as profile:
+        assert not profile.gc_deferred
+        assert gc.isenabled()
+        profile.collect()
+    assert os.sched_getaffinity(0) == affinity
+
+
+def test_realtime_defers_and_restores_gc() -> None:
+    affinity = os.sched_getaffinity(0)
+    cpus = (min(affinity),)
+    options = RunOptions(realtime=True, realtime_cpus=cpus)
+    # steps without privileges (scheduler, mlock) only get skipped
+    with RealtimeProfile(options, shared_mem=None) as profile:
+        assert profile.gc_deferred
+        assert not gc.isenabled()
+        assert os.sched_getaffinity(0) == set(cpus)
+        profile.collect()
+    assert not profile.gc_deferred
+    assert gc.isenabled()
+    assert gc.get_freeze_count() == 0
+    assert os.sched_getaffinity(0) == affinity
+
+
+class _Node:
+    def __init__(self) -> None:
+        self.other: _Node = self
+
+
+def test_realtime_collects_older_generations() -> None:
+    with RealtimeProfile(RunOptions(realtime=True), shared_mem=None) as profile:
+        node = _Node()
+        ref = weakref.ref(node)
+        # survivor of two collections -> oldest generation
+        gc.collect(generation=1)
+        del node
+        profile.collect()
+        assert ref() is not None  # gen0 does not reach it
+        collections_gen2 = gc.get_stats()[2]["collections"]
+        for _ in range(profile.gc_every[1] - 1):
+            profile.collect()
+        assert gc.get_stats()[2]["collections"] == collections_gen2 + 1
+        assert ref() is None
+
+
+def test_realtime_invalid_policy() -> None:
+    with pytest.raises(ValueError, match="policy"):
+        RealtimeProfile(RunOptions(realtime=True, realtime_policy="idle"), shared_mem=None)
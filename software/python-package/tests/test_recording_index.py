@@ -0,0 +1,84 @@
+from pathlib import Path
+
+import h5py
+import numpy as np
+import pytest
+from shepherd_core import CalibrationHarvester
+from shepherd_sheep import Writer
+from shepherd_sheep.commons import SAMPLE_INTERVAL_NS
+from shepherd_sheep.h5_recorder_index import time_to_slice
+from shepherd_sheep.shared_mem_gpio_output import GPIOTrace
+from shepherd_sheep.shared_mem_iv_input import IVTrace
+
+SEGMENT_N = 10_000
+SEGMENT_NS = SEGMENT_N * SAMPLE_INTERVAL_NS
+TS_START = 1_700_000_000 * 10**9
+
+
+@pytest.fixture
+def data_h5(tmp_path: Path) -> Path:
+    path = tmp_path / "indexed.h5"
+    values = np.zeros(SEGMENT_N, dtype="u4")
+    with Writer(path, cal_data=CalibrationHarvester(), force_overwrite=True) as store:
+        for index in range(10):
+            if index == 4:
+                continue  # dropped segment -> gap in time
+            store.write_iv_buffer(IVTrace(values, values, TS_START + index * SEGMENT_NS))
+        for index in range(3):
+            timestamps = TS_START + np.arange(5, dtype="u8") * 10**8 + index * 10**9
+            store.write_gpio_buffer(GPIOTrace(timestamps, np.zeros(5, dtype="u2")))
+    return path
+
+
+def test_index_rows(data_h5: Path) -> None:
+    with h5py.File(data_h5, "r") as h5file:
+        index = h5file["index"]["data"][:]
+        assert index.shape == (9, 4)
+        assert index[4, 0] == TS_START + 5 * SEGMENT_NS
+        assert index[4, 1] == 4 * SEGMENT_N
+        assert np.all(index[:, 2] == SEGMENT_N)
+        assert h5file["index"]["gpio"].shape == (3, 4)
+        assert h5file["index"]["pru_util"].shape == (0, 4)
+
+
+def test_time_to_slice_iv(data_h5: Path) -> None:
+    with h5py.File(data_h5, "r") as h5file:
+        # within first segment
+        span = time_to_slice(
+            h5file, "data", TS_START + 100 * SAMPLE_INTERVAL_NS, TS_START + SEGMENT_NS
+        )
+        assert span == slice(100, SEGMENT_N)
+        # behind gap, position-arithmetic would be off by a segment
+        start = TS_START + 6 * SEGMENT_NS + 5 * SAMPLE_INTERVAL_NS
+        span = time_to_slice(h5file, "data", start, start + SAMPLE_INTERVAL_NS)
+        assert h5file["data"]["time"][span].tolist() == [start]
+        # range starting inside the gap
+        span = time_to_slice(h5file, "data", TS_START + 4 * SEGMENT_NS, TS_START + 6 * SEGMENT_NS)
+        assert span == slice(4 * SEGMENT_N, 5 * SEGMENT_N)
+        # out of range
+        assert time_to_slice(h5file, "data", 0, TS_START) == slice(0, 0)
+        assert time_to_slice(h5file, "data", 2 * TS_START, 3 * TS_START) == slice(
+            9 * SEGMENT_N, 9 * SEGMENT_N
+        )
+
+
+def test_time_to_slice_gpio(data_h5: Path) -> None:
+    with h5py.File(data_h5, "r") as h5file:
+        span = time_to_slice(h5file, "gpio", TS_START + 3 * 10**8, TS_START + 12 * 10**8)
+        assert span == slice(3, 7)
+        with pytest.raises(ValueError, match="index"):
+            time_to_slice(h5file, "uart", 0, 1)
+
+
+def test_partial_chunk_kept(tmp_path: Path) -> None:
+    path = tmp_path / "partial.h5"
+    with Writer(path, cal_data=CalibrationHarvester()) as store:
+        for index, length in enumerate([SEGMENT_N, SEGMENT_N, 4_000]):
+            values = np.ones(length, dtype="u4")
+            store.write_iv_buffer(IVTrace(values, values, TS_START + index * SEGMENT_NS))
+    with h5py.File(path, "r") as h5file:
+        assert h5file["data"]["time"].shape == (24_000,)
+        index = h5file["index"]["data"][:]
+        assert int(index[-1, 1] + index[-1, 2]) == h5file["data"]["time"].shape[0]
+        assert h5file["data_summary"]["1ms"]["time"].shape == (240,)
+        assert h5file["energy"].attrs["duration_s"] == pytest.approx(0.24)
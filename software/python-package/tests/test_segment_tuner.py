@@ -0,0 +1,78 @@
+from pathlib import Path
+
+import h5py
+import numpy as np
+import pytest
+from shepherd_core import CalibrationHarvester
+from shepherd_sheep import Writer
+from shepherd_sheep.segment_tuner import SegmentTuner
+from shepherd_sheep.segment_tuner import rechunk
+from shepherd_sheep.shared_mem_iv_input import SharedMemIVInput
+
+
+def serve(tuner: SegmentTuner, busy_share: dict[int, float], samples_n: int) -> None:
+    # busy-time as share of the period of each segment
+    while samples_n > 0 and not tuner.done:
+        size = tuner.segment_n
+        tuner.record(round(busy_share[size] * size * 10_000), size)
+        samples_n -= size
+
+
+def test_chunk_size_valid() -> None:
+    assert SharedMemIVInput.chunk_size_valid(10_000)
+    assert not SharedMemIVInput.chunk_size_valid(0)
+    assert not SharedMemIVInput.chunk_size_valid(SharedMemIVInput.N_SAMPLES // 2)
+
+
+def test_tuner_picks_most_headroom() -> None:
+    tuner = SegmentTuner(candidates=(5_000, 10_000, 20_000), trial_s=0.5)
+    assert tuner.segment_n == 5_000
+    serve(tuner, {5_000: 0.6, 10_000: 0.3, 20_000: 0.4}, 10**6)
+    assert tuner.done
+    assert tuner.segment_n == 10_000
+    assert tuner.headroom(10_000) == pytest.approx(0.7)
+    assert tuner.poll_s == pytest.approx(0.1 * 0.7 / 4)
+    assert [_r[0] for _r in tuner.results()] == [5_000, 10_000, 20_000]
+
+
+def test_tuner_finish_early() -> None:
+    tuner = SegmentTuner(candidates=(5_000, 10_000, 20_000), trial_s=0.5)
+    serve(tuner, {5_000: 0.6, 10_000: 0.3, 20_000: 0.4}, 50_000)
+    assert not tuner.done
+    tuner.finish()
+    assert tuner.segment_n == 5_000  # only one measured
+
+
+def test_tuner_drops_invalid_candidates() -> None:
+    with pytest.raises(ValueError, match="segment-size"):
+        SegmentTuner(candidates=(SharedMemIVInput.N_SAMPLES,))
+
+
+def test_rechunk_changing_size() -> None:
+    voltage = np.arange(100_000, dtype="u4")
+    segments = [
+        (voltage[_i : _i + 10_000], 2 * voltage[_i : _i + 10_000])
+        for _i in range(0, 100_000, 10_000)
+    ]
+    sizes = [5_000, 5_000, 5_000, 25_000]
+
+    pieces = []
+    for dsv, dsc in rechunk(segments, lambda: sizes[min(len(pieces), 3)]):
+        assert np.array_equal(dsv, voltage[sum(pieces) : sum(pieces) + dsv.size])
+        assert np.array_equal(dsc, 2 * dsv)
+        pieces.append(dsv.size)
+    # remainder comes last
+    assert pieces == [5_000, 5_000, 5_000, 25_000, 25_000, 25_000, 10_000]
+
+
+def test_store_segment_tuning(tmp_path: Path) -> None:
+    tuner = SegmentTuner(candidates=(5_000, 10_000), trial_s=0.5)
+    serve(tuner, {5_000: 0.5, 10_000: 0.2}, 10**6)
+    path = tmp_path / "tuning.h5"
+    with Writer(path, cal_data=CalibrationHarvester(), force_overwrite=True) as writer:
+        writer.store_segment_tuning(tuner)
+    with h5py.File(path, "r") as h5file:
+        ds = h5file["timing"]["segment_tuning"]
+        assert ds.shape == (2, 4)
+        assert ds.attrs["segment_samples"] == 10_000
+        assert ds.attrs["poll_s"] == pytest.approx(tuner.poll_s)
@@ -0,0 +1,89 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+import yaml
+from shepherd_core.data_models import EnergyDType
+from shepherd_core.data_models import VirtualSourceConfig
+from shepherd_core.data_models.task import EmulationTask
+from shepherd_sheep.synthetic_input import SyntheticInput
+from shepherd_sheep.synthetic_input import SyntheticReader
+from shepherd_sheep.task_pipeline import EmulationPrep
+
+
+def write_input(path: Path, **kwargs: object) -> Path:
+    with path.open("w", encoding="utf-8") as fh:
+        yaml.safe_dump({"synthetic": kwargs}, fh)
+    return path
+
+
+def test_pattern_constant() -> None:
+    voltage, current = SyntheticInput(pattern="constant", voltage_V=2.5).generate(0, 100)
+    assert voltage.dtype == np.uint32
+    assert np.all(voltage == 2_500_000)
+    assert np.all(current == 1_000_000)
+
+
+def test_pattern_square() -> None:
+    cfg = SyntheticInput(pattern="square", period_s=1e-3, duty=0.3, voltage_low_V=1.0)
+    voltage, _ = cfg.generate(95, 100)  # period is 100 samples
+    assert voltage[0] == 1_000_000
+    assert np.all(voltage[5:35] == 2_000_000)
+    assert np.all(voltage[35:100] == 1_000_000)
+
+
+def test_pattern_ramp() -> None:
+    cfg = SyntheticInput(pattern="ramp", period_s=1e-3, voltage_V=1.0)
+    voltage, _ = cfg.generate(0, 200)
+    assert voltage[0] == 0
+    assert voltage[50] == 500_000
+    assert np.all(np.diff(voltage[:100].astype("i8")) > 0)
+    np.testing.assert_array_equal(voltage[:100], voltage[100:])
+
+
+def test_pattern_trace() -> None:
+    cfg = SyntheticInput(pattern="trace", trace_voltage_V=[1, 2, 3], trace_current_A=[0, 0, 1e-3])
+    voltage, current = cfg.generate(2, 4)
+    np.testing.assert_array_equal(voltage, [3e6, 1e6, 2e6, 3e6])
+    np.testing.assert_array_equal(current, [1e6, 0, 0, 1e6])
+    with pytest.raises(ValueError, match="same length"):
+        SyntheticInput(pattern="trace", trace_voltage_V=[1], trace_current_A=[0, 0])
+
+
+def test_pattern_ivcurve() -> None:
+    cfg = SyntheticInput(pattern="ivcurve", voltage_V=3.0, current_A=0.01, window_samples=100)
+    voltage, current = cfg.generate(0, 200)
+    assert voltage[0] == 0
+    assert voltage[99] == 3_000_000
+    assert current[0] == 10_000_000
+    assert current[99] == 0
+    assert np.all(np.diff(current[:100].astype("i8")) <= 0)
+    np.testing.assert_array_equal(voltage[:100], voltage[100:])
+
+
+def test_reader_segments(tmp_path: Path) -> None:
+    path = write_input(tmp_path / "syn.yaml", pattern="constant", duration_s=1.0)
+    reader = SyntheticReader(path)
+    assert reader.runtime_s == 1.0
+    assert reader.get_datatype() == EnergyDType.ivsample
+    segments = list(reader.read(start_n=2))
+    assert len(segments) == 8
+    assert segments[0][1].size == reader.CHUNK_SAMPLES_N
+
+
+def test_reader_rejects_other_yaml(tmp_path: Path) -> None:
+    path = tmp_path / "other.yaml"
+    path.write_text("pattern: constant\n")
+    with pytest.raises(ValueError, match="synthetic"):
+        SyntheticReader(path)
+
+
+def test_prep_synthetic(tmp_path: Path) -> None:
+    path = write_input(tmp_path / "syn.yaml", pattern="ivcurve", duration_s=2.0)
+    here = Path(__file__).resolve().parent
+    src_cfg = VirtualSourceConfig.from_file(here / "_test_config_virtsource.yaml")
+    with EmulationPrep(EmulationTask(input_path=path, virtual_source=src_cfg)) as prep:
+        assert prep.cal_pru is None  # already scaled to PRU
+        assert isinstance(prep.reader, SyntheticReader)
+        assert prep.initial_fill.size == 2 * 20 * prep.samples_per_segment
+        assert prep.hrv_pru is not None
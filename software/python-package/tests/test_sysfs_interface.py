@@ -130,6 +130,13 @@ def test_dac_aux_voltage(value: float) -> None:
     assert abs(sysfs_interface.read_dac_aux_voltage(cal_emu) - value) <= msb_threshold
 
 
+@pytest.mark.parametrize("value", ["abc", [1.0], -0.1, "5.1", float("nan")])
+def test_dac_aux_voltage_invalid(value: object) -> None:
+    # rejected before anything gets written
+    with pytest.raises(sysfs_interface.SysfsInterfaceError):
+        sysfs_interface.write_dac_aux_voltage(value)
+
+
 @pytest.mark.parametrize("value", [0, 100, 16000])
 @pytest.mark.usefixtures("_shepherd_up")
 def test_dac_aux_voltage_raw(value: int) -> None:
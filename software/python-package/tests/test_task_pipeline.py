@@ -0,0 +1,125 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from shepherd_core import CalibrationCape
+from shepherd_core.data_models import VirtualSourceConfig
+from shepherd_core.data_models.task import EmulationTask
+from shepherd_core.data_models.task import HarvestTask
+from shepherd_sheep import Writer
+from shepherd_sheep.commons import SAMPLE_INTERVAL_NS
+from shepherd_sheep.shared_mem_iv_input import IVTrace
+from shepherd_sheep.task_pipeline import EmulationPrep
+from shepherd_sheep.task_pipeline import HarvestPrep
+from shepherd_sheep.task_pipeline import TaskPipeline
+from shepherd_sheep.task_pipeline import derive_output_path
+
+
+@pytest.fixture
+def data_h5(tmp_path: Path) -> Path:
+    store_path = tmp_path / "hrv_example.h5"
+    rng = np.random.default_rng()
+    with Writer(store_path, cal_data=CalibrationCape().harvester, force_overwrite=True) as store:
+        for i in range(20):
+            len_ = 10_000
+            store.write_iv_buffer(
+                IVTrace(
+                    voltage=rng.integers(low=0, high=2**18, size=len_, dtype="u4"),
+                    current=rng.integers(low=0, high=2**18, size=len_, dtype="u4"),
+                    timestamp_ns=i * len_ * SAMPLE_INTERVAL_NS,
+                )
+            )
+    return store_path
+
+
+@pytest.fixture
+def emu_task(data_h5: Path) -> EmulationTask:
+    here = Path(__file__).resolve().parent
+    src_cfg = VirtualSourceConfig.from_file(here / "_test_config_virtsource.yaml")
+    return EmulationTask(input_path=data_h5, virtual_source=src_cfg)
+
+
+def test_prep_emulation(emu_task: EmulationTask) -> None:
+    with EmulationPrep(emu_task) as prep:
+        assert prep.reader is not None
+        # file is shorter than buffer
+        iv_data = prep.pop_initial_fill()
+        assert iv_data.size == 2 * 20 * prep.samples_per_segment
+        assert iv_data.dtype == np.uint32
+        assert prep.initial_fill is None
+    assert prep.reader is None
+
+
+def test_prep_initial_fill_calibrated(emu_task: EmulationTask) -> None:
+    with EmulationPrep(emu_task, preload=False) as prep:
+        assert prep.initial_fill is None
+        iv_data = prep.load_initial_fill()
+        # same as calibrating segment by segment
+        for index, (_, dsv, dsc) in enumerate(prep.reader.read(is_raw=True)):
+            segment = iv_data[2 * index * dsv.size : 2 * (index + 1) * dsv.size]
+            assert np.array_equal(segment[0::2], prep.cal_pru.voltage.raw_to_si(dsv).astype("u4"))
+            assert np.array_equal(segment[1::2], prep.cal_pru.current.raw_to_si(dsc).astype("u4"))
+
+
+def test_prep_emulation_missing_input(emu_task: EmulationTask, tmp_path: Path) -> None:
+    emu_task = emu_task.model_copy(update={"input_path": tmp_path / "missing.h5"})
+    with pytest.raises(FileNotFoundError):
+        EmulationPrep(emu_task)
+
+
+def test_prep_harvest(tmp_path: Path) -> None:
+    with HarvestPrep(HarvestTask(output_path=tmp_path / "hrv.h5")) as prep:
+        assert prep.hrv_pru is not None
+
+
+def test_pipeline_prepares_tasks(emu_task: EmulationTask, tmp_path: Path) -> None:
+    tasks = [emu_task, None, HarvestTask(output_path=tmp_path / "hrv.h5"), emu_task]
+    types = []
+    with TaskPipeline(tasks) as pipeline:
+        for _task, prep in pipeline:
+            assert prep is not None
+            types.append(type(prep).__name__)
+            prep.__exit__()
+    assert types == ["EmulationPrep", "HarvestPrep", "EmulationPrep"]
+
+
+def test_pipeline_prefetches_when_idle(emu_task: EmulationTask, tmp_path: Path) -> None:
+    tasks = [emu_task, HarvestTask(output_path=tmp_path / "hrv.h5"), emu_task]
+    with TaskPipeline(tasks) as pipeline:
+        for index, (_task, prep) in enumerate(pipeline):
+            # nothing gets prepared while the task is busy
+            assert len(pipeline._futures) == 0
+            if index == 0:
+                pipeline.prefetch_next()
+                assert list(pipeline._futures) == [1]
+                pipeline.prefetch_next()
+                assert list(pipeline._futures) == [1]
+            prep.__exit__()
+
+
+def test_pipeline_skips_chained_input(emu_task: EmulationTask, data_h5: Path) -> None:
+    hrv_task = HarvestTask(output_path=data_h5)
+    # emulation would use output of harvest
+    with TaskPipeline([hrv_task, emu_task]) as pipeline:
+        preps = [prep for _, prep in pipeline]
+    assert preps[0] is not None
+    assert preps[1] is None
+
+
+def test_derive_output_path(tmp_path: Path) -> None:
+    path = derive_output_path(tmp_path, 1_700_000_000, "emu")
+    assert path.parent == tmp_path
+    assert path.name.startswith("emu_")
+    assert path.suffix == ".h5"
+    path_file = tmp_path / "file.h5"
+    assert derive_output_path(path_file, 1_700_000_000, "emu") == path_file
+
+
+def test_pipeline_without_prefetch(emu_task: EmulationTask, tmp_path: Path) -> None:
+    tasks = [emu_task, HarvestTask(output_path=tmp_path / "hrv.h5")]
+    with TaskPipeline(tasks, prefetch=False) as pipeline:
+        for _task, prep in pipeline:
+            assert prep is not None
+            # next task is only prepared when it gets handed out
+            assert len(pipeline._futures) == 0
+            prep.__exit__()
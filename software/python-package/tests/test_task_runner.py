@@ -0,0 +1,89 @@
+import time
+from datetime import datetime
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+import yaml
+from shepherd_core.data_models.task import HarvestTask
+from shepherd_sheep import cache
+from shepherd_sheep.task_runner import load_task_set
+
+
+@pytest.fixture(autouse=True)
+def cache_tmp(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    path = tmp_path / "cache"
+    monkeypatch.setattr(cache, "cache_path", path)
+    return path
+
+
+@pytest.fixture
+def task_path(tmp_path: Path) -> Path:
+    path = tmp_path / "task.yaml"
+    HarvestTask(output_path=tmp_path / "hrv.h5", duration=10).to_file(path)
+    return path
+
+
+def test_task_set_from_cache(task_path: Path, cache_tmp: Path) -> None:
+    content1 = load_task_set(task_path, "sheep0")
+    assert len(list(cache_tmp.glob("tasks/*.pickle"))) == 1
+    content2 = load_task_set(task_path, "sheep0")
+    assert content1 == content2
+    assert content1[0] is not content2[0]
+
+
+def test_task_set_key_includes_observer(task_path: Path, cache_tmp: Path) -> None:
+    load_task_set(task_path, "sheep0")
+    load_task_set(task_path, "sheep1")
+    assert len(list(cache_tmp.glob("tasks/*.pickle"))) == 2
+
+
+def test_task_set_key_ignores_created(task_path: Path, cache_tmp: Path) -> None:
+    data = yaml.safe_load(task_path.read_text())
+    for created in ("2026-01-01T10:00:00+01:00", "2026-01-02T10:00:00+01:00"):
+        data["created"] = created
+        task_path.write_text(yaml.safe_dump(data))
+        load_task_set(task_path, "sheep0")
+    assert len(list(cache_tmp.glob("tasks/*.pickle"))) == 1
+
+
+def test_task_set_recheck_start_time(task_path: Path) -> None:
+    data = yaml.safe_load(task_path.read_text())
+    time_start = datetime.now().astimezone() + timedelta(seconds=0.5)
+    data["parameters"]["time_start"] = time_start.isoformat()
+    task_path.write_text(yaml.safe_dump(data))
+    load_task_set(task_path, "sheep0")
+    time.sleep(1)
+    # start-time passed -> validation has to fail, even with cached task-set
+    with pytest.raises(ValueError):  # noqa: PT011
+        load_task_set(task_path, "sheep0")
+
+
+def test_task_set_recheck_referenced_files(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    task_path = tmp_path / "task.yaml"
+    task_path.write_text(
+        yaml.safe_dump(
+            {
+                "datatype": "FirmwareModTask",
+                "parameters": {
+                    "data": (tmp_path / "fw.hex").as_posix(),
+                    "data_type": "path_hex",
+                    "custom_id": 42,
+                    "firmware_file": (tmp_path / "fw_mod.hex").as_posix(),
+                },
+            }
+        )
+    )
+    fw_path = tmp_path / "fw.hex"
+    fw_path.write_text(":00000001FF\n")
+    load_task_set(task_path, "sheep0")
+    loads = []
+    monkeypatch.setattr(
+        "shepherd_sheep.task_runner.extract_tasks", lambda tasks: loads.append(1) or [tasks]
+    )
+    load_task_set(task_path, "sheep0")
+    assert loads == []
+    # changed firmware has to be validated again
+    fw_path.write_text(":00000001FF\n:00000001FF\n")
+    load_task_set(task_path, "sheep0")
+    assert loads == [1]
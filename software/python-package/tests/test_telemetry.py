@@ -0,0 +1,101 @@
+import socket
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from shepherd_core import CalibrationSeries
+from shepherd_sheep.shared_mem_gpio_output import GPIOTrace
+from shepherd_sheep.shared_mem_iv_input import IVTrace
+from shepherd_sheep.shared_mem_util_output import UtilTrace
+from shepherd_sheep.telemetry import FRAME_BODY
+from shepherd_sheep.telemetry import FRAME_HEADER
+from shepherd_sheep.telemetry import FRAME_MAGIC
+from shepherd_sheep.telemetry import TelemetryFrame
+from shepherd_sheep.telemetry import TelemetryPublisher
+
+
+@pytest.fixture
+def shared_mem() -> SimpleNamespace:
+    # stand-in with the buffer-states the publisher reads
+    def buffer(fill: float, overflows: int) -> SimpleNamespace:
+        return SimpleNamespace(fill_level=fill, overflows_n=overflows)
+
+    return SimpleNamespace(
+        iv_inp=buffer(0.9, 0),
+        iv_out=buffer(0.1, 1),
+        gpio=buffer(0.0, 0),
+        util=buffer(0.5, 2),
+        blind_spots_n=3,
+    )
+
+
+def receive_frame(client: socket.socket) -> TelemetryFrame:
+    header = client.recv(FRAME_HEADER.size, socket.MSG_WAITALL)
+    magic, _, length = FRAME_HEADER.unpack(header)
+    assert magic == FRAME_MAGIC
+    assert length == FRAME_BODY.size
+    return TelemetryFrame.unpack(client.recv(length, socket.MSG_WAITALL))
+
+
+def test_frame_roundtrip() -> None:
+    frame = TelemetryFrame(
+        timestamp_ns=123,
+        samples_n=10_000,
+        voltage_V=(1.0, 2.0, 3.0),
+        gpio_edges=tuple(range(16)),
+        fill_levels=(1, 2, 3, 4),
+        overflows=(5, 6, 7, 8, 9),
+    )
+    data = frame.pack()
+    assert len(data) == FRAME_HEADER.size + FRAME_BODY.size
+    assert TelemetryFrame.unpack(data[FRAME_HEADER.size :]) == frame
+
+
+def test_publisher_statistics(shared_mem: SimpleNamespace) -> None:
+    cal = CalibrationSeries()
+    voltage = np.full(10_000, 2_000_000, dtype=np.uint32)
+    voltage[5] = 1_000_000
+    current = np.full(10_000, 1_000, dtype=np.uint32)
+    # pin 0 toggles every sample, pin 3 once
+    bitmasks = np.array([0, 1, 0, 1, 8, 9], dtype=np.uint16)
+    util = UtilTrace(
+        timestamps_ns=np.arange(2, dtype=np.uint64),
+        pru0_tsample_mean=np.array([4_000, 6_000], dtype=np.uint32),
+        pru0_tsample_max=np.array([7_000, 9_500], dtype=np.uint32),
+        pru1_tsample_max=np.array([300, 200], dtype=np.uint32),
+        sample_count=np.array([10_000, 10_000], dtype=np.uint32),
+    )
+    with TelemetryPublisher(cal, port=0, interval_s=0) as publisher:
+        client = socket.create_connection(("127.0.0.1", publisher.port), timeout=2)
+        publisher.update(
+            IVTrace(voltage, current, 0),
+            GPIOTrace(np.arange(6, dtype=np.uint64), bitmasks),
+            util,
+            shared_mem,
+        )
+        frame = receive_frame(client)
+        # next chunk continues from last state of pins
+        publisher.update(
+            None, GPIOTrace(np.arange(2, dtype=np.uint64), bitmasks[:2]), None, shared_mem
+        )
+        frame_next = receive_frame(client)
+        client.close()
+    assert publisher.frames_n == 2
+
+    voltage_V = cal.voltage.raw_to_si(voltage)
+    assert frame.samples_n == 10_000
+    assert frame.voltage_V == pytest.approx(
+        (voltage_V.min(), voltage_V.mean(), voltage_V.max()), rel=1e-6
+    )
+    assert frame.power_mean_W == pytest.approx(
+        (voltage_V * cal.current.raw_to_si(current)).mean(), rel=1e-6
+    )
+    assert frame.gpio_samples_n == 6
+    assert frame.gpio_edges[:4] == (5, 0, 0, 1)
+    assert frame.pru0_tsample_mean_ns == pytest.approx(5_000)
+    assert frame.pru0_tsample_max_ns == 9_500
+    assert frame.fill_levels == (90, 10, 0, 50)
+    assert frame.overflows == (0, 1, 0, 2, 3)
+    # 9 -> 0 toggles pin 0 & 3, 0 -> 1 toggles pin 0
+    assert frame_next.samples_n == 0
+    assert frame_next.gpio_edges[:4] == (2, 0, 0, 1)
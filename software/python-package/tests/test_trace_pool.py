@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from shepherd_core import CalibrationSeries
+from shepherd_sheep.shared_mem_iv_input import IVTrace
+from shepherd_sheep.shared_mem_iv_input import SharedMemIVInput
+from shepherd_sheep.trace_pool import TracePool
+
+
+@pytest.fixture
+def pool() -> TracePool[IVTrace]:
+    return TracePool(
+        IVTrace,
+        {"voltage": np.uint32, "current": np.uint32, "timestamp_ns": np.uint64},
+        capacity=100,
+    )
+
+
+def test_pool_reuses_traces(pool: TracePool[IVTrace]) -> None:
+    trace1 = pool.acquire(100)
+    trace2 = pool.acquire(40)
+    assert len(trace1) == 100
+    assert len(trace2) == 40
+    assert trace1 is not trace2
+    pool.release(trace1)
+    pool.release(trace2)
+    trace3 = pool.acquire(10)
+    assert trace3 is trace2
+    assert len(trace3) == 10
+    assert pool.allocations == 2
+
+
+def test_pool_grows_without_release(pool: TracePool[IVTrace]) -> None:
+    traces = [pool.acquire(50) for _ in range(4)]
+    assert pool.allocations == 4
+    for trace in traces:
+        pool.release(trace)
+    # only the configured size is retained
+    pool.acquire(50)
+    pool.acquire(50)
+    pool.acquire(50)
+    assert pool.allocations == 5
+
+
+def test_pool_rejects_misuse(pool: TracePool[IVTrace]) -> None:
+    with pytest.raises(ValueError, match="capacity"):
+        pool.acquire(101)
+    trace = pool.acquire(10)
+    pool.release(trace)
+    with pytest.raises(ValueError, match="twice"):
+        pool.release(trace)
+    # foreign traces are ignored
+    pool.acquire(10)
+    pool.release(IVTrace(np.zeros(10, "u4"), np.zeros(10, "u4"), np.zeros(10, "u8")))
+    pool.release(None)
+    assert len(pool._free) == 1
+
+
+def test_raw_to_si_matches_core() -> None:
+    cal = CalibrationSeries().voltage
+    values = np.arange(1000, dtype="u4") * 200
+    buffer = SharedMemIVInput.__new__(SharedMemIVInput)
+    buffer._scratch = np.empty(1000)
+    np.testing.assert_array_equal(buffer._raw_to_si(values, cal), cal.raw_to_si(values))
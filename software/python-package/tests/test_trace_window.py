@@ -0,0 +1,15 @@
+import numpy as np
+from shepherd_sheep.trace_window import clip_to_window
+
+
+def test_clip_to_window() -> None:
+    timestamps = np.arange(10, dtype=np.uint64) * 10
+    assert clip_to_window(timestamps, ts_set=False, ts_start=None, ts_stop=None) == (0, 10)
+    # boundaries are inclusive
+    assert clip_to_window(timestamps, ts_set=True, ts_start=20, ts_stop=50) == (2, 6)
+    assert clip_to_window(timestamps, ts_set=True, ts_start=15, ts_stop=1_000) == (2, 10)
+    # chunk outside window -> empty range
+    start, stop = clip_to_window(timestamps, ts_set=True, ts_start=200, ts_stop=300)
+    assert start == stop
+    start, stop = clip_to_window(timestamps, ts_set=True, ts_start=0, ts_stop=0)
+    assert stop - start == 1
@@ -0,0 +1,113 @@
+from pathlib import Path
+
+import h5py
+import numpy as np
+from shepherd_core import CalibrationHarvester
+from shepherd_sheep import Writer
+from shepherd_sheep.commons import SAMPLES_PER_SYNC
+from shepherd_sheep.commons import SYNC_INTERVAL_NS
+from shepherd_sheep.shared_mem_util_output import UtilTrace
+from shepherd_sheep.util_analyzer import FLAG_COUNT
+from shepherd_sheep.util_analyzer import FLAG_MAX
+from shepherd_sheep.util_analyzer import FLAG_MEAN
+from shepherd_sheep.util_analyzer import HISTOGRAM_EDGES
+from shepherd_sheep.util_analyzer import UtilAnalyzer
+
+
+def make_trace(
+    start: int, tsample_max: list[int], sample_count: list[int] | None = None
+) -> UtilTrace:
+    length = len(tsample_max)
+    tsample_max = np.array(tsample_max, dtype=np.uint32)
+    if sample_count is None:
+        sample_count = [SAMPLES_PER_SYNC] * length
+    return UtilTrace(
+        timestamps_ns=(start + np.arange(length, dtype=np.uint64)) * SYNC_INTERVAL_NS,
+        pru0_tsample_mean=tsample_max / 2,
+        pru0_tsample_max=tsample_max,
+        pru1_tsample_max=np.zeros(length, dtype=np.uint32),
+        sample_count=np.array(sample_count, dtype=np.uint32),
+    )
+
+
+def test_events_merged_across_chunks() -> None:
+    analyzer = UtilAnalyzer()
+    analyzer.update(make_trace(0, [5_000, 10_000, 12_000]))
+    # still open -> nothing reported yet
+    assert analyzer.pop_events().shape[0] == 0
+    analyzer.update(make_trace(3, [11_000, 5_000, 10_500, 5_000]))
+    events = analyzer.pop_events()
+    assert events.shape == (2, 8)
+    assert events[0, :4].tolist() == [
+        1 * SYNC_INTERVAL_NS,
+        4 * SYNC_INTERVAL_NS,
+        3,
+        FLAG_MAX,
+    ]
+    assert events[0, 5] == 12_000
+    assert events[1, :3].tolist() == [5 * SYNC_INTERVAL_NS, 6 * SYNC_INTERVAL_NS, 1]
+    assert analyzer.windows_n == 7
+    assert analyzer.windows_crit_n == 4
+
+
+def test_every_event_reported() -> None:
+    analyzer = UtilAnalyzer()
+    # 50 separate overruns, no silencing after a few
+    analyzer.update(make_trace(0, [20_000, 1_000] * 50))
+    assert analyzer.pop_events().shape[0] == 50
+    # gap in timestamps splits events
+    analyzer.update(make_trace(200, [20_000]))
+    analyzer.update(make_trace(202, [20_000]))
+    analyzer.close()
+    assert analyzer.pop_events()[:, 2].tolist() == [1, 1]
+    assert analyzer.events_n == 52
+
+
+def test_sample_count_deviation() -> None:
+    analyzer = UtilAnalyzer()
+    analyzer.update(
+        make_trace(
+            0,
+            [19_600, 1_000, 1_000],
+            sample_count=[SAMPLES_PER_SYNC, SAMPLES_PER_SYNC - 20, SAMPLES_PER_SYNC + 1],
+        )
+    )
+    analyzer.close()
+    events = analyzer.pop_events()
+    # mean of first window is 98 %
+    assert events[:, 2].tolist() == [2]
+    assert events[0, 3] == FLAG_MEAN | FLAG_MAX | FLAG_COUNT
+    assert events[0, 6:].tolist() == [SAMPLES_PER_SYNC - 20, SAMPLES_PER_SYNC]
+
+
+def test_histogram() -> None:
+    analyzer = UtilAnalyzer()
+    analyzer.update(make_trace(0, [0, 999, 1_000, 9_999, 30_000]))
+    # bins of 5 % = 500 ns
+    assert analyzer.histogram[:, 1].sum() == 5
+    assert analyzer.histogram[[0, 1, 2, 19, 20], 1].tolist() == [1, 1, 1, 1, 1]
+    assert analyzer.histogram[[0, 1, 9, 20], 0].tolist() == [2, 1, 1, 1]
+    assert "1 of 5 windows critical" in analyzer.summary()
+
+
+def test_analysis_stored(tmp_path: Path) -> None:
+    path = tmp_path / "util.h5"
+    analyzer = UtilAnalyzer()
+    with Writer(path, cal_data=CalibrationHarvester()) as store:
+        data = make_trace(0, [20_000, 20_000, 1_000])
+        analyzer.update(data)
+        store.write_util_buffer(data)
+        store.write_util_analysis(analyzer)
+        analyzer.update(make_trace(3, [20_000]))
+        analyzer.close()
+        store.write_util_analysis(analyzer)
+    with h5py.File(path, "r") as h5file:
+        events = h5file["pru_util"]["events"][:]
+        assert events[:, :3].tolist() == [
+            [0, 2 * SYNC_INTERVAL_NS, 2],
+            [3 * SYNC_INTERVAL_NS, 4 * SYNC_INTERVAL_NS, 1],
+        ]
+        histogram = h5file["pru_util"]["histogram"]
+        assert histogram.shape == (len(HISTOGRAM_EDGES), 2)
+        assert histogram[:, 1].sum() == 4
+        assert histogram[-1, 1] == 3
@@ -0,0 +1,85 @@
+from pathlib import Path
+
+import h5py
+import numpy as np
+import pytest
+from click.testing import CliRunner
+from shepherd_core import CalibrationHarvester
+from shepherd_sheep import Writer
+from shepherd_sheep.cli import cli
+from shepherd_sheep.commons import SAMPLE_INTERVAL_NS
+from shepherd_sheep.h5_verify import verify_file
+from shepherd_sheep.shared_mem_gpio_output import GPIOTrace
+from shepherd_sheep.shared_mem_iv_input import IVTrace
+from shepherd_sheep.shared_mem_util_output import UtilTrace
+
+SEGMENT_N = 10_000
+SEGMENT_NS = SEGMENT_N * SAMPLE_INTERVAL_NS
+
+
+@pytest.fixture
+def data_h5(tmp_path: Path) -> Path:
+    path = tmp_path / "recording.h5"
+    rng = np.random.default_rng()
+    with Writer(path, cal_data=CalibrationHarvester(), force_overwrite=True) as store:
+        for index in range(250):
+            values = rng.integers(0, 2**18, size=SEGMENT_N, dtype="u4")
+            store.write_iv_buffer(IVTrace(values, values, index * SEGMENT_NS))
+        timestamps = np.arange(10, dtype="u8") * 10**8
+        store.write_gpio_buffer(GPIOTrace(timestamps, np.arange(10, dtype="u2")))
+        store.write_util_buffer(
+            UtilTrace(
+                timestamps,
+                np.full(10, 3000.7),
+                np.full(10, 4000, dtype="u4"),
+                np.full(10, 500, dtype="u4"),
+                np.full(10, 10_000, dtype="u4"),
+            )
+        )
+    return path
+
+
+def test_verify_intact(data_h5: Path) -> None:
+    assert verify_file(data_h5, workers=2) == []
+
+
+def test_verify_reports_damaged_range(data_h5: Path) -> None:
+    with h5py.File(data_h5, "r+") as h5file:
+        h5file["data"]["current"][123 * SEGMENT_N + 17] += 1
+        h5file["gpio"]["value"][3] = 0xFFFF
+    damaged = verify_file(data_h5, workers=2)
+    assert damaged == [
+        ("data", 123 * SEGMENT_NS, 124 * SEGMENT_NS),
+        ("gpio", 0, 9 * 10**8 + 1),
+    ]
+
+
+def test_verify_cli(data_h5: Path, cli_runner: CliRunner) -> None:
+    assert cli_runner.invoke(cli, ["verify", str(data_h5)]).exit_code == 0
+    with h5py.File(data_h5, "r+") as h5file:
+        h5file["pru_util"]["values"][0, 0] = 1
+    assert cli_runner.invoke(cli, ["verify", "-w", "1", str(data_h5)]).exit_code == 1
+
+
+def test_verify_reused_buffers(tmp_path: Path) -> None:
+    path = tmp_path / "reused.h5"
+    # like pooled traces: same arrays get refilled right after each write
+    values = np.empty(SEGMENT_N, dtype="u4")
+    with Writer(path, cal_data=CalibrationHarvester()) as store:
+        for index in range(20):
+            values[:] = index
+            store.write_iv_buffer(IVTrace(values, values, index * SEGMENT_NS))
+            values[:] = 0xFFFF
+    assert verify_file(path, workers=1) == []
+
+
+def test_verify_reports_truncated_data(data_h5: Path) -> None:
+    with h5py.File(data_h5, "r+") as h5file:
+        # last row now runs past the end, the one before points behind it
+        for name in ("time", "voltage", "current"):
+            h5file["data"][name].resize((248 * SEGMENT_N + 100,))
+    damaged = verify_file(data_h5, workers=1)
+    assert damaged == [
+        ("data", 248 * SEGMENT_NS, 249 * SEGMENT_NS),
+        ("data", 249 * SEGMENT_NS, 249 * SEGMENT_NS + 1),
+    ]
@@ -0,0 +1,64 @@
+"""Import-Time Regression-Check for Sheep-Program.
+
+Herd calls shepherd-sheep on every node, so startup-time of the CLI matters.
+This script imports the entry-points in a fresh interpreter with `-X importtime`,
+reports the most expensive modules and checks that heavy dependencies stay
+deferred (see shepherd_sheep/lazy_import.py).
+
+Shell on BBone:
+python3 profiler_import.py
+
+Reference (x86, py3.11):
+- shepherd_sheep.cli -> from 1.57 s to 0.1 s (without loading shepherd_core)
+
+"""
+
+import subprocess
+import sys
+
+# entry-point -> total import-time limit in ms (BeagleBone is ~10x slower than x86)
+targets: dict[str, float] = {
+    "shepherd_sheep": 3_000,
+    "shepherd_sheep.cli": 3_000,
+}
+# modules that must not be loaded by importing the entry-points
+deferred = ["shepherd_core", "h5py", "pydantic", "zerorpc", "gevent", "psutil", "serial"]
+top_n = 15
+
+
+def measure(target: str) -> list[tuple[str, int, int]]:
+    """Returns list of (module, self [us], cumulative [us]) in import-order."""
+    ret = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    results = []
+    for line in ret.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        values = line.removeprefix("import time:").split("|")
+        results.append((values[2].strip(), int(values[0]), int(values[1])))
+    return results
+
+
+if __name__ == "__main__":
+    failed = False
+    for target, limit_ms in targets.items():
+        results = measure(target)
+        total_ms = next(_r[2] for _r in results if _r[0] == target) / 1e3
+        print(f"\n{target}: {total_ms:.1f} ms total (limit {limit_ms:.0f} ms)")  # noqa: T201
+        print(f"  {'self [ms]':>10} {'cumul [ms]':>10}  module")  # noqa: T201
+        for name, self_us, cumul_us in sorted(results, key=lambda _r: _r[1])[-top_n:][::-1]:
+            print(f"  {self_us / 1e3:10.1f} {cumul_us / 1e3:10.1f}  {name}")  # noqa: T201
+
+        names = {_r[0] for _r in results}
+        loaded = [_d for _d in deferred if _d in names]
+        if loaded:
+            print(f"  -> REGRESSION: deferred modules got loaded: {loaded}")  # noqa: T201
+            failed = True
+        if total_ms > limit_ms:
+            print("  -> REGRESSION: import-time above limit")  # noqa: T201
+            failed = True
+    sys.exit(int(failed))
@@ -1,5 +1,6 @@
 import signal
 import sys
+import time
 from datetime import datetime
 from pathlib import Path
 from pathlib import PurePosixPath
@@ -19,6 +20,8 @@ from . import __version__
 from .herd import Herd
 from .logger import activate_verbosity
 from .logger import logger as log
+from .telemetry import TELEMETRY_PORT
+from .telemetry import TelemetryCollector
 
 # TODO:
 #  - click.command shorthelp can also just be the first sentence of docstring
@@ -472,6 +475,47 @@ def status(ctx: click.Context) -> None:
     ctx.exit(ret)
 
 
+@cli.command(short_help="Shows live-telemetry of sheep running with --telemetry-port")
+@click.option(
+    "--port",
+    "-p",
+    type=click.IntRange(1, 65535),
+    default=TELEMETRY_PORT,
+    help="TCP-port the sheep publish on",
+)
+@click.option(
+    "--duration",
+    "-d",
+    type=click.FLOAT,
+    default=None,
+    help="Seconds to listen, default is until ctrl+c",
+)
+@click.option(
+    "--interval",
+    "-i",
+    type=click.FloatRange(min=0.5),
+    default=5.0,
+    help="Seconds between printed overviews",
+)
+@click.pass_context
+def telemetry(ctx: click.Context, port: int, duration: float | None, interval: float) -> None:
+    """Collect live-telemetry of all sheep and report nodes that misbehave.
+
+    Exit-code is 1 if any node had an issue.
+    """
+    herd = ctx.obj["herd"]
+    failed = False
+    ts_end = time.time() + duration if duration is not None else None
+    with TelemetryCollector(herd.hostnames, port=port) as collector:
+        while ts_end is None or time.time() < ts_end:
+            time.sleep(interval if ts_end is None else max(min(interval, ts_end - time.time()), 0))
+            log.info("Telemetry:\n%s", collector.summary())
+            for name, issues in collector.problems().items():
+                failed = True
+                log.warning("[%s] %s", name, ", ".join(issues))
+    ctx.exit(int(failed))
+
+
 @cli.command(short_help="Stops any harvest/emulation or other processes blocking the sheep")
 @click.pass_context
 def stop(ctx: click.Context) -> None:
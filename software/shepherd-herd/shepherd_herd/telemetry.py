@@ -0,0 +1,263 @@
+"""Collector for the live-telemetry of sheep during a measurement.
+
+Each sheep started with `--telemetry-port` publishes one small binary frame
+per second (see telemetry.py of the sheep). The collector connects to all
+hosts of the herd, keeps the latest frame per node and points out nodes
+that misbehave (overflows, critical fill-levels or PRU-utilization, silence)
+while the experiment is still running.
+"""
+
+import errno
+import selectors
+import socket
+import struct
+import threading
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass
+from types import TracebackType
+
+from typing_extensions import Self
+
+from .logger import logger
+
+TELEMETRY_PORT: int = 51_451
+GPIO_PINS_N: int = 16
+# sample-interval of the PRU, real-time budget of one sample-loop
+SAMPLE_INTERVAL_NS: int = 10_000
+
+# NOTE: frame-format is duplicated in shepherd_sheep/telemetry.py -> keep in sync
+FRAME_MAGIC: bytes = b"SHTL"
+FRAME_VERSION: int = 1
+# magic, version, length of body
+FRAME_HEADER = struct.Struct("<4sBH")
+FRAME_BODY = struct.Struct(f"<QI3f3ffI{GPIO_PINS_N}IIfII4B5I")
+
+
+@dataclass
+class TelemetryFrame:
+    """Statistics of one interval, buffer-states at its end."""
+
+    timestamp_ns: int = 0
+    samples_n: int = 0
+    # min, mean, max
+    voltage_V: tuple[float, float, float] = (0.0, 0.0, 0.0)
+    current_A: tuple[float, float, float] = (0.0, 0.0, 0.0)
+    power_mean_W: float = 0.0
+    gpio_samples_n: int = 0
+    gpio_edges: tuple[int, ...] = (0,) * GPIO_PINS_N
+    util_n: int = 0
+    pru0_tsample_mean_ns: float = 0.0
+    pru0_tsample_max_ns: int = 0
+    pru1_tsample_max_ns: int = 0
+    # iv_inp, iv_out, gpio, util [%]
+    fill_levels: tuple[int, ...] = (0, 0, 0, 0)
+    # iv_inp, iv_out, gpio, util, blind spots of detector (all since start)
+    overflows: tuple[int, ...] = (0, 0, 0, 0, 0)
+
+    @classmethod
+    def unpack(cls, body: bytes) -> "TelemetryFrame":
+        values = FRAME_BODY.unpack(body)
+        return cls(
+            timestamp_ns=values[0],
+            samples_n=values[1],
+            voltage_V=values[2:5],
+            current_A=values[5:8],
+            power_mean_W=values[8],
+            gpio_samples_n=values[9],
+            gpio_edges=values[10 : 10 + GPIO_PINS_N],
+            util_n=values[10 + GPIO_PINS_N],
+            pru0_tsample_mean_ns=values[11 + GPIO_PINS_N],
+            pru0_tsample_max_ns=values[12 + GPIO_PINS_N],
+            pru1_tsample_max_ns=values[13 + GPIO_PINS_N],
+            fill_levels=values[14 + GPIO_PINS_N : 18 + GPIO_PINS_N],
+            overflows=values[18 + GPIO_PINS_N :],
+        )
+
+
+class TelemetryCollector:
+    """Receives frames of all sheep in a background-thread.
+
+    Nodes that are not (yet) publishing get retried every few seconds.
+
+    Args:
+        hosts: address -> name of node (i.e. Herd.hostnames)
+        port: TCP-port the sheep publish on
+    """
+
+    reconnect_s: float = 3.0
+    # pending connects get abandoned after this long
+    connect_timeout_s: float = 1.0
+    # without a frame for this long a node is reported as silent
+    silence_s: float = 5.0
+
+    def __init__(self, hosts: Mapping[str, str], port: int = TELEMETRY_PORT) -> None:
+        self.hosts: dict[str, str] = dict(hosts)
+        self.port = port
+        self.latest: dict[str, TelemetryFrame] = {}
+        self.received_at: dict[str, float] = {}
+        self.frames_n: dict[str, int] = dict.fromkeys(self.hosts.values(), 0)
+        self._overflows_seen: dict[str, tuple[int, ...]] = {}
+        self._buffers: dict[str, bytearray] = {}
+        self._connect_at: dict[str, float] = dict.fromkeys(self.hosts, 0.0)
+        self._pending_until: dict[str, float] = {}
+        self._selector = selectors.DefaultSelector()
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._ts_start: float = 0.0
+
+    def __enter__(self) -> Self:
+        self._ts_start = time.time()
+        self._thread = threading.Thread(target=self._thread_fn, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(
+        self,
+        typ: type[BaseException] | None = None,
+        exc: BaseException | None = None,
+        tb: TracebackType | None = None,
+        extra_arg: int = 0,
+    ) -> None:
+        self._event.set()
+        if self._thread is not None:
+            # nothing in the thread blocks longer than one select() -> join returns soon
+            self._thread.join()
+        for key in list(self._selector.get_map().values()):
+            self._selector.unregister(key.fileobj)
+            key.fileobj.close()
+        self._selector.close()
+
+    def _thread_fn(self) -> None:
+        while not self._event.is_set():
+            self._connect_missing()
+            for key, mask in self._selector.select(timeout=0.5):
+                if mask & selectors.EVENT_WRITE:
+                    self._connected(key.fileobj, key.data)
+                else:
+                    self._receive(key.fileobj, key.data)
+
+    def _connect_missing(self) -> None:
+        """Starts non-blocking connects, a slow or dead host doesn't hold up the others."""
+        ts_now = time.time()
+        for key in list(self._selector.get_map().values()):
+            # connect still pending -> give up, gets retried later
+            if key.events & selectors.EVENT_WRITE and ts_now > self._pending_until[key.data]:
+                self._drop(key.fileobj)
+        registered = {_k.data for _k in self._selector.get_map().values()}
+        for address, ts_retry in self._connect_at.items():
+            if address in registered or ts_now < ts_retry:
+                continue
+            self._connect_at[address] = ts_now + self.reconnect_s
+            try:
+                family, kind, proto, _, target = socket.getaddrinfo(
+                    address, self.port, type=socket.SOCK_STREAM
+                )[0]
+                sock = socket.socket(family, kind, proto)
+            except OSError:
+                # i.e. hostname can't be resolved
+                continue
+            sock.setblocking(False)  # noqa: FBT003
+            result = sock.connect_ex(target)
+            if result not in {0, errno.EINPROGRESS, errno.EWOULDBLOCK}:
+                sock.close()
+                continue
+            self._pending_until[address] = ts_now + self.connect_timeout_s
+            self._selector.register(sock, selectors.EVENT_WRITE, data=address)
+
+    def _connected(self, sock: socket.socket, address: str) -> None:
+        """Finishes a connect that became writable - either established or refused."""
+        if sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) != 0:
+            self._drop(sock)
+            return
+        self._buffers[address] = bytearray()
+        self._selector.modify(sock, selectors.EVENT_READ, data=address)
+        logger.debug("[%s] telemetry connected", self.hosts[address])
+
+    def _drop(self, sock: socket.socket) -> None:
+        self._selector.unregister(sock)
+        sock.close()
+
+    def _receive(self, sock: socket.socket, address: str) -> None:
+        try:
+            data = sock.recv(2**16)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if len(data) < 1:
+            # sheep ended measurement (or went down)
+            self._drop(sock)
+            logger.debug("[%s] telemetry disconnected", self.hosts[address])
+            return
+        buffer = self._buffers[address]
+        buffer.extend(data)
+        while len(buffer) >= FRAME_HEADER.size:
+            magic, version, length = FRAME_HEADER.unpack_from(buffer)
+            if magic != FRAME_MAGIC or version != FRAME_VERSION or length != FRAME_BODY.size:
+                logger.error(
+                    "[%s] telemetry-frame not understood (version %d) -> disconnecting",
+                    self.hosts[address],
+                    version,
+                )
+                self._drop(sock)
+                return
+            end = FRAME_HEADER.size + length
+            if len(buffer) < end:
+                break
+            frame = TelemetryFrame.unpack(bytes(buffer[FRAME_HEADER.size : end]))
+            del buffer[:end]
+            name = self.hosts[address]
+            with self._lock:
+                self.latest[name] = frame
+                self.received_at[name] = time.time()
+                self.frames_n[name] += 1
+
+    def problems(self) -> dict[str, list[str]]:
+        """Issues of each node since last call (empty if all nodes behave)."""
+        issues: dict[str, list[str]] = {}
+        ts_now = time.time()
+        with self._lock:
+            for name in self.hosts.values():
+                found: list[str] = []
+                ts_last = self.received_at.get(name, self._ts_start)
+                if ts_now - ts_last > self.silence_s:
+                    found.append(f"silent for {ts_now - ts_last:.0f} s")
+                frame = self.latest.get(name)
+                if frame is not None:
+                    seen = self._overflows_seen.get(name, (0,) * len(frame.overflows))
+                    if frame.overflows != seen:
+                        found.append(f"new overflows {frame.overflows}")
+                    self._overflows_seen[name] = frame.overflows
+                    # input-buffer is only used by emulation
+                    if 0 < frame.fill_levels[0] < 20:
+                        found.append(f"input-buffer runs dry ({frame.fill_levels[0]} %)")
+                    if max(frame.fill_levels[1:]) > 80:
+                        found.append(f"output-buffers filling up {frame.fill_levels[1:]} %")
+                    if frame.pru0_tsample_max_ns >= SAMPLE_INTERVAL_NS:
+                        found.append(f"PRU0 over real-time budget ({frame.pru0_tsample_max_ns} ns)")
+                if found:
+                    issues[name] = found
+        return issues
+
+    def summary(self) -> str:
+        """Table with latest frame of each node."""
+        header = (
+            f"{'node':<16} {'V_mean':>8} {'mA_mean':>9} {'mW_mean':>9} {'edges':>8} "
+            f"{'util%':>6} {'fill% (inp, out, gpio, util)':>28} {'overflows':>10}"
+        )
+        lines = [header]
+        with self._lock:
+            for name in sorted(self.hosts.values()):
+                frame = self.latest.get(name)
+                if frame is None:
+                    lines.append(f"{name:<16} {'-':>8}")
+                    continue
+                lines.append(
+                    f"{name:<16} {frame.voltage_V[1]:>8.3f} {1e3 * frame.current_A[1]:>9.3f} "
+                    f"{1e3 * frame.power_mean_W:>9.3f} {sum(frame.gpio_edges):>8} "
+                    f"{100 * frame.pru0_tsample_mean_ns / SAMPLE_INTERVAL_NS:>6.1f} "
+                    f"{frame.fill_levels!s:>28} {sum(frame.overflows):>10}"
+                )
+        return "\n".join(lines)
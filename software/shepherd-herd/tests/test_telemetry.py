@@ -0,0 +1,55 @@
+import socket
+import time
+
+from shepherd_herd.telemetry import FRAME_BODY
+from shepherd_herd.telemetry import FRAME_HEADER
+from shepherd_herd.telemetry import FRAME_MAGIC
+from shepherd_herd.telemetry import FRAME_VERSION
+from shepherd_herd.telemetry import TelemetryCollector
+
+
+def pack_frame(samples_n: int, overflows: tuple[int, ...]) -> bytes:
+    # body as published by the sheep, see TelemetryFrame
+    values = [0, samples_n, *(3 * [1.0]), *(3 * [1e-3]), 1e-3, 0, *(16 * [0])]
+    values += [10, 5_000.0, 6_000, 100, 50, 10, 0, 10, *overflows]
+    header = FRAME_HEADER.pack(FRAME_MAGIC, FRAME_VERSION, FRAME_BODY.size)
+    return header + FRAME_BODY.pack(*values)
+
+
+def test_collector_receives_split_frames() -> None:
+    server = socket.create_server(("127.0.0.1", 0))
+    port = server.getsockname()[1]
+    with TelemetryCollector({"127.0.0.1": "sheep0"}, port=port) as collector:
+        client, _ = server.accept()
+        data = pack_frame(10_000, (0, 0, 0, 0, 0)) + pack_frame(20_000, (0, 1, 0, 0, 0))
+        client.sendall(data[:10])
+        time.sleep(0.2)
+        client.sendall(data[10:])
+        time.sleep(0.5)
+        assert collector.frames_n["sheep0"] == 2
+        assert collector.latest["sheep0"].samples_n == 20_000
+        assert "sheep0" in collector.summary()
+        # overflow is reported once
+        assert "new overflows" in collector.problems()["sheep0"][0]
+        assert collector.problems() == {}
+        client.close()
+    server.close()
+
+
+def test_collector_connects_without_blocking() -> None:
+    server = socket.create_server(("127.0.0.1", 0))
+    port = server.getsockname()[1]
+    # unroutable host first, its pending connect must not delay the others
+    hosts = {"10.255.255.1": "sheep_dead", "127.0.0.1": "sheep0"}
+    server.settimeout(0.5)
+    with TelemetryCollector(hosts, port=port) as collector:
+        client, _ = server.accept()
+        client.sendall(pack_frame(10_000, (0, 0, 0, 0, 0)))
+        time.sleep(0.3)
+        assert collector.frames_n["sheep0"] == 1
+        assert collector.frames_n["sheep_dead"] == 0
+        client.close()
+    # selector only gets closed after the thread ended
+    assert collector._thread is not None
+    assert not collector._thread.is_alive()
+    server.close()